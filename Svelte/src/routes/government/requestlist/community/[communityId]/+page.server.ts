@@ -29,8 +29,8 @@ export const load: PageServerLoad = async ({ params, fetch, cookies }) => {
             throw error(404, 'コミュニティが見つかりません');
         }
         
-        // 2. 行政用要請一覧APIから全データを取得 (詳細情報付き)
-        const requestsRes = await fetch(`${API_BASE_URL}/government/requests`, {
+        // 2. 行政用要請一覧APIから、このコミュニティの要請だけを取得 (詳細情報付き・サーバー側で絞り込み)
+        const requestsRes = await fetch(`${API_BASE_URL}/government/requests?community_id=${communityId}`, {
             headers
         });
         
@@ -39,10 +39,7 @@ export const load: PageServerLoad = async ({ params, fetch, cookies }) => {
         }
 
         const community = await communityRes.json();
-        const allRequests = await requestsRes.json();
-
-        // 3. このコミュニティの要請だけをフィルタリング
-        const filteredRequests = allRequests.filter((req: any) => req.community_id === communityId);
+        const filteredRequests = await requestsRes.json();
 
         // 特記事項 (Special Notes) の取得
         let specialNotes = null;
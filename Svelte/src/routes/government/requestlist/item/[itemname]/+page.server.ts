@@ -8,17 +8,15 @@ export const load: PageServerLoad = async ({ params, fetch }) => {
     const itemName = decodeURIComponent(params.itemname);
 
     try {
-        // 1. 行政用要請一覧APIから全データを取得
-        const response = await fetch(`${API_BASE_URL}/government/requests`);
+        // 行政用要請一覧APIから、この品目（itemName）の要請だけをサーバー側で絞り込んで取得
+        const query = new URLSearchParams({ item_name: itemName });
+        const response = await fetch(`${API_BASE_URL}/government/requests?${query}`);
         
         if (!response.ok) {
             throw error(response.status, '要請データの取得に失敗しました');
         }
 
-        const allRequests = await response.json();
-
-        // 2. この品目（itemName）に一致する要請だけをフィルタリング
-        const filteredRequests = allRequests.filter((req: any) => req.item_name === itemName);
+        const filteredRequests = await response.json();
 
         return {
             itemName, // 表示用に品目名も返す
@@ -1,31 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
-from db.session import get_db
+from typing import List, Optional
+from db.session import get_db, get_read_db
 from db import crud, schemas
+from app.api.v1.pagination import list_filters, set_next_cursor
+from app.core.passwords import get_password_service
 from app.core.security import require_token, require_gov_role
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Communities)
-def api_create_community(
+async def api_create_community(
     item: schemas.CommunitiesCreate, db: Session = Depends(get_db)
 ):
     """
     コミュニティを作成します。
     注意: 最初のコミュニティ作成を可能にするため、このエンドポイントのみ認証不要です。
     """
-    return crud.create_community(db=db, community=item)
+    # bcrypt はワーカープロセスで計算し、DB への書き込みだけをスレッドプールで行う
+    hashed_password = await get_password_service().hash(item.password)
+    return await run_in_threadpool(crud.create_community, db, item, hashed_password)
 
 @router.get("/", response_model=List[schemas.Communities], dependencies=[Depends(require_gov_role)])
 def api_read_communities(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: List[tuple[str, str]] = Depends(list_filters),
+    db: Session = Depends(get_read_db)
 ):
     """全コミュニティ一覧を取得（gov専用）"""
-    return crud.get_communities(db, skip=skip, limit=limit)
+    return set_next_cursor(response, crud.get_communities(db, skip=skip, limit=limit, cursor=cursor, filters=filters))
 
 @router.get("/{item_id}", response_model=schemas.Communities, dependencies=[Depends(require_token)])
-def api_read_community(item_id: int, db: Session = Depends(get_db)):
+def api_read_community(item_id: int, db: Session = Depends(get_read_db)):
     db_item = crud.get_community(db, community_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Community not found")
@@ -1,53 +1,73 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-import math
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from db.session import get_db
-from db.models import Communities
-from db import schemas           # (重要) ご自身のCommunityスキーマをインポートしてください
+from app.core.geo_engine import get_geo_engine
+from db.session import get_async_read_db
+from db import clusters, geo, models, schemas
 
 router = APIRouter()
 
-# 地球の半径 (km)
-EARTH_RADIUS_KM = 6371.0
 
-@router.get("/nearby", response_model=List[schemas.Communities]) # スキーマを指定
+def _with_distance(rows: list[tuple[models.Communities | schemas.Communities, float]]) -> list[schemas.CommunityDistance]:
+    return [
+        schemas.CommunityDistance(**schemas.Communities.model_validate(community).model_dump(), distance_km=distance)
+        for community, distance in rows
+    ]
+
+
+@router.get("/nearby", response_model=List[schemas.CommunityDistance])
 async def get_locations(
-    latitude: float, 
-    longitude: float, 
+    latitude: float,
+    longitude: float,
     range: float,
-    db: Session = Depends(get_db) # DBセッションをDI
+    sort: Optional[Literal["distance"]] = None,
+    db: AsyncSession = Depends(get_async_read_db) # 非同期DBセッションをDI
+):
+    """
+    (latitude, longitude) から range km 以内のコミュニティを、中心からの距離 (distance_km) 付きで返す。
+    sort=distance を指定すると近い順に並べる。
+    R-tree (SQLite) で範囲を囲む矩形の候補に絞り込んでから、候補だけ Haversine 公式で距離を判定する (db/geo.py)。
+    メモリ上の索引 (GEO_ENGINE_ENABLED=true) の読み込み後は DB に問い合わせずに計算する。
+    """
+    geo_engine = get_geo_engine()
+    if geo_engine.ready:
+        # 全件の距離計算はイベントループを止めないようスレッドで行う
+        return _with_distance(await run_in_threadpool(
+            geo_engine.within, latitude, longitude, range, order_by_distance=sort == "distance",
+        ))
+    rows = await geo.get_communities_nearby(db, latitude, longitude, range, order_by_distance=sort == "distance")
+    return _with_distance(rows)
+
+
+@router.get("/nearest", response_model=List[schemas.CommunityDistance])
+async def get_nearest_locations(
+    latitude: float,
+    longitude: float,
+    k: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    (latitude, longitude) に近い順に k 件のコミュニティを距離 (distance_km) 付きで返す。
+    小さな半径から R-tree で検索範囲を広げ、k 件見つかった時点で打ち切る (db/geo.py)。
+    """
+    geo_engine = get_geo_engine()
+    if geo_engine.ready:
+        return _with_distance(await run_in_threadpool(geo_engine.nearest, latitude, longitude, k))
+    return _with_distance(await geo.get_nearest_communities(db, latitude, longitude, k))
+
+
+@router.get("/clusters", response_model=List[schemas.CommunityCluster])
+async def get_clusters(
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=22),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    
-    # 1. 入力値（度）をラジアンに変換 (パラメータ)
-    lat_rad = math.radians(latitude)
-    lon_rad = math.radians(longitude)
-
-    # 2. データベースのカラム（度）をラジアンに変換 (SQL func)
-    # (モデルクラスを Communities と仮定)
-    db_lat_rad = func.radians(Communities.latitude)
-    db_lon_rad = func.radians(Communities.longitude)
-
-    # 3. Haversine公式に基づき、SQLAlchemyで距離計算の式を構築
-    delta_lat = db_lat_rad - lat_rad
-    delta_lon = db_lon_rad - lon_rad
-
-    a = func.pow(func.sin(delta_lat / 2), 2) + \
-        func.cos(lat_rad) * func.cos(db_lat_rad) * \
-        func.pow(func.sin(delta_lon / 2), 2)
-
-    c = 2 * func.asin(func.sqrt(a))
-    distance_km = EARTH_RADIUS_KM * c
-
-    # 4. 構築した距離の式を使ってフィルタリング
-    # (db.query(モデル) から始める)
-    communities_result = db.query(Communities).filter(
-        distance_km <= range
-    ).all()
-    
-    return communities_result
-
-# def calc_distance(lat1,lon1,lat2,lon2):
-#     # この関数はSQLAlchemyの filter() では直接使えないため不要
\ No newline at end of file
+    """
+    地図の表示範囲 bbox ("west,south,east,north") に重なるクラスタを返す。
+    ズームレベルごとの格子のセルに、コミュニティ数・重心・未対応の支援要請数を集計したもの (db/clusters.py)。
+    SQLite ではトリガーで更新される集計済みのテーブルから読むため、件数によらず画面内のセルの数だけ返す。
+    bbox が不正な場合は 400。
+    """
+    return await clusters.get_clusters(db, clusters.parse_bbox(bbox), zoom)
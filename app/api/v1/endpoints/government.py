@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 # DB接続とCRUDロジックをインポート
-from db.session import get_db
+from db.session import get_read_db
 from db import crud_government
+from app.api.v1.pagination import list_filters, set_next_cursor
 
 router = APIRouter()
 
@@ -23,9 +24,11 @@ class GovernmentRequestItem(BaseModel):
     community_name: str| None = None
     latitude: float | None = None
     longitude: float | None = None
+    items_id: int | None = None
     number: int| None = None
     item_name: str| None = None
     unit: str | None = None
+    category: str | None = None
 
     class Config:
         from_attributes = True
@@ -34,9 +37,17 @@ class GovernmentRequestItem(BaseModel):
 # エンドポイント定義
 # ---------------------------------------------------------
 @router.get("/requests", response_model=List[GovernmentRequestItem])
-def read_dashboard_requests(db: Session = Depends(get_db)):
+def read_dashboard_requests(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    filters: List[tuple[str, str]] = Depends(list_filters),
+    db: Session = Depends(get_read_db),
+):
     """
     行政ダッシュボード向け：全支援要請を詳細情報（名前など）付きで取得する。
+    limit を指定すると新しい順にページングし、次ページのカーソルを X-Next-Cursor ヘッダーで返す。
+    item_name, community_id, status, created_at__gte などで絞り込み、sort で並び順を指定できる。
     """
-    requests = crud_government.get_dashboard_requests(db)
-    return requests
\ No newline at end of file
+    requests = crud_government.get_dashboard_requests(db, limit=limit, cursor=cursor, filters=filters)
+    return set_next_cursor(response, requests)
\ No newline at end of file
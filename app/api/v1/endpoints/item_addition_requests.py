@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from db.session import get_db
+from db.session import get_db, get_read_db
 from db import crud, schemas
+from app.api.v1.pagination import list_filters, set_next_cursor
 from app.core.security import require_token, require_gov_role
 
 router = APIRouter()
@@ -27,12 +28,16 @@ def api_create_item_addition_request(
 
 
 @router.get("/", response_model=List[schemas.ItemAdditionRequests], dependencies=[Depends(require_gov_role)])
-def api_read_item_addition_requests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_item_addition_requests(db=db, skip=skip, limit=limit)
+def api_read_item_addition_requests(
+    response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: List[tuple[str, str]] = Depends(list_filters),
+    db: Session = Depends(get_read_db)
+):
+    return set_next_cursor(response, crud.get_item_addition_requests(db=db, skip=skip, limit=limit, cursor=cursor, filters=filters))
 
 
 @router.get("/{add_req_id}", response_model=schemas.ItemAdditionRequests, dependencies=[Depends(require_gov_role)])
-def api_read_item_addition_request(add_req_id: int, db: Session = Depends(get_db)):
+def api_read_item_addition_request(add_req_id: int, db: Session = Depends(get_read_db)):
     db_item = crud.get_item_addition_request(db, add_req_id=add_req_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item addition request not found")
@@ -1,27 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, timezone
+from typing import Optional
 
 from app.core.security import require_token, create_access_token, verify_community_credentials, verify_gov_credentials, decode_access_token
 from app.core.config import get_settings
-from db.session import get_db
+from app.core.revocation import get_revocation_cache, revocation_key
+from app.core.token_cache import get_token_cache
+from db.session import get_async_db, get_db
 from db import schemas, crud
 
 router = APIRouter()
 
 
-@router.post("/login", response_model=schemas.TokenResponse)
-def login(
-    payload: schemas.TokenRequest,
-    response: Response,
-    db: Session = Depends(get_db)
-):
+async def _authenticate(payload: schemas.TokenRequest, db: AsyncSession) -> Optional[tuple[str, str]]:
     """
-    ログイン: トークンを発行してHTTPOnly Cookieに保存
+    認証情報を検証し、成功した場合は (トークンの sub, role) を返す (失敗時は None)。
+    bcrypt の検証は1回だけ行う。
     """
     user_type = payload.user_type
     password = payload.password
-    
+
     if user_type == "community":
         community_id = payload.community_id
         if not community_id:
@@ -29,22 +29,10 @@ def login(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="'community_id' is required for community users",
             )
-        
-        if not verify_community_credentials(community_id, password, db):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials",
-            )
-        
-        settings = get_settings()
-        expires_delta = timedelta(seconds=settings.access_token_expire_seconds)
-        access_token = create_access_token(
-            data={"sub": f"community:{community_id}"},
-            role="community",
-            expires_delta=expires_delta
-        )
-        role = "community"
-        
+        if not await verify_community_credentials(community_id, password, db):
+            return None
+        return f"community:{community_id}", "community"
+
     elif user_type == "gov":
         username = payload.username
         if not username:
@@ -52,30 +40,25 @@ def login(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="'username' is required for gov users",
             )
-        
-        if not verify_gov_credentials(username, password, db):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials",
-            )
-        
-        settings = get_settings()
-        expires_delta = timedelta(seconds=settings.access_token_expire_seconds)
-        access_token = create_access_token(
-            data={"sub": f"gov:{username}"},
-            role="gov",
-            expires_delta=expires_delta
-        )
-        role = "gov"
-        
+        if not await verify_gov_credentials(username, password, db):
+            return None
+        return f"gov:{username}", "gov"
+
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="'user_type' must be either 'community' or 'gov'",
         )
-    
-    # HTTPOnly Cookieにトークンを設定
+
+
+def _issue_token(response: Response, subject: str, role: str) -> schemas.TokenResponse:
+    """トークンを発行し、HTTPOnly Cookie にも設定する"""
     settings = get_settings()
+    access_token = create_access_token(
+        data={"sub": subject},
+        role=role,
+        expires_delta=timedelta(seconds=settings.access_token_expire_seconds),
+    )
     response.set_cookie(
         key="access_token",
         value=access_token,
@@ -84,7 +67,6 @@ def login(
         secure=False,  # 開発環境用。本番ではTrue
         samesite="lax"
     )
-    
     return schemas.TokenResponse(
         access_token=access_token,
         token_type="bearer",
@@ -93,6 +75,42 @@ def login(
     )
 
 
+@router.post("/login", response_model=schemas.TokenResponse)
+async def login(
+    payload: schemas.TokenRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    ログイン: トークンを発行してHTTPOnly Cookieに保存
+    """
+    authenticated = await _authenticate(payload, db)
+    if authenticated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials",
+        )
+    return _issue_token(response, *authenticated)
+
+
+@router.post("/reauth", response_model=schemas.ReauthResponse)
+async def reauthenticate(
+    payload: schemas.TokenRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    再認証: パスワードを1回だけ検証し、結果 (valid) と新しいトークン (Cookie にも設定) をまとめて返す。
+    /validate/validate の後に /login/login を呼ぶ代わりに使う。
+    パスワードが誤っている場合は 200 で valid=false を返す (Cookie は設定しない)。
+    """
+    authenticated = await _authenticate(payload, db)
+    if authenticated is None:
+        return schemas.ReauthResponse(valid=False)
+    token = _issue_token(response, *authenticated)
+    return schemas.ReauthResponse(valid=True, **token.model_dump())
+
+
 @router.post("/logout")
 def logout(
     response: Response,
@@ -106,10 +124,14 @@ def logout(
     
     # トークンの有効期限を取得
     payload = decode_access_token(token)
-    expires_at = datetime.fromtimestamp(payload.get("exp")).isoformat()
+    expires_at = datetime.fromtimestamp(payload.get("exp"), timezone.utc)
     
-    # ブラックリストに追加
-    crud.add_token_to_blacklist(db, token, expires_at)
+    # ブラックリストに追加 (トークン全体ではなく16バイトの jti を保存)
+    jti = revocation_key(token, payload)
+    crud.add_token_to_blacklist(db, jti, expires_at)
+    # このプロセスでは即座に失効させる (他のワーカーは定期的な再読み込みで反映)
+    get_revocation_cache().add(jti)
+    get_token_cache().invalidate(token)
     
     # Cookieを削除
     response.delete_cookie(key="access_token")
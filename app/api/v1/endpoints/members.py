@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
-from db.session import get_db
+from typing import List, Optional
+from db.session import get_db, get_read_db
 from db import crud, schemas
+from app.api.v1.pagination import list_filters, set_next_cursor
 from app.core.security import require_token
 
 router = APIRouter(dependencies=[Depends(require_token)])
@@ -15,12 +16,14 @@ def api_create_member(
 
 @router.get("/", response_model=List[schemas.Members])
 def api_read_members(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: List[tuple[str, str]] = Depends(list_filters),
+    db: Session = Depends(get_read_db)
 ):
-    return crud.get_members(db, skip=skip, limit=limit)
+    return set_next_cursor(response, crud.get_members(db, skip=skip, limit=limit, cursor=cursor, filters=filters))
 
 @router.get("/{item_id}", response_model=schemas.Members)
-def api_read_member(item_id: int, db: Session = Depends(get_db)):
+def api_read_member(item_id: int, db: Session = Depends(get_read_db)):
     db_item = crud.get_member(db, member_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Member not found")
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
-from db.session import get_db
+from typing import List, Optional
+from db.session import get_db, get_read_db
 from db import crud, schemas
+from app.api.v1.pagination import list_filters, set_next_cursor
 from app.core.security import require_token, require_gov_role
 
 router = APIRouter()
@@ -13,15 +14,27 @@ def api_create_support_request(
 ):
     return crud.create_support_request(db=db, support_request=item)
 
+@router.post("/bulk", response_model=schemas.SupportRequestBulkResult, dependencies=[Depends(require_token)])
+def api_create_support_requests_bulk(
+    bulk: schemas.SupportRequestBulkCreate, db: Session = Depends(get_db)
+):
+    """
+    カート内の複数品目をまとめて申請します。
+    RequestContent と SupportRequest を1トランザクションで作成し、作成したIDを返します。
+    """
+    return crud.create_support_requests_bulk(db=db, bulk=bulk)
+
 @router.get("/", response_model=List[schemas.SupportRequest], dependencies=[Depends(require_gov_role)])
 def api_read_support_requests(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: List[tuple[str, str]] = Depends(list_filters),
+    db: Session = Depends(get_read_db)
 ):
     """全支援要請一覧を取得（gov専用）"""
-    return crud.get_support_requests(db, skip=skip, limit=limit)
+    return set_next_cursor(response, crud.get_support_requests(db, skip=skip, limit=limit, cursor=cursor, filters=filters))
 
 @router.get("/{item_id}", response_model=schemas.SupportRequest, dependencies=[Depends(require_token)])
-def api_read_support_request(item_id: int, db: Session = Depends(get_db)):
+def api_read_support_request(item_id: int, db: Session = Depends(get_read_db)):
     db_item = crud.get_support_request(db, request_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="SupportRequest not found")
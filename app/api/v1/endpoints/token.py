@@ -2,18 +2,18 @@ from datetime import timedelta
 from typing import Any, Dict
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.security import create_access_token, verify_community_credentials, verify_gov_credentials
-from db.session import get_db
+from db.session import get_async_db
 from db import schemas
 
 router = APIRouter(tags=["Auth"])
 
 
 @router.post("", response_model=schemas.TokenResponse)
-def issue_token(payload: schemas.TokenRequest, db: Session = Depends(get_db)):
+async def issue_token(payload: schemas.TokenRequest, db: AsyncSession = Depends(get_async_db)):
     user_type = payload.user_type
     password = payload.password
 
@@ -25,7 +25,7 @@ def issue_token(payload: schemas.TokenRequest, db: Session = Depends(get_db)):
                 detail="'community_id' is required for community users",
             )
 
-        if not verify_community_credentials(community_id, password, db):
+        if not await verify_community_credentials(community_id, password, db):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -55,7 +55,7 @@ def issue_token(payload: schemas.TokenRequest, db: Session = Depends(get_db)):
                 detail="'username' is required for gov users",
             )
 
-        if not verify_gov_credentials(username, password, db):
+        if not await verify_gov_credentials(username, password, db):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import verify_community_credentials, verify_gov_credentials
-from db.session import get_db
+from db.session import get_async_read_db
 from db import schemas
 
 router = APIRouter()
 
 
 @router.post("/validate", response_model=schemas.ValidationResponse)
-def validate_credentials(
+async def validate_credentials(
     payload: schemas.ValidationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     IDとパスワードを受け取って正しいか間違っているかを返す
@@ -26,7 +26,8 @@ def validate_credentials(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="'community_id' is required for community users",
             )
-        valid = verify_community_credentials(community_id, password, db)
+        # 読み取り専用セッションのため、コストが古いハッシュの作り直しはログイン時に任せる
+        valid = await verify_community_credentials(community_id, password, db, rehash=False)
 
     elif user_type == "gov":
         username = payload.username
@@ -35,7 +36,7 @@ def validate_credentials(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="'username' is required for gov users",
             )
-        valid = verify_gov_credentials(username, password, db)
+        valid = await verify_gov_credentials(username, password, db, rehash=False)
 
     else:
         raise HTTPException(
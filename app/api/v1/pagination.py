@@ -0,0 +1,22 @@
+from fastapi import Request, Response
+
+from db.filters import RESERVED_PARAMS
+from db.pagination import Page
+
+# 一覧エンドポイントは従来どおり配列を返し、次ページのカーソルはこのヘッダーで返す
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def set_next_cursor(response: Response, page: Page) -> Page:
+    """次のページがあればレスポンスヘッダーにカーソルを設定する"""
+    if getattr(page, "next_cursor", None):
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page
+
+
+def list_filters(request: Request) -> list[tuple[str, str]]:
+    """
+    一覧エンドポイントの絞り込み・並び替え用クエリパラメータ (skip/limit/cursor 以外) を返す。
+    許可されているかどうかは db 側の FilterSpec で検査する。
+    """
+    return [(name, value) for name, value in request.query_params.multi_items() if name not in RESERVED_PARAMS]
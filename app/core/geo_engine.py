@@ -0,0 +1,298 @@
+"""
+位置情報のメモリ上の索引 (任意。GEO_ENGINE_ENABLED=true で有効)
+
+中心を変えながら GET /gnss/nearby・/gnss/nearest を高頻度に呼ぶダッシュボード向けに、全コミュニティの ID と座標を
+プロセス内の連続した配列 (array) に持ち、距離をまとめて計算して DB への問い合わせを省く。
+
+    - numpy があれば配列をコピーせずに numpy の配列として扱い、ベクトル化した Haversine で計算する
+      (無ければ同じ配列を Python で走査する。件数が多い場合は numpy のインストールを推奨)
+    - crud.create_community / update_community / delete_community のコミット後に差分を反映する
+    - 他のワーカーでの変更は GEO_ENGINE_REFRESH_SECONDS ごとの全件の読み直しで取り込む
+    - 読み込みが終わるまでは db/geo.py の SQL で検索する
+
+件数・読み込み時間などは `GET /health/geo-engine` で確認できる。
+"""
+import asyncio
+import heapq
+import logging
+import math
+import threading
+import time
+from array import array
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from db import models, schemas
+from db.geo_math import EARTH_RADIUS_KM
+from db.session import read_engine
+
+try:
+    import numpy as np
+except ImportError:  # numpy は任意 (requirements.txt 参照)
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 検索結果: (コミュニティ, 中心からの距離 km)
+Match = tuple[schemas.Communities, float]
+
+
+class GeoIndex:
+    """
+    コミュニティの ID・緯度・経度 (ラジアン)・緯度の cos を同じ位置に並べた配列。
+    削除は末尾の要素を空いた位置へ移して詰めるため、配列は常に隙間なく並ぶ。スレッドセーフではない。
+    """
+
+    def __init__(self, use_numpy: Optional[bool] = None):
+        self.use_numpy = np is not None and use_numpy is not False
+        self._ids = array("q")
+        self._lat = array("d")
+        self._lon = array("d")
+        self._cos_lat = array("d")
+        self._records: list[schemas.Communities] = []
+        self._positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, record: schemas.Communities) -> None:
+        """追加または更新 (緯度・経度の無いコミュニティは索引から外す)"""
+        if record.latitude is None or record.longitude is None:
+            self.remove(record.community_id)
+            return
+        lat, lon = math.radians(record.latitude), math.radians(record.longitude)
+        pos = self._positions.get(record.community_id)
+        if pos is None:
+            self._positions[record.community_id] = len(self._ids)
+            self._ids.append(record.community_id)
+            self._lat.append(lat)
+            self._lon.append(lon)
+            self._cos_lat.append(math.cos(lat))
+            self._records.append(record)
+        else:
+            self._lat[pos], self._lon[pos], self._cos_lat[pos] = lat, lon, math.cos(lat)
+            self._records[pos] = record
+
+    def remove(self, community_id: int) -> bool:
+        pos = self._positions.pop(community_id, None)
+        if pos is None:
+            return False
+        last = len(self._ids) - 1
+        if pos != last:
+            for values in (self._ids, self._lat, self._lon, self._cos_lat, self._records):
+                values[pos] = values[last]
+            self._positions[self._ids[pos]] = pos
+        for values in (self._ids, self._lat, self._lon, self._cos_lat, self._records):
+            values.pop()
+        return True
+
+    def _distances_numpy(self, latitude: float, longitude: float, positions=None):
+        """positions (省略時は全件) の位置の距離"""
+        phi, lam = math.radians(latitude), math.radians(longitude)
+        # array のバッファをそのまま参照する (コピーしない)。戻り値は新しく確保した配列
+        lat = np.frombuffer(self._lat, dtype=np.float64)
+        lon = np.frombuffer(self._lon, dtype=np.float64)
+        cos_lat = np.frombuffer(self._cos_lat, dtype=np.float64)
+        if positions is not None:
+            lat, lon, cos_lat = lat[positions], lon[positions], cos_lat[positions]
+        a = np.sin((lat - phi) / 2) ** 2 + math.cos(phi) * cos_lat * np.sin((lon - lam) / 2) ** 2
+        return (2 * EARTH_RADIUS_KM) * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _distances_python(self, latitude: float, longitude: float, positions=None) -> list[float]:
+        """positions (省略時は全件) の位置の距離"""
+        phi, lam, cos_phi = math.radians(latitude), math.radians(longitude), math.cos(math.radians(latitude))
+        sin, sqrt, asin = math.sin, math.sqrt, math.asin
+        if positions is None:
+            rows = zip(self._lat, self._lon, self._cos_lat)
+        else:
+            rows = ((self._lat[pos], self._lon[pos], self._cos_lat[pos]) for pos in positions)
+        return [
+            2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(sin((lat - phi) / 2) ** 2 + cos_phi * c * sin((lon - lam) / 2) ** 2)))
+            for lat, lon, c in rows
+        ]
+
+    def _matches(self, positions, distances) -> list[Match]:
+        return [(self._records[pos], float(distances[pos])) for pos in positions]
+
+    def within(self, latitude: float, longitude: float, range_km: float, order_by_distance: bool = False) -> list[Match]:
+        """range_km 以内のコミュニティ (order_by_distance=True で近い順、同じ距離は ID 順)"""
+        if not self._ids:
+            return []
+        # 緯度の差だけで範囲外と分かるものは三角関数を計算しない
+        phi, max_dlat = math.radians(latitude), range_km / EARTH_RADIUS_KM
+        if self.use_numpy:
+            candidates = np.flatnonzero(np.abs(np.frombuffer(self._lat, dtype=np.float64) - phi) <= max_dlat)
+            distances = self._distances_numpy(latitude, longitude, candidates)
+            inside = distances <= range_km
+            positions, distances = candidates[inside], distances[inside]
+            if order_by_distance:
+                order = np.lexsort((np.frombuffer(self._ids, dtype=np.int64)[positions], distances))
+                positions, distances = positions[order], distances[order]
+            return [(self._records[pos], distance) for pos, distance in zip(positions.tolist(), distances.tolist())]
+        candidates = [pos for pos, lat in enumerate(self._lat) if abs(lat - phi) <= max_dlat]
+        distances = dict(zip(candidates, self._distances_python(latitude, longitude, candidates)))
+        positions = [pos for pos in candidates if distances[pos] <= range_km]
+        if order_by_distance:
+            positions.sort(key=lambda pos: (distances[pos], self._ids[pos]))
+        return self._matches(positions, distances)
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> list[Match]:
+        """近い順に k 件"""
+        if not self._ids or k <= 0:
+            return []
+        if self.use_numpy:
+            distances = self._distances_numpy(latitude, longitude)
+            positions = np.arange(len(self._ids))
+            if k < len(positions):
+                positions = np.argpartition(distances, k - 1)[:k]
+            ids = np.frombuffer(self._ids, dtype=np.int64)
+            positions = positions[np.lexsort((ids[positions], distances[positions]))]
+            return self._matches(positions.tolist(), distances)
+        distances = self._distances_python(latitude, longitude)
+        positions = heapq.nsmallest(k, range(len(distances)), key=lambda pos: (distances[pos], self._ids[pos]))
+        return self._matches(positions, distances)
+
+
+def load_index(bind: Engine | Connection, use_numpy: Optional[bool] = None) -> GeoIndex:
+    """緯度・経度のある全コミュニティを読み込んだ索引"""
+    index = GeoIndex(use_numpy)
+    table = models.Communities.__table__
+    with Session(bind=bind) as db:
+        rows = db.execute(
+            select(*table.c).where(table.c.latitude.is_not(None), table.c.longitude.is_not(None))
+        )
+        for row in rows:
+            index.upsert(schemas.Communities.model_validate(row))
+    return index
+
+
+@dataclass
+class GeoEngineMetrics:
+    loads: int = 0
+    load_failures: int = 0
+    last_load_ms: Optional[float] = None
+    last_loaded_at: Optional[float] = None  # UNIX 時刻
+    queries: int = 0
+    upserts: int = 0
+    removes: int = 0
+
+
+class GeoEngine:
+    """GeoIndex をスレッド間で共有し、定期的に全件を読み直す"""
+
+    def __init__(self, bind: Engine, refresh_seconds: float = 300.0, use_numpy: Optional[bool] = None):
+        self.bind = bind
+        self.refresh_seconds = refresh_seconds
+        self.use_numpy = use_numpy
+        self._index: Optional[GeoIndex] = None
+        # 読み込み中に受け取った差分 (読み込んだ索引に適用し直す)。読み込み中でなければ None
+        self._pending: Optional[list[Callable[[GeoIndex], object]]] = None
+        self._lock = threading.Lock()
+        self._metrics = GeoEngineMetrics()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def load(self, bind: Engine | Connection | None = None) -> int:
+        """
+        全件を読み直して索引を置き換える (同期)。読み込んだ件数を返す。
+        読み込み中に reset() (または別の load()) が呼ばれた場合は索引を置き換えずに 0 を返す。
+        """
+        pending: list[Callable[[GeoIndex], object]] = []
+        with self._lock:
+            self._pending = pending
+        started = time.perf_counter()
+        try:
+            index = load_index(bind if bind is not None else self.bind, self.use_numpy)
+        except Exception:
+            with self._lock:
+                if self._pending is pending:
+                    self._pending = None
+                self._metrics.load_failures += 1
+            raise
+        with self._lock:
+            if self._pending is not pending:
+                return 0
+            for apply in pending:
+                apply(index)
+            self._index, self._pending = index, None
+            self._metrics.loads += 1
+            self._metrics.last_load_ms = round((time.perf_counter() - started) * 1000, 2)
+            self._metrics.last_loaded_at = time.time()
+            return len(index)
+
+    def reset(self) -> None:
+        """索引を破棄する (以降は読み込むまで SQL で検索する)"""
+        with self._lock:
+            self._index, self._pending = None, None
+
+    def _apply(self, apply: Callable[[GeoIndex], object]) -> None:
+        if self._index is not None:
+            apply(self._index)
+        if self._pending is not None:
+            self._pending.append(apply)
+
+    def upsert(self, record: schemas.Communities) -> None:
+        with self._lock:
+            self._metrics.upserts += 1
+            self._apply(lambda index: index.upsert(record))
+
+    def remove(self, community_id: int) -> None:
+        with self._lock:
+            self._metrics.removes += 1
+            self._apply(lambda index: index.remove(community_id))
+
+    def within(self, latitude: float, longitude: float, range_km: float, order_by_distance: bool = False) -> list[Match]:
+        with self._lock:
+            self._metrics.queries += 1
+            return self._index.within(latitude, longitude, range_km, order_by_distance) if self._index else []
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> list[Match]:
+        with self._lock:
+            self._metrics.queries += 1
+            return self._index.nearest(latitude, longitude, k) if self._index else []
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.load)
+            except Exception:
+                logger.exception("Could not load the geo index")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name="geo-engine-refresh")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            index = self._index
+            return {
+                **asdict(self._metrics),
+                "ready": index is not None,
+                "backend": ("numpy" if index.use_numpy else "python") if index else None,
+                "size": len(index) if index else 0,
+                "refresh_seconds": self.refresh_seconds,
+            }
+
+
+@lru_cache
+def get_geo_engine() -> GeoEngine:
+    return GeoEngine(read_engine, refresh_seconds=get_settings().geo_engine_refresh_seconds)
@@ -0,0 +1,145 @@
+"""
+アプリケーションのログ設定
+
+ログの出力 (stderr への書き込み) はリクエストを処理するスレッドで行わず、QueueHandler でキューに積んで
+QueueListener の専用スレッドが書き出す。リクエストごとの ID (X-Request-ID) を各レコードに付ける。
+
+    LOG_LEVEL=INFO                               # ルートのレベル
+    LOG_LEVELS=app.core.security=DEBUG,db=WARNING  # モジュールごとのレベル
+    LOG_FORMAT=json                              # json (1行1オブジェクト) または text
+
+app/main.py の読み込み時に configure_logging() が呼ばれ、プロセスの終了時に残りを書き出す。
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import Settings, get_settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# 現在処理中のリクエストの ID (app/main.py のミドルウェアが設定する)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord の標準の属性 (これ以外は extra= で渡された値として JSON に含める)
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+# クライアントから受け取る X-Request-ID として受け付ける形式 (ログへの改行などの混入を防ぐ)
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+_listener: Optional[QueueListener] = None
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """クライアントが送った ID が妥当ならそれを、無ければ新しい ID を返す"""
+    if incoming and _REQUEST_ID_RE.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    """レコードにリクエスト ID を付ける (キューに積む前、ログを出したスレッドで実行される)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """
+    メッセージの組み立てだけを呼び出し元で行い、整形は出力側 (QueueListener) の Formatter に任せる。
+    (標準の QueueHandler は自身の Formatter で整形するため、例外のトレースバックが message に混ざる)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    """"app.core.security=DEBUG,db=WARNING" -> {"app.core.security": "DEBUG", "db": "WARNING"}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            if item.strip():
+                raise ValueError(f"Invalid LOG_LEVELS entry '{item}' (expected <logger>=<LEVEL>)")
+            continue
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+
+def configure_logging(settings: Optional[Settings] = None, stream=None) -> QueueListener:
+    """ルートロガーを QueueHandler 経由の出力に切り替える (再度呼ぶと設定し直す)"""
+    global _listener
+    settings = settings or get_settings()
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(_formatter(settings.log_format))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+    for name, level in parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """キューに残っているログを書き出してリスナーを止める"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
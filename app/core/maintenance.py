@@ -0,0 +1,161 @@
+"""
+DB の定期メンテナンスのスケジューラ
+
+FastAPI の lifespan (app/main.py) で起動し、登録されたジョブ (db/maintenance.py) を一定間隔で実行する。
+
+    - token_blacklist_cleanup : 期限切れのブラックリストの行を削除 (1時間ごと)
+    - optimize                : PRAGMA optimize / ANALYZE (6時間ごと)
+    - incremental_vacuum      : 空きページをファイルから切り詰める (1時間ごと、SQLite のみ)
+    - wal_checkpoint          : WAL を DB ファイルに書き戻す (5分ごと、SQLite のみ)
+
+複数のワーカーが起動していても、各ジョブは DB 上のリースを取得した1プロセスだけが実行する。
+ジョブは同期の DB 操作のため、イベントループを止めないようスレッドで実行する。
+処理時間などは `GET /health/maintenance` で確認できる。
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from db import maintenance
+from db.session import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # 他のワーカーがリースを持っていた・間隔に達していなかった回数
+    last_started_at: Optional[float] = None  # UNIX 時刻
+    last_duration_ms: Optional[float] = None
+    max_duration_ms: float = 0.0
+    total_seconds: float = 0.0
+    last_result: Optional[dict] = None
+    last_error: Optional[str] = None
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    interval_seconds: float
+    run: Callable[[Engine], Optional[dict]]
+    lease_seconds: float = 600.0  # 実行中のプロセスが落ちた場合、この時間が過ぎると他のワーカーが引き継ぐ
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+
+
+def default_jobs(engine: Engine) -> list[MaintenanceJob]:
+    jobs = [
+        MaintenanceJob("token_blacklist_cleanup", 3600, maintenance.cleanup_expired_tokens),
+        MaintenanceJob("optimize", 6 * 3600, maintenance.optimize),
+    ]
+    if engine.dialect.name == "sqlite":
+        jobs += [
+            MaintenanceJob("incremental_vacuum", 3600, maintenance.incremental_vacuum),
+            MaintenanceJob("wal_checkpoint", 300, maintenance.wal_checkpoint),
+        ]
+    return jobs
+
+
+class MaintenanceScheduler:
+    def __init__(self, engine: Engine, jobs: Optional[list[MaintenanceJob]] = None, tick_seconds: float = 60.0):
+        self.engine = engine
+        self.jobs = default_jobs(engine) if jobs is None else jobs
+        self.tick_seconds = tick_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, job: MaintenanceJob) -> None:
+        self.jobs.append(job)
+
+    def run_job(self, job: MaintenanceJob) -> bool:
+        """リースを取得できればジョブを実行する (同期。実行した場合は True)"""
+        if not maintenance.acquire_lease(self.engine, job.name, self.owner, job.interval_seconds, job.lease_seconds):
+            with self._lock:
+                job.metrics.skipped += 1
+            return False
+
+        started_at, started = time.time(), time.perf_counter()
+        result: Any = None
+        error = None
+        try:
+            result = job.run(self.engine)
+        except Exception as exc:  # 1つのジョブの失敗で他のジョブやアプリを止めない
+            error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Maintenance job %s failed", job.name)
+        finally:
+            # 失敗した場合も実行時刻を記録し、次の間隔まで再実行しない
+            maintenance.release_lease(self.engine, job.name, self.owner)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            m = job.metrics
+            m.runs += 1
+            m.last_started_at = started_at
+            m.last_duration_ms = round(elapsed * 1000, 2)
+            m.max_duration_ms = max(m.max_duration_ms, m.last_duration_ms)
+            m.total_seconds += elapsed
+            if error is None:
+                m.last_result, m.last_error = result, None
+            else:
+                m.failures += 1
+                m.last_error = error
+        logger.info("Maintenance job %s finished in %.1f ms: %s", job.name, elapsed * 1000, error or result)
+        return True
+
+    def run_pending(self) -> list[str]:
+        """間隔に達したジョブを順に実行し、実行したジョブ名の一覧を返す (同期)"""
+        ran = []
+        for job in list(self.jobs):
+            try:
+                if self.run_job(job):
+                    ran.append(job.name)
+            except Exception:
+                # リースの取得 (DB のロック待ちなど) に失敗した場合は次の周期で再試行する
+                logger.exception("Could not schedule maintenance job %s", job.name)
+        return ran
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.to_thread(self.run_pending)
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name="maintenance-scheduler")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            jobs = {job.name: {**asdict(job.metrics), "interval_seconds": job.interval_seconds} for job in self.jobs}
+        return {
+            "running": self._task is not None,
+            "owner": self.owner,
+            "tick_seconds": self.tick_seconds,
+            "jobs": jobs,
+            "leases": maintenance.lease_status(self.engine),
+        }
+
+
+@lru_cache
+def get_maintenance_scheduler() -> MaintenanceScheduler:
+    return MaintenanceScheduler(default_engine, tick_seconds=get_settings().maintenance_tick_seconds)
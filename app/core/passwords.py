@@ -0,0 +1,210 @@
+"""
+パスワードのハッシュ化・検証サービス
+
+bcrypt は1回あたり数百 ms の CPU を使うため、リクエストを処理するスレッドやイベントループで
+直接実行すると、ログインが集中した際に他の API まで待たされる。
+ここではプロセスプールでハッシュ計算を行い (GIL の影響を受けず複数コアに分散)、
+待ち行列の上限を超えた場合は PasswordServiceBusy (API では 503) で即座に断る。
+
+    passwords = get_password_service()
+    hashed = await passwords.hash("secret")
+    ok = await passwords.verify("secret", hashed)
+
+PASSWORD_HASH_WORKERS=0 の場合はプロセスを作らず、スレッドプールで実行する (テスト・開発用)。
+
+コスト (BCRYPT_ROUNDS) はハードウェアに合わせて調整できる。現在のマシンでの計算時間を測り、
+目標の待ち時間に収まるコストを表示するには次を実行する。
+
+    python -m app.core.passwords --target-ms 50
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Optional
+
+import bcrypt
+
+from app.core.config import get_settings
+
+
+def hash_password(plain_password: str, rounds: Optional[int] = None) -> str:
+    """平文パスワードをハッシュ化 (同期版。ワーカープロセス内でも実行される)。rounds 省略時は BCRYPT_ROUNDS"""
+    password_bytes = plain_password.encode('utf-8')
+    salt = bcrypt.gensalt(rounds or get_settings().bcrypt_rounds)
+    hashed = bcrypt.hashpw(password_bytes, salt)
+    return hashed.decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """平文パスワードとハッシュを検証 (同期版)"""
+    password_bytes = plain_password.encode('utf-8')
+    hashed_bytes = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """ハッシュ ($2b$12$...) に含まれるコストを返す (解釈できない場合は None)"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+    """ハッシュのコストが設定値 (rounds 省略時は BCRYPT_ROUNDS) と異なるか"""
+    return hash_rounds(hashed_password) != (rounds or get_settings().bcrypt_rounds)
+
+
+class PasswordServiceBusy(RuntimeError):
+    """待ち行列が上限に達している (app/main.py で 503 に変換される)"""
+
+
+@dataclass
+class PasswordMetrics:
+    hashes: int = 0
+    verifies: int = 0
+    rejected: int = 0  # 待ち行列の上限で断った件数
+    errors: int = 0
+    pending: int = 0  # 実行中 + 待ち
+    max_pending_seen: int = 0
+    busy_seconds: float = 0.0  # 投入から完了までの合計時間
+
+
+class PasswordService:
+    def __init__(self, workers: int = 0, max_pending: int = 64, rounds: Optional[int] = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds or get_settings().bcrypt_rounds
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._metrics = PasswordMetrics()
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None  # イベントループ既定のスレッドプール
+        with self._lock:
+            if self._executor is None:
+                # fork だとイベントループやDB接続のスレッド状態を引き継ぐため spawn を使う
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, counter: str, fn, *args):
+        with self._lock:
+            if self._metrics.pending >= self.max_pending:
+                self._metrics.rejected += 1
+                raise PasswordServiceBusy("Too many concurrent password operations")
+            self._metrics.pending += 1
+            self._metrics.max_pending_seen = max(self._metrics.max_pending_seen, self._metrics.pending)
+
+        started = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # ワーカーが異常終了した場合は次回の呼び出しでプールを作り直す
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                self._metrics.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._metrics.pending -= 1
+                setattr(self._metrics, counter, getattr(self._metrics, counter) + 1)
+                self._metrics.busy_seconds += time.perf_counter() - started
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run("hashes", hash_password, plain_password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verifies", verify_password, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """ログイン成功時にハッシュを作り直すべきか (コストが設定値と異なる)"""
+        return needs_rehash(hashed_password, self.rounds)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                **asdict(self._metrics),
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "rounds": self.rounds,
+            }
+
+    def shutdown(self) -> None:
+        """ワーカープロセスを停止する (再度呼び出された場合はプールを作り直す)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+@lru_cache
+def get_password_service() -> PasswordService:
+    settings = get_settings()
+    return PasswordService(
+        workers=settings.password_hash_workers,
+        max_pending=settings.password_hash_max_pending,
+        rounds=settings.bcrypt_rounds,
+    )
+
+
+def calibrate(
+    target_ms: float = 50.0,
+    percentile: int = 95,
+    samples: int = 20,
+    min_rounds: int = 4,
+    max_rounds: int = 16,
+) -> tuple[int, list[dict]]:
+    """
+    コストごとにハッシュ計算時間を測り、(推奨コスト, 測定結果) を返す。
+    推奨コストは指定パーセンタイルが target_ms 以内に収まる最大のコスト (1つも無ければ min_rounds)。
+    コストが1増えると計算時間はおよそ2倍になるため、目標を超えた時点で測定を打ち切る。
+    """
+    results = []
+    recommended = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hash_password("calibration-password", rounds)
+            timings.append((time.perf_counter() - started) * 1000)
+        quantile = statistics.quantiles(timings, n=100)[percentile - 1] if samples > 1 else timings[0]
+        results.append({
+            "rounds": rounds,
+            "median_ms": round(statistics.median(timings), 2),
+            f"p{percentile}_ms": round(quantile, 2),
+        })
+        if quantile > target_ms:
+            break
+        recommended = rounds
+    return recommended, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bcrypt のコストを現在のマシンで測定し、推奨値を表示する")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="許容するハッシュ計算時間 (既定: 50)")
+    parser.add_argument("--percentile", type=int, default=95, help="目標に使うパーセンタイル (既定: 95)")
+    parser.add_argument("--samples", type=int, default=20, help="コストごとの測定回数 (既定: 20)")
+    parser.add_argument("--min-rounds", type=int, default=4)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+
+    recommended, results = calibrate(
+        args.target_ms, args.percentile, args.samples, args.min_rounds, args.max_rounds
+    )
+    for r in results:
+        print(f"rounds={r['rounds']:>2}  median={r['median_ms']:8.2f} ms  "
+              f"p{args.percentile}={r[f'p{args.percentile}_ms']:8.2f} ms")
+    print(f"推奨: BCRYPT_ROUNDS={recommended} (p{args.percentile} <= {args.target_ms} ms, "
+          f"現在の設定: {get_settings().bcrypt_rounds})")
@@ -0,0 +1,286 @@
+"""
+失効したトークン (ログアウト済み) のプロセス内キャッシュ
+
+require_token は認証が必要なリクエストのたびにブラックリストを確認するが、失効したトークンはごく一部しかない。
+トークンは jti (16バイトの乱数) で識別し、ここでは失効トークンの jti を Bloom フィルタ (全件) と完全一致の集合 (このプロセスで確認済みのもの) で保持し、
+
+    - Bloom フィルタに無い        -> 失効していない (DB へのクエリなし)
+    - 完全一致の集合にある        -> 失効している   (DB へのクエリなし)
+    - それ以外 (偽陽性の可能性)  -> DB で確認する
+
+の順に判定する。起動時に有効期限内の全件を読み込み、以降は TOKEN_REVOCATION_REFRESH_SECONDS ごとに
+読み込み済みの seq の最大値 (ウォーターマーク) より後に追加された行だけを読み込む。
+seq は DB が採番する通し番号のため、ワーカー間の時計のずれの影響を受けない (blacklisted_at はアプリ側の時刻なので基準にしない)。
+SQLite は書き込みを1つずつ行うため seq の順はコミットの順と一致するが、PostgreSQL では採番の後に
+コミットが前後することがある。その場合は TOKEN_REVOCATION_COMMIT_WINDOW_SECONDS だけ前の時点の
+ウォーターマークから読み直し、その間にコミットされた小さい seq の行も拾う。
+別のワーカープロセスでログアウトされたトークンは、最長で TOKEN_REVOCATION_REFRESH_SECONDS だけ遅れて反映される
+(同じプロセスでのログアウトは即座に反映される)。
+"""
+import base64
+import binascii
+import hashlib
+import math
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from sqlalchemy import func, make_url, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from db import crud_async, models
+from db.timestamps import now_millis
+
+JTI_BYTES = 16
+
+
+def new_jti() -> str:
+    """トークンに埋め込む jti (16バイトの乱数を base64url で表した22文字)"""
+    return base64.urlsafe_b64encode(secrets.token_bytes(JTI_BYTES)).rstrip(b"=").decode("ascii")
+
+
+def revocation_key(token: str, payload: dict) -> bytes:
+    """
+    ブラックリスト・キャッシュのキー (16バイト)。jti の無い旧形式のトークンは、
+    マイグレーション 0007 と同じくトークン全体の SHA-256 の先頭16バイトを使う。
+    """
+    jti = payload.get("jti")
+    if not jti:
+        return hashlib.sha256(token.encode("utf-8")).digest()[:JTI_BYTES]
+    try:
+        key = base64.urlsafe_b64decode(jti + "=" * (-len(jti) % 4))
+    except (binascii.Error, ValueError):
+        key = b""
+    if len(key) != JTI_BYTES:
+        # new_jti 以外で作られた jti (任意の文字列) も固定長にそろえる
+        key = hashlib.sha256(jti.encode("utf-8")).digest()[:JTI_BYTES]
+    return key
+
+
+class BloomFilter:
+    """偽陰性の無い集合 (偽陽性率は error_rate 程度)。要素の削除はできないため、作り直して入れ替える"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes) -> Iterable[int]:
+        # ダブルハッシュ法: 1つのダイジェストから k 個の位置を作る
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: bytes) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+@dataclass
+class RevocationMetrics:
+    entries: int = 0  # Bloom フィルタに登録した件数
+    exact_entries: int = 0
+    negatives: int = 0  # Bloom フィルタで「失効していない」と判定した件数 (DB クエリなし)
+    exact_hits: int = 0
+    db_checks: int = 0  # 偽陽性の可能性があり DB で確認した件数
+    false_positives: int = 0
+    refreshes: int = 0
+    full_reloads: int = 0
+    watermark: Optional[int] = None  # 読み込み済みの TokenBlacklist.seq の最大値
+
+
+class RevocationCache:
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        refresh_seconds: float = 5.0,
+        full_reload_seconds: float = 3600.0,
+        exact_limit: int = 10_000,
+        error_rate: float = 0.01,
+        commit_window_seconds: float = 0.0,
+    ):
+        self.capacity = capacity
+        # seq の順とコミットの順がずれうる時間 (0 = 一致する。SQLite)
+        self.commit_window_seconds = commit_window_seconds
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.exact_limit = exact_limit
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._exact: set[bytes] = set()
+        self._metrics = RevocationMetrics()
+        self._loaded = False
+        self._refreshed_at = 0.0
+        self._reloaded_at = 0.0
+        self._refreshing = False
+        self._added_during_reload: list[bytes] = []
+        # 読み込みごとの (時刻, ウォーターマーク)。commit_window_seconds だけ前の時点から読み直すために使う
+        self._history: deque[tuple[float, Optional[int]]] = deque()
+
+    def add(self, key: bytes) -> None:
+        """失効したトークンを登録する (ログアウト時、DB への書き込み後に呼ぶ)"""
+        with self._lock:
+            self._add(key)
+            if self._refreshing:
+                # 読み込み中の全件に含まれていない可能性があるため、作り直した後にも追加する
+                self._added_during_reload.append(key)
+
+    def _add(self, key: bytes) -> None:
+        if key in self._exact:
+            return
+        self._bloom.add(key)
+        if len(self._exact) < self.exact_limit:
+            self._exact.add(key)
+        self._metrics.entries = self._bloom.count
+        self._metrics.exact_entries = len(self._exact)
+
+    async def is_revoked(self, db: AsyncSession, key: bytes) -> bool:
+        """
+        トークン (revocation_key で求めたキー) が失効しているか。
+        失効していない場合は (定期的な再読み込みを除き) DB にアクセスしない
+        """
+        if self._loaded:
+            await self.refresh_if_due(db)
+        else:
+            await self.refresh(db, full=True)
+
+        with self._lock:
+            if key not in self._bloom:
+                self._metrics.negatives += 1
+                return False
+            if key in self._exact:
+                self._metrics.exact_hits += 1
+                return True
+            self._metrics.db_checks += 1
+
+        revoked = await crud_async.is_token_blacklisted(db, key)
+        with self._lock:
+            if revoked:
+                self._add(key)
+            else:
+                self._metrics.false_positives += 1
+        return revoked
+
+    async def refresh_if_due(self, db: AsyncSession) -> None:
+        now = time.monotonic()
+        if self._refreshing or now - self._refreshed_at < self.refresh_seconds:
+            return
+        await self.refresh(db, full=now - self._reloaded_at >= self.full_reload_seconds)
+
+    async def refresh(self, db: AsyncSession, full: bool = False) -> None:
+        """
+        ブラックリストを読み込む。full=True の場合は有効期限内の全件で作り直し (期限切れの分を捨てる)、
+        それ以外はウォーターマーク以降に追加された行だけを追加する。
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._added_during_reload = []
+        try:
+            watermark = None if full else self._scan_from()
+            query = select(models.TokenBlacklist.jti, models.TokenBlacklist.seq).where(
+                models.TokenBlacklist.expires_at > now_millis()
+            )
+            if watermark is not None:
+                query = query.where(models.TokenBlacklist.seq > watermark)
+            rows = (await db.execute(query)).all()
+            if full:
+                total = await db.scalar(select(func.count()).select_from(models.TokenBlacklist))
+                self._reload(rows, total or 0)
+            else:
+                self._merge(rows)
+        finally:
+            self._refreshing = False
+
+    def _scan_from(self) -> Optional[int]:
+        """
+        差分読み込みで seq がこれより大きい行を読む (None の場合は全件)。
+        前回の読み込みで未コミットだった行は、前回の読み込みより commit_window_seconds 以上前には採番されていないため、
+        その時点のウォーターマークから読み直せば拾える
+        """
+        if not self.commit_window_seconds:
+            return self._metrics.watermark
+        cutoff = self._refreshed_at - self.commit_window_seconds
+        watermark = None
+        for recorded_at, recorded in self._history:
+            if recorded_at > cutoff:
+                break
+            watermark = recorded
+        return watermark
+
+    def _record(self, now: float) -> None:
+        """読み込み後のウォーターマークを記録し、以後の _scan_from で使わない古い記録を捨てる (ロック内で呼ぶ)"""
+        if not self.commit_window_seconds:
+            return
+        self._history.append((now, self._metrics.watermark))
+        cutoff = now - self.commit_window_seconds
+        while len(self._history) > 1 and self._history[1][0] <= cutoff:
+            self._history.popleft()
+
+    def _reload(self, rows, total: int) -> None:
+        # 想定件数を超えていたら偽陽性率を保つため大きくして作り直す
+        capacity = max(self.capacity, 2 * total)
+        bloom = BloomFilter(capacity, self.error_rate)
+        exact: set[bytes] = set()
+        watermark = None
+        for key, seq in rows:
+            bloom.add(key)
+            if len(exact) < self.exact_limit:
+                exact.add(key)
+            watermark = max(watermark or 0, seq)
+        now = time.monotonic()
+        with self._lock:
+            for key in self._added_during_reload:
+                bloom.add(key)
+                exact.add(key)
+            self.capacity = capacity
+            self._bloom, self._exact = bloom, exact
+            self._metrics.watermark = watermark
+            self._metrics.entries = bloom.count
+            self._metrics.exact_entries = len(exact)
+            self._metrics.full_reloads += 1
+            self._metrics.refreshes += 1
+            self._loaded = True
+            self._refreshed_at = self._reloaded_at = now
+            self._record(now)
+
+    def _merge(self, rows) -> None:
+        with self._lock:
+            for key, seq in rows:
+                self._add(key)
+                self._metrics.watermark = max(self._metrics.watermark or 0, seq)
+            self._metrics.refreshes += 1
+            self._refreshed_at = time.monotonic()
+            self._record(self._refreshed_at)
+            if self._bloom.count > self.capacity:
+                # 次回の refresh_if_due で全件を読み直す
+                self._reloaded_at = 0.0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**asdict(self._metrics), "capacity": self.capacity, "refresh_seconds": self.refresh_seconds}
+
+
+@lru_cache
+def get_revocation_cache() -> RevocationCache:
+    settings = get_settings()
+    sqlite = make_url(settings.database_url).get_backend_name() == "sqlite"
+    return RevocationCache(
+        capacity=settings.token_revocation_capacity,
+        refresh_seconds=settings.token_revocation_refresh_seconds,
+        commit_window_seconds=0.0 if sqlite else settings.token_revocation_commit_window_seconds,
+    )
@@ -1,28 +1,35 @@
+import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status, Cookie, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
-from db.session import get_db
-from db import crud
+from app.core.revocation import get_revocation_cache, new_jti, revocation_key
+from app.core.token_cache import get_token_cache
+from db.session import get_lazy_async_read_db
+from db import crud_async
+
+logger = logging.getLogger(__name__)
 
 # Centralized OAuth2 dependency so every endpoint shares the same login gate.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/token", auto_error=False)
 
 
-def verify_community_credentials(community_id: int, password: str, db: Session) -> bool:
-    """コミュニティIDとパスワードで認証"""
-    community = crud.authenticate_community(db, community_id, password)
+async def verify_community_credentials(
+    community_id: int, password: str, db: AsyncSession, rehash: bool = True
+) -> bool:
+    """コミュニティIDとパスワードで認証 (rehash: コストが古いハッシュを作り直すか)"""
+    community = await crud_async.authenticate_community(db, community_id, password, rehash=rehash)
     return community is not None
 
 
-def verify_gov_credentials(username: str, password: str, db: Session) -> bool:
-    """govユーザー名とパスワードで認証"""
-    gov_user = crud.authenticate_gov_user(db, username, password)
+async def verify_gov_credentials(username: str, password: str, db: AsyncSession, rehash: bool = True) -> bool:
+    """govユーザー名とパスワードで認証 (rehash: コストが古いハッシュを作り直すか)"""
+    gov_user = await crud_async.authenticate_gov_user(db, username, password, rehash=rehash)
     return gov_user is not None
 
 
@@ -31,7 +38,8 @@ def create_access_token(data: dict, role: str, expires_delta: Optional[timedelta
     expire_delta = expires_delta or timedelta(seconds=settings.access_token_expire_seconds)
     expire = datetime.now(timezone.utc) + expire_delta
     to_encode = data.copy()
-    to_encode.update({"exp": int(expire.timestamp()), "role": role})
+    # jti: ログアウト時にブラックリストへ登録するトークンの識別子
+    to_encode.update({"exp": int(expire.timestamp()), "role": role, "jti": new_jti()})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
@@ -43,16 +51,20 @@ def decode_access_token(token: str) -> dict:
 async def require_token(
     request: Request,
     authorization: Optional[str] = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_lazy_async_read_db)
 ) -> dict:
     """FastAPI dependency that enforces OAuth2 bearer authentication.
     Checks cookie first, then Authorization header. Also validates against blacklist.
+    The DB session is lazy: bypasses and tokens answered from the in-process caches open no connection.
     """
     settings = get_settings()
-    
+    # 認証のトレースは DEBUG の場合だけ組み立てる (無効時は引数の評価も行わない)
+    trace = logger.isEnabledFor(logging.DEBUG)
+
     # 開発モードの場合は認証をバイパス
     if settings.dev_mode:
-        print("DEBUG: DEV_MODE is enabled, bypassing authentication")
+        if trace:
+            logger.debug("DEV_MODE is enabled, bypassing authentication")
         return {"sub": "dev_user", "role": "admin", "token": "dev_bypass"}
     
     # 同一ポート(8000)からのリクエストは素通し
@@ -61,24 +73,27 @@ async def require_token(
     server_port = request.url.port or 8000  # デフォルトは8000
     
     if client_host in ["127.0.0.1", "localhost", "::1"] and client_port == server_port:
-        print(f"DEBUG: Same-port request from {client_host}:{client_port}, bypassing authentication")
+        if trace:
+            logger.debug("Same-port request from %s:%s, bypassing authentication", client_host, client_port)
         return {"sub": "localhost", "role": "admin", "token": "localhost_bypass"}
     
     # プリフライトOPTIONSは認証ヘッダーを持たないためスキップ
     if request.method == "OPTIONS":
-        print("DEBUG: OPTIONS preflight request - skipping auth check")
+        if trace:
+            logger.debug("OPTIONS preflight request - skipping auth check")
         return {"sub": "preflight", "role": "preflight", "token": ""}
 
-    # 生のAuthorizationヘッダーとメソッドを表示（デバッグ用）
-    raw_auth = request.headers.get('authorization')
-    print(f"DEBUG: method={request.method}, raw_authorization={raw_auth}")
-
     # Cookie優先でトークン取得
     access_token = request.cookies.get("access_token")
     token = access_token or authorization
     
-    print(f"DEBUG: Cookie={access_token[:20] if access_token else None}, Auth={authorization[:20] if authorization else None}, Token={token[:20] if token else None}")
-    
+    if trace:
+        # トークンの値そのものは記録しない
+        logger.debug(
+            "Auth check: method=%s path=%s cookie=%s authorization_header=%s",
+            request.method, request.url.path, access_token is not None, authorization is not None,
+        )
+
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -86,23 +101,28 @@ async def require_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # ブラックリストチェック
-    if crud.is_token_blacklisted(db, token):
+    # 一度検証したトークンは署名の検証を省く (exp を過ぎたものはキャッシュから返らない)
+    token_cache = get_token_cache()
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = decode_access_token(token)
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        token_cache.put(token, payload)
+
+    # ブラックリストチェック (jti で判定。失効していなければプロセス内キャッシュだけで判定し、DB にはアクセスしない)
+    if await get_revocation_cache().is_revoked(db, revocation_key(token, payload)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    try:
-        payload = decode_access_token(token)
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
     subject = payload.get("sub")
     role = payload.get("role")
     if subject is None or role is None:
@@ -0,0 +1,101 @@
+"""
+検証済みトークン (JWT) のペイロードのキャッシュ
+
+フロントエンドは同じ Cookie のトークンを何度も送ってくるため、require_token で毎回署名を検証
+(HMAC + JSON の解析) するのは無駄が多い。一度検証したトークンのペイロードをトークンのハッシュをキーに
+LRU で保持し、同じトークンであれば署名の検証を省く。
+
+    - 保持期間は TOKEN_CACHE_TTL_SECONDS とトークンの exp の早い方 (期限切れのトークンは返さない)
+    - ログアウト時に invalidate で削除する (失効の確認は app/core/revocation.py で毎回行う)
+    - TOKEN_CACHE_SIZE=0 で無効
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import get_settings
+
+
+def _key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+@dataclass
+class TokenCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0  # 保持期間を過ぎていたため破棄した件数
+    evictions: int = 0  # 上限に達して古いものから捨てた件数
+    invalidations: int = 0
+
+
+class TokenPayloadCache:
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = TokenCacheMetrics()
+
+    def get(self, token: str) -> Optional[dict]:
+        """検証済みのペイロード (無い・期限切れの場合は None)"""
+        if self.maxsize <= 0:
+            return None
+        key = _key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics.misses += 1
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._metrics.expired += 1
+                self._metrics.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics.hits += 1
+            return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        """署名を検証したペイロードを保持する"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if payload.get("exp") is not None:
+            expires_at = min(expires_at, float(payload["exp"]))
+        key = _key(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._metrics.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            if self._entries.pop(_key(token), None) is not None:
+                self._metrics.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                **asdict(self._metrics),
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+@lru_cache
+def get_token_cache() -> TokenPayloadCache:
+    settings = get_settings()
+    return TokenPayloadCache(maxsize=settings.token_cache_size, ttl_seconds=settings.token_cache_ttl_seconds)
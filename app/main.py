@@ -1,18 +1,75 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request 
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse 
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import IntegrityError 
-from db.session import engine
-from db import models
+from db.session import async_engine, async_read_engine, engine, get_async_read_db, read_engine, session_usage
+from db import migrate, models
+from db.clusters import InvalidBBox
+from db.filters import InvalidFilter
+from db.pagination import InvalidCursor
 
 from app.api.v1.api import api_router
+from app.api.v1.pagination import NEXT_CURSOR_HEADER
+from app.core.config import get_settings
+from app.core.logging_config import REQUEST_ID_HEADER, configure_logging, new_request_id, request_id_var
+from app.core.maintenance import get_maintenance_scheduler
+from app.core.passwords import PasswordServiceBusy, get_password_service
+from app.core.geo_engine import get_geo_engine
+from app.core.revocation import get_revocation_cache
+from app.core.token_cache import get_token_cache
+
+# マイグレーションのログも同じ形式で出力するため、最初に設定する
+configure_logging()
+logger = logging.getLogger(__name__)
 
 models.Base.metadata.create_all(bind=engine)
+# 既存DBへのスキーマ変更 (インデックス追加など) を適用
+migrate.upgrade(engine)
+
+
+@asynccontextmanager
+async def _read_session(app: FastAPI):
+    """
+    起動時の読み込み用のセッション。エンドポイントと同じ依存関係 (get_async_read_db) から取得するため、
+    app.dependency_overrides で差し替えた場合 (テストなど) はそのセッションを使う
+    """
+    sessions = app.dependency_overrides.get(get_async_read_db, get_async_read_db)()
+    try:
+        yield await anext(sessions)
+    finally:
+        await sessions.aclose()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 失効トークンのキャッシュを読み込んでおく (最初のリクエストで読み込む待ち時間を避ける)
+    async with _read_session(app) as db:
+        await get_revocation_cache().refresh(db, full=True)
+    # 期限切れトークンの削除・PRAGMA optimize などの定期メンテナンス
+    scheduler = get_maintenance_scheduler() if get_settings().maintenance_enabled else None
+    if scheduler is not None:
+        scheduler.start()
+    # 位置情報のメモリ上の索引 (読み込みはバックグラウンドで行い、終わるまでは SQL で検索する)
+    geo_engine = get_geo_engine() if get_settings().geo_engine_enabled else None
+    if geo_engine is not None:
+        geo_engine.start()
+    yield
+    if geo_engine is not None:
+        await geo_engine.stop()
+    if scheduler is not None:
+        await scheduler.stop()
+    # パスワードハッシュ用のワーカープロセスを停止
+    get_password_service().shutdown()
+
 
 app = FastAPI(
     title="CoCoIRU API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -26,15 +83,31 @@ app.add_middleware(
     allow_credentials=True,  # Cookie認証に必須
     allow_methods=["*"],
     allow_headers=["*"],
+    # 一覧APIの次ページカーソル・リクエストIDをフロントエンドから読めるようにする
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER],
 )
 
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """リクエストごとの ID をログに付け、レスポンスヘッダーでも返す (問い合わせ時の突き合わせ用)"""
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    context = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(context)
+    response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
 @app.exception_handler(IntegrityError)
 async def integrity_error_exception_handler(request: Request, exc: IntegrityError):
     """
     SQLAlchemyの外部キー制約違反(IntegrityError)をキャッチし、
     409 Conflict (または 400 Bad Request) を返す。
     """
-    print(f"(!) データベース整合性エラー発生: {exc.orig}") # サーバーログ
+    logger.warning("Database integrity error on %s %s: %s", request.method, request.url.path, exc.orig)
     return JSONResponse(
         status_code=409, # 409 Conflict がセマンティック的に適切
         content={
@@ -42,10 +115,77 @@ async def integrity_error_exception_handler(request: Request, exc: IntegrityErro
         },
     )
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_exception_handler(request: Request, exc: InvalidCursor):
+    """一覧APIに不正なページングカーソルが渡された場合は 400 Bad Request を返す。"""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidFilter)
+async def invalid_filter_exception_handler(request: Request, exc: InvalidFilter):
+    """一覧APIに許可されていない絞り込み・並び替えが指定された場合は 400 Bad Request を返す。"""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidBBox)
+async def invalid_bbox_exception_handler(request: Request, exc: InvalidBBox):
+    """地図のクラスタ取得に不正な表示範囲 (bbox) が指定された場合は 400 Bad Request を返す。"""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(PasswordServiceBusy)
+async def password_service_busy_exception_handler(request: Request, exc: PasswordServiceBusy):
+    """ログインなどのパスワード処理が混み合っている場合は 503 を返し、少し待って再試行してもらう。"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 app.include_router(api_router, prefix="/api/v1")
 
 
 
 @app.get("/health", tags=["Server Health"])
 def health_check():
-    return {"status": "ok", "message": "Welcome to CoCoIRU API"}
\ No newline at end of file
+    return {"status": "ok", "message": "Welcome to CoCoIRU API"}
+
+
+@app.get("/health/passwords", tags=["Server Health"])
+def password_service_health():
+    """パスワードハッシュ用ワーカーの処理件数・待ち行列の状況"""
+    return get_password_service().metrics()
+
+
+@app.get("/health/revocation", tags=["Server Health"])
+def revocation_cache_health():
+    """失効トークンのキャッシュの件数・DB で確認した回数など"""
+    return get_revocation_cache().metrics()
+
+
+@app.get("/health/token-cache", tags=["Server Health"])
+def token_cache_health():
+    """検証済みトークンのキャッシュのヒット率など"""
+    return get_token_cache().metrics()
+
+
+@app.get("/health/maintenance", tags=["Server Health"])
+def maintenance_health():
+    """定期メンテナンスのジョブごとの実行回数・処理時間・直近の結果"""
+    return get_maintenance_scheduler().metrics()
+
+
+@app.get("/health/geo-engine", tags=["Server Health"])
+def geo_engine_health():
+    """位置情報のメモリ上の索引の件数・計算方法 (numpy / python)・読み込み時間"""
+    return get_geo_engine().metrics()
+
+
+@app.get("/health/db", tags=["Server Health"])
+def db_health():
+    """
+    接続プールの状況と、認証で遅延セッションを実際に使ったリクエストの割合
+    (sessions_opened / requests が低いほど、DB を使わずに認証できている)
+    """
+    return {
+        "lazy_sessions": session_usage.snapshot(),
+        "pools": {
+            "write": engine.pool.status(),
+            "read": read_engine.pool.status(),
+            "async_write": async_engine.pool.status(),
+            "async_read": async_read_engine.pool.status(),
+        },
+    }
@@ -0,0 +1,139 @@
+"""
+地図表示用のコミュニティのクラスタ (GET /api/v1/gnss/clusters)
+
+地図のズームレベルごとに緯度・経度を一定の大きさのセル (格子) に分け、セルごとの
+コミュニティ数・重心・未対応の支援要請数を `community_clusters` テーブルに持つ。
+SQLite ではマイグレーション 0010 のトリガーが Communities / Support_Request の変更のたびに該当するセルだけを更新するため、
+表示範囲とズームレベルを指定した検索は主キーの範囲検索で済み、応答の件数は画面に入るセルの数で頭打ちになる。
+トリガーの無い DB (PostgreSQL など) では Communities を GROUP BY してその場で集計する。
+"""
+from typing import Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, and_, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Communities, SupportRequest
+
+# タイル (経度 360 / 2^zoom 度) を縦横 CELLS_PER_TILE に分けたものを1セルとする (256px のタイルなら 64px 四方)
+CELLS_PER_TILE = 4
+# 集計を持つ最大のズームレベル (セルは約 150m 四方)。これより拡大した場合はこのレベルのセルを返す
+MAX_CLUSTER_ZOOM = 16
+# 1回に返すセルの範囲の上限 (64px のセルで 4K 画面 (約 2000 セル) を覆える大きさ)。
+# 表示範囲に比べてズームレベルが大きすぎる指定は InvalidBBox にする
+MAX_BBOX_CELLS = 10_000
+# 未対応として数える支援要請の状態 (マイグレーション 0010 のトリガーと同じ)
+OPEN_REQUEST_STATUSES = ("pending", "processing")
+
+_metadata = MetaData()
+
+
+class InvalidBBox(ValueError):
+    """bbox の形式・範囲が不正 (app/main.py で 400 に変換される)"""
+
+# 作成・更新はマイグレーション 0010 (SQLite のみ。create_all の対象外にするため別の MetaData)
+community_clusters = Table(
+    "community_clusters",
+    _metadata,
+    Column("zoom", Integer, primary_key=True),
+    Column("cell_x", Integer, primary_key=True),
+    Column("cell_y", Integer, primary_key=True),
+    Column("count", Integer),
+    Column("sum_lat", Float),
+    Column("sum_lon", Float),
+    Column("open_requests", Integer),
+)
+
+
+def cell_degrees(zoom: int) -> float:
+    """ズームレベルのセルの一辺 (度)"""
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+def cell_of(latitude: float, longitude: float, zoom: int) -> tuple[int, int]:
+    """(cell_x, cell_y)。トリガーと同じく (経度 + 180, 緯度 + 90) をセルの大きさで割って切り捨てる"""
+    size = cell_degrees(zoom)
+    return int((longitude + 180) / size), int((latitude + 90) / size)
+
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """
+    "west,south,east,north" (経度・緯度の度) を (west, south, east, north) にする。
+    west > east は日付変更線をまたぐ範囲とみなす。不正な値は InvalidBBox
+    """
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise InvalidBBox("bbox must be 'west,south,east,north'") from None
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise InvalidBBox("bbox is out of range")
+    return west, south, east, north
+
+
+def _cell_ranges(bbox: tuple[float, float, float, float], zoom: int) -> tuple[tuple[int, int], list[tuple[int, int]]]:
+    """bbox に重なるセルの (y の範囲, [x の範囲, ...])"""
+    west, south, east, north = bbox
+    size = cell_degrees(zoom)
+    y_range = (int((south + 90) / size), int((north + 90) / size))
+    lon_ranges = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    return y_range, [(int((lo + 180) / size), int((hi + 180) / size)) for lo, hi in lon_ranges]
+
+
+def _cluster(zoom: int, cell_x: int, cell_y: int, count: int, sum_lat: float, sum_lon: float,
+             open_requests: Optional[int]) -> dict:
+    return {
+        "zoom": zoom,
+        "cell_x": cell_x,
+        "cell_y": cell_y,
+        "count": count,
+        "latitude": sum_lat / count,
+        "longitude": sum_lon / count,
+        "open_requests": open_requests or 0,
+    }
+
+
+def clusters_query(bbox: tuple[float, float, float, float], zoom: int):
+    """集計済みのセル (community_clusters) から bbox に重なるものを選ぶ"""
+    (y0, y1), x_ranges = _cell_ranges(bbox, zoom)
+    c = community_clusters.c
+    return (
+        select(c.zoom, c.cell_x, c.cell_y, c.count, c.sum_lat, c.sum_lon, c.open_requests)
+        .where(c.zoom == zoom, c.count > 0, c.cell_y.between(y0, y1),
+               or_(*(c.cell_x.between(x0, x1) for x0, x1 in x_ranges)))
+        .order_by(c.cell_x, c.cell_y)
+    )
+
+
+def aggregate_query(bbox: tuple[float, float, float, float], zoom: int):
+    """Communities をその場で GROUP BY して clusters_query と同じ列を返す (トリガーの無い DB 用)"""
+    (y0, y1), x_ranges = _cell_ranges(bbox, zoom)
+    size = cell_degrees(zoom)
+    cell_x = func.floor((Communities.longitude + 180) / size)
+    cell_y = func.floor((Communities.latitude + 90) / size)
+    open_requests = (
+        select(SupportRequest.community_id, func.count().label("open_requests"))
+        .where(SupportRequest.status.in_(OPEN_REQUEST_STATUSES))
+        .group_by(SupportRequest.community_id)
+        .subquery()
+    )
+    return (
+        select(literal(zoom).label("zoom"), cell_x, cell_y, func.count(), func.sum(Communities.latitude),
+               func.sum(Communities.longitude), func.sum(open_requests.c.open_requests))
+        .select_from(Communities)
+        .outerjoin(open_requests, open_requests.c.community_id == Communities.community_id)
+        .where(Communities.latitude.is_not(None), Communities.longitude.is_not(None),
+               cell_y.between(y0, y1), or_(*(and_(cell_x >= x0, cell_x <= x1) for x0, x1 in x_ranges)))
+        .group_by(cell_x, cell_y)
+        .order_by(cell_x, cell_y)
+    )
+
+
+async def get_clusters(db: AsyncSession, bbox: tuple[float, float, float, float], zoom: int) -> list[dict]:
+    """bbox に重なるセルごとの件数・重心・未対応の支援要請数"""
+    zoom = min(max(zoom, 0), MAX_CLUSTER_ZOOM)
+    (y0, y1), x_ranges = _cell_ranges(bbox, zoom)
+    if (y1 - y0 + 1) * sum(x1 - x0 + 1 for x0, x1 in x_ranges) > MAX_BBOX_CELLS:
+        raise InvalidBBox("bbox is too large for this zoom level")
+    precomputed = db.get_bind().dialect.name == "sqlite"
+    result = await db.execute(clusters_query(bbox, zoom) if precomputed else aggregate_query(bbox, zoom))
+    return [_cluster(zoom, int(x), int(y), count, sum_lat, sum_lon, open_requests)
+            for _, x, y, count, sum_lat, sum_lon, open_requests in result.all()]
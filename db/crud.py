@@ -1,204 +1,161 @@
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from db import models, schemas
-from typing import Type, TypeVar, Generic
+from typing import Optional, Sequence
 from pydantic import BaseModel
-import bcrypt
-from datetime import datetime, timezone, timedelta
 
-from db.session import engine
-from db import models
+from app.core.geo_engine import get_geo_engine
+from app.core.passwords import hash_password, verify_password  # noqa: F401 (従来の crud.hash_password 互換)
+from db.filters import FilterField, FilterSpec
+from db.repository import CRUDRepository, after_commit, unit_of_work
+from db.timestamps import now_iso, now_millis
+
+
+# --- テーブルごとのリポジトリ (書き込みは RETURNING 付きの1文) ---
+# 一覧のフィルタ・並び替えはインデックスのある列だけを許可する
+special_notes = CRUDRepository[models.SpecialNotes, schemas.SpecialNotesCreate](models.SpecialNotes)
+items = CRUDRepository[models.Items, schemas.ItemsCreate](
+    models.Items,
+    FilterSpec(models.Items.items_id, {
+        "item_name": FilterField(models.Items.item_name),
+        "category": FilterField(models.Items.category),
+    }),
+)
+shelter_infos = CRUDRepository[models.ShelterInfo, schemas.ShelterInfoCreate](models.ShelterInfo)
+members = CRUDRepository[models.Members, schemas.MembersCreate](models.Members)
+request_contents = CRUDRepository[models.RequestContent, schemas.RequestContentCreate](
+    models.RequestContent,
+    FilterSpec(models.RequestContent.request_content_id, {
+        "items_id": FilterField(models.RequestContent.items_id),
+    }),
+)
+communities = CRUDRepository[models.Communities, schemas.CommunitiesCreate](
+    models.Communities,
+    FilterSpec(models.Communities.community_id, {
+        "member_id": FilterField(models.Communities.member_id),
+    }),
+)
+shelters = CRUDRepository[models.Shelter, schemas.ShelterCreate](
+    models.Shelter,
+    FilterSpec(models.Shelter.shelter_id, {
+        "community_id": FilterField(models.Shelter.community_id),
+    }),
+)
+support_requests = CRUDRepository[models.SupportRequest, schemas.SupportRequestCreate](
+    models.SupportRequest,
+    FilterSpec(models.SupportRequest.request_id, {
+        "community_id": FilterField(models.SupportRequest.community_id),
+        "request_content_id": FilterField(models.SupportRequest.request_content_id),
+        "status": FilterField(models.SupportRequest.status),
+        "created_at": FilterField(models.SupportRequest.created_at, ranges=True),
+    }),
+)
+item_addition_requests = CRUDRepository[models.ItemAdditionRequests, schemas.ItemAdditionRequestsCreate](
+    models.ItemAdditionRequests,
+    FilterSpec(models.ItemAdditionRequests.add_req_id, {
+        "community_id": FilterField(models.ItemAdditionRequests.community_id),
+    }),
+)
+credentials = CRUDRepository[models.Credential, schemas.CredentialCreate](models.Credential)
+gov_users = CRUDRepository[models.GovUser, schemas.GovUserCreate](
+    models.GovUser,
+    FilterSpec(models.GovUser.gov_user_id, {
+        "username": FilterField(models.GovUser.username),
+    }),
+)
+token_blacklist = CRUDRepository[models.TokenBlacklist, BaseModel](models.TokenBlacklist)
 
 
-def hash_password(plain_password: str) -> str:
-    """平文パスワードをハッシュ化"""
-    password_bytes = plain_password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """平文パスワードとハッシュを検証"""
-    password_bytes = plain_password.encode('utf-8')
-    hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
-
-
-# --- 汎用的な Update (setattr) ロジック ---
-def update_db_item(db_item: models.Base, item_update: BaseModel):
-    """
-    PydanticスキーマからDBモデルの属性を更新する汎用関数
-    """
-    if db_item:
-        # Pydanticモデルから辞書を取得 (unset=Trueで未設定のキーを除外)
-        update_data = item_update.model_dump(exclude_unset=True)
-        # 辞書の各キー/バリューでDBモデルの属性を更新
-        for key, value in update_data.items():
-            setattr(db_item, key, value)
-    return db_item
-
-
-# --- Timestamp helpers ---
-def _now_iso():
-    # Japan Standard Time (UTC+9)
-    jst = timezone(timedelta(hours=9))
-    return datetime.now(jst).isoformat()
-
-
-def _apply_create_timestamps(db_obj: object):
-    """モデルに `created_at` 属性があれば、未設定時に現在時刻を入れる。"""
-    if hasattr(db_obj, "created_at"):
-        cur = getattr(db_obj, "created_at", None)
-        if not cur:
-            try:
-                setattr(db_obj, "created_at", _now_iso())
-            except Exception:
-                pass
-
-
-def _apply_update_timestamps(db_obj: object):
-    """モデルに `updated_at` 属性があれば更新時に現在時刻を入れる。"""
-    if hasattr(db_obj, "updated_at"):
-        try:
-            setattr(db_obj, "updated_at", _now_iso())
-        except Exception:
-            pass
-
 # --- 1. SpecialNotes ---
 
 def get_special_note(db: Session, special_notes_id: int):
-    return db.query(models.SpecialNotes).filter(models.SpecialNotes.special_notes_id == special_notes_id).first()
+    return special_notes.get(db, special_notes_id)
 
-def get_special_notes(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.SpecialNotes).offset(skip).limit(limit).all()
+def get_special_notes(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return special_notes.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 def create_special_note(db: Session, special_note: schemas.SpecialNotesCreate):
-    db_special_note = models.SpecialNotes(**special_note.model_dump())
-    _apply_create_timestamps(db_special_note)
-    db.add(db_special_note)
-    db.commit()
-    db.refresh(db_special_note)
-    return db_special_note
+    return special_notes.create(db, special_note)
 
 def update_special_note(db: Session, special_notes_id: int, special_note_update: schemas.SpecialNotesCreate):
-    db_item = get_special_note(db, special_notes_id)
-    db_item = update_db_item(db_item, special_note_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return special_notes.update(db, special_notes_id, special_note_update)
 
 def delete_special_note(db: Session, special_notes_id: int):
-    db_item = get_special_note(db, special_notes_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return special_notes.delete(db, special_notes_id)
 
 # --- 2. Items ---
 
 def get_item(db: Session, item_id: int):
-    return db.query(models.Items).filter(models.Items.items_id == item_id).first()
+    return items.get(db, item_id)
 
-def get_items(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Items).offset(skip).limit(limit).all()
+def get_items(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return items.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 def create_item(db: Session, item: schemas.ItemsCreate):
-    db_item = models.Items(**item.model_dump())
-    _apply_create_timestamps(db_item)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
-    return db_item
+    return items.create(db, item)
 
 def update_item(db: Session, item_id: int, item_update: schemas.ItemsCreate):
-    db_item = get_item(db, item_id)
-    db_item = update_db_item(db_item, item_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return items.update(db, item_id, item_update)
 
 def delete_item(db: Session, item_id: int):
-    db_item = get_item(db, item_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return items.delete(db, item_id)
 
 # --- 3. ShelterInfo ---
 
 def get_shelter_info(db: Session, shelter_info_id: int):
-    return db.query(models.ShelterInfo).filter(models.ShelterInfo.shelter_info == shelter_info_id).first()
+    return shelter_infos.get(db, shelter_info_id)
 
-def get_shelter_infos(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.ShelterInfo).offset(skip).limit(limit).all()
+def get_shelter_infos(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return shelter_infos.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 def create_shelter_info(db: Session, shelter_info: schemas.ShelterInfoCreate):
-    db_shelter_info = models.ShelterInfo(**shelter_info.model_dump())
-    _apply_create_timestamps(db_shelter_info)
-    db.add(db_shelter_info)
-    db.commit()
-    db.refresh(db_shelter_info)
-    return db_shelter_info
+    return shelter_infos.create(db, shelter_info)
 
 def update_shelter_info(db: Session, shelter_info_id: int, shelter_info_update: schemas.ShelterInfoCreate):
-    db_item = get_shelter_info(db, shelter_info_id)
-    db_item = update_db_item(db_item, shelter_info_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return shelter_infos.update(db, shelter_info_id, shelter_info_update)
 
 def delete_shelter_info(db: Session, shelter_info_id: int):
-    db_item = get_shelter_info(db, shelter_info_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return shelter_infos.delete(db, shelter_info_id)
 
 # --- 4. Members ---
 
 def get_member(db: Session, member_id: int):
-    return db.query(models.Members).filter(models.Members.member_id == member_id).first()
+    return members.get(db, member_id)
 
-def get_members(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Members).offset(skip).limit(limit).all()
+def get_members(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return members.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 def create_member(db: Session, member: schemas.MembersCreate):
-    db_member = models.Members(**member.model_dump())
-    _apply_create_timestamps(db_member)
-    db.add(db_member)
-    db.commit()
-    db.refresh(db_member)
-    return db_member
+    return members.create(db, member)
 
 def update_member(db: Session, member_id: int, member_update: schemas.MembersCreate):
-    db_item = get_member(db, member_id)
-    db_item = update_db_item(db_item, member_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return members.update(db, member_id, member_update)
 
 def delete_member(db: Session, member_id: int):
-    db_item = get_member(db, member_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return members.delete(db, member_id)
 
 # --- 5. RequestContent ---
 
 def get_request_content(db: Session, request_content_id: int):
-    return db.query(models.RequestContent).filter(models.RequestContent.request_content_id == request_content_id).first()
+    return request_contents.get(db, request_content_id)
 
-def get_request_contents(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.RequestContent).offset(skip).limit(limit).all()
+def get_request_contents(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return request_contents.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 
 def get_supported_items(db: Session):
@@ -213,287 +170,235 @@ def get_supported_items(db: Session):
     )
 
 def create_request_content(db: Session, request_content: schemas.RequestContentCreate):
-    db_request_content = models.RequestContent(**request_content.model_dump())
-    _apply_create_timestamps(db_request_content)
-    db.add(db_request_content)
-    db.commit()
-    db.refresh(db_request_content)
-    return db_request_content
+    return request_contents.create(db, request_content)
 
 def update_request_content(db: Session, request_content_id: int, request_content_update: schemas.RequestContentCreate):
-    db_item = get_request_content(db, request_content_id)
-    db_item = update_db_item(db_item, request_content_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return request_contents.update(db, request_content_id, request_content_update)
 
 def delete_request_content(db: Session, request_content_id: int):
-    db_item = get_request_content(db, request_content_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return request_contents.delete(db, request_content_id)
 
 # --- 6. Communities ---
 
 def get_community(db: Session, community_id: int):
-    return db.query(models.Communities).filter(models.Communities.community_id == community_id).first()
-
-def get_communities(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Communities).offset(skip).limit(limit).all()
-
-def create_community(db: Session, community: schemas.CommunitiesCreate):
-    # 1. Credential を先に作成
-    credential_data = schemas.CredentialCreate(
-        password=community.password,
-        created_at=community.created_at
-    )
-    db_credential = create_credential(db, credential_data)
-    
-    # 2. コミュニティデータから password を除外して Communities を作成
-    community_dict = community.model_dump(exclude={"password"})
-    community_dict["credential_id"] = db_credential.credential_id
-    
-    db_community = models.Communities(**community_dict)
-    _apply_create_timestamps(db_community)
-    db.add(db_community)
-    db.commit()
-    db.refresh(db_community)
-    return db_community
+    return communities.get(db, community_id)
+
+def get_communities(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return communities.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
+
+def create_community(db: Session, community: schemas.CommunitiesCreate, hashed_password: Optional[str] = None):
+    # Credential と Communities を1トランザクション (コミット1回) で作成する
+    with unit_of_work(db):
+        # 1. Credential を先に作成 (credential_id は RETURNING で取得)
+        credential_data = schemas.CredentialCreate(
+            password=community.password,
+            created_at=community.created_at
+        )
+        db_credential = create_credential(db, credential_data, hashed_password)
+
+        # 2. コミュニティデータから password を除外して Communities を作成
+        community_dict = community.model_dump(exclude={"password"})
+        community_dict["credential_id"] = db_credential.credential_id
+
+        row = communities.create(db, community_dict)
+        _sync_geo_engine(db, row)
+        return row
 
 def update_community(db: Session, community_id: int, community_update: schemas.CommunitiesCreate):
-    db_item = get_community(db, community_id)
-    db_item = update_db_item(db_item, community_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    # 索引への反映をコミットより前に登録するため unit_of_work の中で書き込む
+    with unit_of_work(db):
+        row = communities.update(db, community_id, community_update)
+        if row is not None:
+            _sync_geo_engine(db, row)
+        return row
 
 def delete_community(db: Session, community_id: int):
-    db_item = get_community(db, community_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    with unit_of_work(db):
+        row = communities.delete(db, community_id)
+        if row is not None:
+            after_commit(db, lambda: get_geo_engine().remove(row.community_id))
+        return row
+
+def _sync_geo_engine(db: Session, row) -> None:
+    # メモリ上の位置情報の索引 (app/core/geo_engine.py) にコミット後の値を反映する
+    record = schemas.Communities.model_validate(row)
+    after_commit(db, lambda: get_geo_engine().upsert(record))
 
 # --- 7. Shelter ---
 
 def get_shelter(db: Session, shelter_id: int):
-    return db.query(models.Shelter).filter(models.Shelter.shelter_id == shelter_id).first()
+    return shelters.get(db, shelter_id)
 
-def get_shelters(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Shelter).offset(skip).limit(limit).all()
+def get_shelters(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return shelters.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 def create_shelter(db: Session, shelter: schemas.ShelterCreate):
-    db_shelter = models.Shelter(**shelter.model_dump())
-    _apply_create_timestamps(db_shelter)
-    db.add(db_shelter)
-    db.commit()
-    db.refresh(db_shelter)
-    return db_shelter
+    return shelters.create(db, shelter)
 
 def update_shelter(db: Session, shelter_id: int, shelter_update: schemas.ShelterCreate):
-    db_item = get_shelter(db, shelter_id)
-    db_item = update_db_item(db_item, shelter_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return shelters.update(db, shelter_id, shelter_update)
 
 def delete_shelter(db: Session, shelter_id: int):
-    db_item = get_shelter(db, shelter_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return shelters.delete(db, shelter_id)
 
 # --- 8. SupportRequest ---
 
 def get_support_request(db: Session, request_id: int):
-    return db.query(models.SupportRequest).filter(models.SupportRequest.request_id == request_id).first()
+    return support_requests.get(db, request_id)
 
-def get_support_requests(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.SupportRequest).offset(skip).limit(limit).all()
+def get_support_requests(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return support_requests.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 def create_support_request(db: Session, support_request: schemas.SupportRequestCreate):
-    db_support_request = models.SupportRequest(**support_request.model_dump())
-    _apply_create_timestamps(db_support_request)
-    db.add(db_support_request)
-    db.commit()
-    db.refresh(db_support_request)
-    return db_support_request
+    return support_requests.create(db, support_request)
+
+def create_support_requests_bulk(db: Session, bulk: schemas.SupportRequestBulkCreate):
+    """
+    複数品目の RequestContent と SupportRequest を1トランザクションでまとめて登録する。
+    各テーブルへの INSERT は1回の executemany (RETURNING 付き) で行い、コミットも1回だけ。
+    """
+    now = now_iso()
+    with unit_of_work(db):
+        content_ids = db.scalars(
+            insert(models.RequestContent).returning(
+                models.RequestContent.request_content_id, sort_by_parameter_order=True
+            ),
+            [
+                {"items_id": line.items_id, "number": line.number, "other_note": line.other_note, "created_at": now}
+                for line in bulk.items
+            ],
+        ).all()
+        request_ids = db.scalars(
+            insert(models.SupportRequest).returning(
+                models.SupportRequest.request_id, sort_by_parameter_order=True
+            ),
+            [
+                {"community_id": bulk.community_id, "request_content_id": content_id,
+                 "status": bulk.status, "created_at": now}
+                for content_id in content_ids
+            ],
+        ).all()
+    return schemas.SupportRequestBulkResult(
+        community_id=bulk.community_id,
+        created=[
+            schemas.SupportRequestBulkCreated(request_id=request_id, request_content_id=content_id,
+                                              items_id=line.items_id)
+            for request_id, content_id, line in zip(request_ids, content_ids, bulk.items)
+        ],
+    )
 
 def update_support_request(db: Session, request_id: int, support_request_update: schemas.SupportRequestCreate):
-    db_item = get_support_request(db, request_id)
-    db_item = update_db_item(db_item, support_request_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return support_requests.update(db, request_id, support_request_update)
 
 def delete_support_request(db: Session, request_id: int):
-    db_item = get_support_request(db, request_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return support_requests.delete(db, request_id)
 
 
 # --- 新規: ItemAdditionRequests (物品追加申請) ---
 def get_item_addition_request(db: Session, add_req_id: int):
-    return db.query(models.ItemAdditionRequests).filter(models.ItemAdditionRequests.add_req_id == add_req_id).first()
+    return item_addition_requests.get(db, add_req_id)
 
 
-def get_item_addition_requests(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.ItemAdditionRequests).offset(skip).limit(limit).all()
+def get_item_addition_requests(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return item_addition_requests.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 
 def create_item_addition_request(db: Session, item_req: schemas.ItemAdditionRequestsCreate):
-    db_item_req = models.ItemAdditionRequests(**item_req.model_dump())
-    # timestamp はスキーマから受け取る想定。created_atヘルパーは該当しないためここではそのまま使用。
-    db.add(db_item_req)
-    db.commit()
-    db.refresh(db_item_req)
-    return db_item_req
+    return item_addition_requests.create(db, item_req)
 
 
 def update_item_addition_request(db: Session, add_req_id: int, item_req_update: schemas.ItemAdditionRequestsCreate):
-    db_item = get_item_addition_request(db, add_req_id)
-    db_item = update_db_item(db_item, item_req_update)
-    if db_item:
-        _apply_update_timestamps(db_item)
-        db.commit()
-        db.refresh(db_item)
-    return db_item
+    return item_addition_requests.update(db, add_req_id, item_req_update)
 
 
 def delete_item_addition_request(db: Session, add_req_id: int):
-    db_item = get_item_addition_request(db, add_req_id)
-    if db_item:
-        db.delete(db_item)
-        db.commit()
-    return db_item
+    return item_addition_requests.delete(db, add_req_id)
 
 
 # --- 9. Credential ---
 
-def create_credential(db: Session, credential: schemas.CredentialCreate):
-    """パスワードをハッシュ化して Credential レコードを作成"""
-    hashed_pwd = hash_password(credential.password)
-    db_credential = models.Credential(
-        hashed_password=hashed_pwd,
-        created_at=credential.created_at
-    )
-    _apply_create_timestamps(db_credential)
-    db.add(db_credential)
-    db.commit()
-    db.refresh(db_credential)
-    return db_credential
+def create_credential(db: Session, credential: schemas.CredentialCreate, hashed_password: Optional[str] = None):
+    """
+    パスワードをハッシュ化して Credential レコードを作成。
+    hashed_password を渡した場合はそれを使う (PasswordService で事前にハッシュ化した場合)。
+    """
+    hashed_pwd = hashed_password or hash_password(credential.password)
+    return credentials.create(db, {"hashed_password": hashed_pwd, "created_at": credential.created_at})
 
 
 def get_credential(db: Session, credential_id: int):
-    return db.query(models.Credential).filter(
-        models.Credential.credential_id == credential_id
-    ).first()
-
-
-def authenticate_community(db: Session, community_id: int, password: str):
-    """コミュニティIDとパスワードで認証"""
-    community = get_community(db, community_id)
-    if not community:
-        return None
-    credential = get_credential(db, community.credential_id)
-    if not credential:
-        return None
-    if not verify_password(password, credential.hashed_password):
-        return None
-    return community
+    return credentials.get(db, credential_id)
 
 
 # --- 10. GovUser ---
 
 def get_gov_user(db: Session, gov_user_id: int):
-    return db.query(models.GovUser).filter(models.GovUser.gov_user_id == gov_user_id).first()
+    return gov_users.get(db, gov_user_id)
 
 
 def get_gov_user_by_username(db: Session, username: str):
     return db.query(models.GovUser).filter(models.GovUser.username == username).first()
 
 
-def get_gov_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.GovUser).offset(skip).limit(limit).all()
+def get_gov_users(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
+    return gov_users.list(db, skip=skip, limit=limit, cursor=cursor, filters=filters)
 
 
-def create_gov_user(db: Session, gov_user: schemas.GovUserCreate):
-    """パスワードをハッシュ化してGovUserレコードを作成"""
-    # 1. Credential を先に作成
-    credential_data = schemas.CredentialCreate(
-        password=gov_user.password,
-        created_at=gov_user.created_at
-    )
-    db_credential = create_credential(db, credential_data)
-    
-    # 2. GovUserデータから password を除外して GovUser を作成
-    gov_user_dict = gov_user.model_dump(exclude={"password"})
-    gov_user_dict["credential_id"] = db_credential.credential_id
-    
-    db_gov_user = models.GovUser(**gov_user_dict)
-    _apply_create_timestamps(db_gov_user)
-    db.add(db_gov_user)
-    db.commit()
-    db.refresh(db_gov_user)
-    return db_gov_user
+def create_gov_user(db: Session, gov_user: schemas.GovUserCreate, hashed_password: Optional[str] = None):
+    """パスワードをハッシュ化してGovUserレコードを作成 (Credential と合わせて1トランザクション)"""
+    with unit_of_work(db):
+        # 1. Credential を先に作成
+        credential_data = schemas.CredentialCreate(
+            password=gov_user.password,
+            created_at=gov_user.created_at
+        )
+        db_credential = create_credential(db, credential_data, hashed_password)
 
+        # 2. GovUserデータから password を除外して GovUser を作成
+        gov_user_dict = gov_user.model_dump(exclude={"password"})
+        gov_user_dict["credential_id"] = db_credential.credential_id
 
-def authenticate_gov_user(db: Session, username: str, password: str):
-    """govユーザー名とパスワードで認証"""
-    gov_user = get_gov_user_by_username(db, username)
-    if not gov_user:
-        return None
-    credential = get_credential(db, gov_user.credential_id)
-    if not credential:
-        return None
-    if not verify_password(password, credential.hashed_password):
-        return None
-    if not gov_user.is_active:
-        return None
-    return gov_user
+        return gov_users.create(db, gov_user_dict)
 
 
 # --- 11. TokenBlacklist ---
 
-def add_token_to_blacklist(db: Session, token: str, expires_at: str):
-    """トークンをブラックリストに追加"""
-    from datetime import datetime
-    db_blacklist = models.TokenBlacklist(
-        token=token,
-        blacklisted_at=datetime.now().isoformat(),
-        expires_at=expires_at
-    )
-    db.add(db_blacklist)
-    db.commit()
-    db.refresh(db_blacklist)
-    return db_blacklist
+def add_token_to_blacklist(db: Session, jti: bytes, expires_at):
+    """
+    トークンをブラックリストに追加 (jti は app/core/revocation.revocation_key で求めた16バイトのキー、
+    expires_at は ISO 文字列・datetime・エポックミリ秒のいずれか)
+    """
+    return token_blacklist.create(db, {
+        "jti": jti,
+        "blacklisted_at": now_millis(),
+        "expires_at": expires_at,
+    })
 
 
-def is_token_blacklisted(db: Session, token: str) -> bool:
+def is_token_blacklisted(db: Session, jti: bytes) -> bool:
     """トークンがブラックリストに登録されているかチェック"""
-    result = db.query(models.TokenBlacklist).filter(
-        models.TokenBlacklist.token == token
-    ).first()
-    return result is not None
-
-
-def cleanup_expired_tokens(db: Session):
-    """期限切れのブラックリストトークンを削除"""
-    from datetime import datetime
-    now = datetime.now().isoformat()
-    db.query(models.TokenBlacklist).filter(
-        models.TokenBlacklist.expires_at < now
+    return db.scalar(select(models.TokenBlacklist.seq).where(models.TokenBlacklist.jti == jti)) is not None
+
+
+def cleanup_expired_tokens(db: Session) -> int:
+    """期限切れのブラックリストトークンを削除し、削除した件数を返す (db/maintenance.py から定期的に呼ばれる)"""
+    deleted = db.query(models.TokenBlacklist).filter(
+        models.TokenBlacklist.expires_at < now_millis()
     ).delete()
     db.commit()
+    return deleted
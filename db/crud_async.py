@@ -0,0 +1,105 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.passwords import PasswordService, get_password_service
+from db import models
+
+logger = logging.getLogger(__name__)
+
+# async def のエンドポイント・依存関係 (require_token) から呼ばれる読み取り系 CRUD を AsyncSession で提供する。
+# (一覧・書き込み系は db/crud.py の同期版を使う。位置情報の検索は db/geo.py)
+
+# --- 9. Credential ---
+
+async def _rehash_if_needed(
+    db: AsyncSession, passwords: PasswordService, credential_id: int, password: str, hashed_password: str
+) -> None:
+    """
+    認証に成功したハッシュのコストが BCRYPT_ROUNDS と異なる場合、現在の設定で作り直して保存する。
+    保存に失敗してもログインは成功のまま (次回のログインで再試行される)。
+    """
+    if not passwords.needs_rehash(hashed_password):
+        return
+    new_hash = await passwords.hash(password)
+    try:
+        await db.execute(
+            update(models.Credential)
+            .where(models.Credential.credential_id == credential_id)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        logger.warning("Failed to rehash password for credential %s", credential_id, exc_info=True)
+
+
+async def authenticate_community(
+    db: AsyncSession,
+    community_id: int,
+    password: str,
+    passwords: Optional[PasswordService] = None,
+    rehash: bool = True,
+):
+    """
+    コミュニティIDとパスワードで認証 (bcrypt の検証は PasswordService のワーカーで実行)。
+    コミュニティとパスワードハッシュは1回の JOIN で取得する。
+    rehash=True の場合、コストが設定値と異なるハッシュを作り直す (読み取り専用セッションでは False)。
+    """
+    row = (await db.execute(
+        select(models.Communities, models.Credential.hashed_password)
+        .join(models.Credential, models.Communities.credential_id == models.Credential.credential_id)
+        .where(models.Communities.community_id == community_id)
+    )).first()
+    if row is None:
+        return None
+    community, hashed_password = row
+    passwords = passwords or get_password_service()
+    if not await passwords.verify(password, hashed_password):
+        return None
+    if rehash:
+        await _rehash_if_needed(db, passwords, community.credential_id, password, hashed_password)
+    return community
+
+# --- 10. GovUser ---
+
+async def authenticate_gov_user(
+    db: AsyncSession,
+    username: str,
+    password: str,
+    passwords: Optional[PasswordService] = None,
+    rehash: bool = True,
+):
+    """
+    govユーザー名とパスワードで認証 (bcrypt の検証は PasswordService のワーカーで実行)。
+    ユーザーとパスワードハッシュは1回の JOIN で取得する。
+    rehash=True の場合、コストが設定値と異なるハッシュを作り直す (読み取り専用セッションでは False)。
+    """
+    row = (await db.execute(
+        select(models.GovUser, models.Credential.hashed_password)
+        .join(models.Credential, models.GovUser.credential_id == models.Credential.credential_id)
+        .where(models.GovUser.username == username)
+    )).first()
+    if row is None:
+        return None
+    gov_user, hashed_password = row
+    passwords = passwords or get_password_service()
+    if not await passwords.verify(password, hashed_password):
+        return None
+    if not gov_user.is_active:
+        return None
+    if rehash:
+        await _rehash_if_needed(db, passwords, gov_user.credential_id, password, hashed_password)
+    return gov_user
+
+# --- 11. TokenBlacklist ---
+
+async def is_token_blacklisted(db: AsyncSession, jti: bytes) -> bool:
+    """トークンがブラックリストに登録されているかチェック (crud.is_token_blacklisted の非同期版)"""
+    result = await db.scalar(
+        select(models.TokenBlacklist.jti).where(models.TokenBlacklist.jti == jti)
+    )
+    return result is not None
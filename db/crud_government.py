@@ -1,11 +1,38 @@
+from typing import Optional, Sequence
+
 from sqlalchemy.orm import Session
 from db import models
+from db.filters import FilterField, FilterSpec
+from db.pagination import paginate
+
+# ダッシュボードで許可するフィルタ・並び替え (いずれもインデックスのある列)
+DASHBOARD_FILTERS = FilterSpec(
+    models.SupportRequest.request_id,
+    {
+        "community_id": FilterField(models.SupportRequest.community_id),
+        "items_id": FilterField(models.RequestContent.items_id),
+        "item_name": FilterField(models.Items.item_name),
+        "category": FilterField(models.Items.category),
+        "status": FilterField(models.SupportRequest.status),
+        "created_at": FilterField(models.SupportRequest.created_at, ranges=True),
+    },
+    default_sort=("-created_at",),
+)
+
 
-def get_dashboard_requests(db: Session):
+def get_dashboard_requests(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Sequence[tuple[str, str]] = (),
+):
     """
     行政ダッシュボード用に、支援要請に必要な全情報を結合して取得する。
     JOIN: SupportRequest -> Communities, RequestContent -> Items
+    既定では新しい順 (created_at, request_id の降順) に並べ、limit を指定した場合はカーソルでページングする。
+    filters (クエリパラメータの組) で DASHBOARD_FILTERS に許可された条件・並び順を指定できる。
     """
+    compiled = DASHBOARD_FILTERS.compile(filters)
     # 必要なカラムを明示的に選択して取得
     results = db.query(
         models.SupportRequest.request_id,
@@ -20,11 +47,13 @@ def get_dashboard_requests(db: Session):
         models.Communities.longitude,
         
         # RequestContentテーブルから
+        models.RequestContent.items_id,
         models.RequestContent.number,
         
         # Itemsテーブルから
         models.Items.item_name,
-        models.Items.unit
+        models.Items.unit,
+        models.Items.category
         
     ).join(
         models.Communities, 
@@ -35,8 +64,6 @@ def get_dashboard_requests(db: Session):
     ).join(
         models.Items, 
         models.RequestContent.items_id == models.Items.items_id
-    ).order_by(
-        models.SupportRequest.created_at.desc()
-    ).all()
+    ).filter(*compiled.where)
 
-    return results
\ No newline at end of file
+    return paginate(results, compiled.keys, limit=limit, cursor=cursor, descending=compiled.descending)
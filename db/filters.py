@@ -0,0 +1,126 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+from db.timestamps import EpochMillis, to_millis
+
+# 一覧エンドポイントでフィルタとして扱わないクエリパラメータ
+RESERVED_PARAMS = ("skip", "limit", "cursor")
+SORT_PARAM = "sort"
+
+# `<name>__<op>=value` で指定できる範囲演算子
+RANGE_OPERATORS = {
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+}
+
+
+class InvalidFilter(ValueError):
+    """許可されていないフィルタ・並び替え指定 (app/main.py で 400 に変換される)"""
+
+
+@dataclass(frozen=True)
+class FilterField:
+    """
+    フィルタ可能な列。`ranges=True` で gt/gte/lt/lte を、`sortable=True` で sort への指定を許可する。
+    NULL を取りうる列も並び替えに使える (NULL の行は最後に並び、カーソルでも読み落とさない。db/pagination.py)
+    """
+
+    column: Any
+    ranges: bool = False
+    sortable: bool = True
+
+
+@dataclass
+class CompiledFilter:
+    """WHERE 句の条件と並び順 (列, 降順か) の組"""
+
+    where: list = field(default_factory=list)
+    order: list[tuple[Any, bool]] = field(default_factory=list)
+
+    @property
+    def keys(self) -> list:
+        return [column for column, _ in self.order]
+
+    @property
+    def descending(self) -> list[bool]:
+        return [desc for _, desc in self.order]
+
+
+class FilterSpec:
+    """
+    リソースごとのフィルタ・並び替えの許可リスト。
+
+        ?status=pending&status=approved      -> status IN ('pending', 'approved')
+        ?created_at__gte=2025-01-01          -> created_at >= 2025-01-01T00:00+09:00 (エポックミリ秒)
+        ?sort=-created_at,item_name          -> ORDER BY created_at DESC, item_name ASC, <key>
+
+    許可リストにない名前・演算子は InvalidFilter。値は列の型に変換してからバインドするため、
+    インデックスの張られた列であればそのまま索引検索になる。
+    並び順の最後には一意なキー (主キー) を必ず加え、カーソルページングが一意に定まるようにする。
+    """
+
+    def __init__(
+        self,
+        key: Any,
+        fields: Optional[dict[str, FilterField]] = None,
+        default_sort: Sequence[str] = (),
+    ):
+        self.key = key
+        self.fields = dict(fields or {})
+        self.fields.setdefault(key.key, FilterField(key))
+        self.default_sort = tuple(default_sort) or (key.key,)
+
+    def compile(self, params: Sequence[tuple[str, str]] = ()) -> CompiledFilter:
+        compiled = CompiledFilter()
+        equals: dict[str, list] = {}
+        sort = None
+        for name, raw in params:
+            if name in RESERVED_PARAMS:
+                continue
+            if name == SORT_PARAM:
+                sort = raw
+                continue
+            base, _, op = name.partition("__")
+            spec = self.fields.get(base)
+            if spec is None or (op and (not spec.ranges or op not in RANGE_OPERATORS)):
+                raise InvalidFilter(f"Unsupported filter '{name}'")
+            value = self._convert(spec, name, raw)
+            if op:
+                compiled.where.append(RANGE_OPERATORS[op](spec.column, value))
+            else:
+                equals.setdefault(base, []).append(value)
+
+        for base, values in equals.items():
+            column = self.fields[base].column
+            compiled.where.append(column == values[0] if len(values) == 1 else column.in_(values))
+
+        compiled.order = self._order(sort.split(",") if sort else self.default_sort)
+        return compiled
+
+    def _convert(self, spec: FilterField, name: str, raw: str):
+        try:
+            if isinstance(spec.column.type, EpochMillis):
+                # 日時は保存形式 (エポックミリ秒) に変換して比較する
+                return to_millis(raw)
+            return spec.column.type.python_type(raw)
+        except NotImplementedError:
+            return raw
+        except (TypeError, ValueError) as exc:
+            raise InvalidFilter(f"Invalid value for '{name}'") from exc
+
+    def _order(self, terms: Sequence[str]) -> list[tuple[Any, bool]]:
+        order = []
+        for term in terms:
+            term = term.strip()
+            desc = term.startswith("-")
+            spec = self.fields.get(term.lstrip("-+"))
+            if spec is None or not spec.sortable:
+                raise InvalidFilter(f"Unsupported sort '{term}'")
+            if all(column is not spec.column for column, _ in order):
+                order.append((spec.column, desc))
+        if all(column is not self.key for column, _ in order):
+            # 同順位の行を一意に並べるため、最後の並び順と同じ向きで主キーを加える
+            order.append((self.key, order[-1][1] if order else False))
+        return order
@@ -0,0 +1,155 @@
+"""
+位置情報による検索 (GET /api/v1/gnss/nearby)
+
+SQLite では Communities の緯度・経度を R-tree 仮想テーブル `Communities_rtree` にも持たせ
+(マイグレーション 0009 のトリガーで自動的に同期)、
+
+    1. 検索範囲を囲む緯度・経度の矩形 (バウンディングボックス) で R-tree から候補を絞り込む
+    2. 候補に対してだけ Haversine 公式で正確な距離を計算する (接続に登録した haversine_km 関数を1回呼ぶ)
+
+の2段階で検索する。全件の三角関数計算が不要になるため、件数が増えても検索時間はほぼ一定になる。
+R-tree の無い DB (PostgreSQL など) では緯度・経度の列に対する範囲条件で同じように絞り込み、
+距離は組み込みの三角関数の式で計算する。
+
+近い順の k 件 (GET /api/v1/gnss/nearest) は、小さな半径から検索範囲を広げていき、
+k 件見つかった時点で打ち切る (テーブル全体を距離で並び替えない)。
+"""
+import math
+from typing import Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.geo_math import EARTH_RADIUS_KM, haversine_km  # noqa: F401 (他の位置情報の機能からも参照する)
+from db.models import Communities
+
+# 地球上の2点間の最大距離 (半周) より少し大きい値。この半径では全件が候補になる
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM + 1.0
+
+# 近い順の検索で最初に調べる半径 (km)
+NEAREST_INITIAL_RANGE_KM = 1.0
+
+# R-tree は座標を 32bit 浮動小数点で持つ (格納時に外側へ丸められる) ため、矩形を少しだけ広げて取りこぼしを防ぐ
+_RTREE_MARGIN_DEG = 1e-4
+
+# R-tree 仮想テーブル (作成・同期はマイグレーション 0009。create_all の対象外にするため別の MetaData)
+communities_rtree = Table(
+    "Communities_rtree",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lon", Float),
+    Column("max_lon", Float),
+)
+
+
+def bounding_box(latitude: float, longitude: float, range_km: float) -> tuple[float, float, list[tuple[float, float]]]:
+    """
+    中心から range_km 以内の点をすべて含む (min_lat, max_lat, [(min_lon, max_lon), ...]) を返す。
+    経度の範囲は日付変更線をまたぐ場合に2つに分かれる。極を含む場合は経度全体。
+    """
+    range_km = max(range_km, 0.0)
+    delta_lat = math.degrees(range_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    # 高緯度ほど経度1度あたりの距離が短いため、範囲内で最も極に近い緯度で幅を求める
+    delta_lon = math.degrees(range_km / (EARTH_RADIUS_KM * math.cos(math.radians(max(abs(min_lat), abs(max_lat))))))
+    if delta_lon >= 180:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def distance_expression(latitude: float, longitude: float, native: bool = True,
+                        lat_column=Communities.latitude, lon_column=Communities.longitude):
+    """
+    中心から列の位置までの距離 (km) を求める SQL 式。
+    native=True は SQLite の接続に登録した haversine_km (db/session.py)、False は組み込みの三角関数で計算する。
+    """
+    if native:
+        return func.haversine_km(latitude, longitude, lat_column, lon_column)
+    lat_rad = math.radians(latitude)
+    lon_rad = math.radians(longitude)
+    db_lat_rad = func.radians(lat_column)
+    db_lon_rad = func.radians(lon_column)
+
+    a = func.pow(func.sin((db_lat_rad - lat_rad) / 2), 2) + \
+        math.cos(lat_rad) * func.cos(db_lat_rad) * \
+        func.pow(func.sin((db_lon_rad - lon_rad) / 2), 2)
+    return EARTH_RADIUS_KM * 2 * func.asin(func.sqrt(a))
+
+
+def _bbox_condition(min_lat, max_lat, lon_ranges, lat_min_col, lat_max_col, lon_min_col, lon_max_col):
+    lon_conditions = [and_(lon_min_col >= lo, lon_max_col <= hi) for lo, hi in lon_ranges]
+    return and_(lat_min_col >= min_lat, lat_max_col <= max_lat, or_(*lon_conditions))
+
+
+def is_sqlite(db: AsyncSession) -> bool:
+    """R-tree と haversine_km 関数を使えるか"""
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def nearby_query(latitude: float, longitude: float, range_km: float, rtree: bool = True, native: bool = True,
+                 order_by_distance: bool = False, limit: Optional[int] = None):
+    """
+    range_km 以内のコミュニティと距離 (km) の組 (Communities, distance_km) を選ぶ SELECT。
+    バウンディングボックスで絞り込んでから正確な距離で判定する。
+    """
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, range_km)
+    distance = distance_expression(latitude, longitude, native=native)
+    query = select(Communities, distance.label("distance_km"))
+    if rtree:
+        r = communities_rtree.c
+        margin = _RTREE_MARGIN_DEG
+        lon_ranges = [(lo - margin, hi + margin) for lo, hi in lon_ranges]
+        query = query.join(communities_rtree, r.id == Communities.community_id).where(_bbox_condition(
+            min_lat - margin, max_lat + margin, lon_ranges, r.min_lat, r.max_lat, r.min_lon, r.max_lon,
+        ))
+    else:
+        query = query.where(_bbox_condition(
+            min_lat, max_lat, lon_ranges,
+            Communities.latitude, Communities.latitude, Communities.longitude, Communities.longitude,
+        ))
+    query = query.where(distance <= range_km)
+    if order_by_distance:
+        query = query.order_by(distance, Communities.community_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+async def get_communities_nearby(db: AsyncSession, latitude: float, longitude: float, range_km: float,
+                                 order_by_distance: bool = False) -> list[tuple[Communities, float]]:
+    """range_km 以内の (コミュニティ, 距離 km) の一覧"""
+    sqlite = is_sqlite(db)
+    result = await db.execute(nearby_query(
+        latitude, longitude, range_km, rtree=sqlite, native=sqlite, order_by_distance=order_by_distance,
+    ))
+    return [tuple(row) for row in result.all()]
+
+
+async def get_nearest_communities(db: AsyncSession, latitude: float, longitude: float, k: int,
+                                  initial_range_km: float = NEAREST_INITIAL_RANGE_KM) -> list[tuple[Communities, float]]:
+    """
+    近い順に k 件の (コミュニティ, 距離 km)。
+    半径 r 以内に k 件以上あれば、近い k 件はすべてその円の中にあるため、円の中だけを距離順に並べればよい。
+    足りなければ見つかった件数から密度を見積もって半径を広げる (少なくとも2倍、最大で地球全体)。
+    """
+    sqlite = is_sqlite(db)
+    range_km = min(max(initial_range_km, 1e-3), MAX_DISTANCE_KM)
+    while True:
+        result = await db.execute(nearby_query(
+            latitude, longitude, range_km, rtree=sqlite, native=sqlite, order_by_distance=True, limit=k,
+        ))
+        rows = [tuple(row) for row in result.all()]
+        if len(rows) >= k or range_km >= MAX_DISTANCE_KM:
+            return rows
+        # 件数は面積 (半径の2乗) に比例するとみなす
+        range_km = min(MAX_DISTANCE_KM, range_km * max(2.0, math.sqrt(k / max(len(rows), 1))))
@@ -0,0 +1,24 @@
+"""
+位置情報の距離計算
+
+db/session.py が SQLite の各接続に `haversine_km(lat1, lon1, lat2, lon2)` として登録し、SQL からも
+1回の関数呼び出しで距離を求められるようにする (SQLite が数学関数付きでビルドされていなくても動く)。
+db/models を読み込まないため、db/session.py からも循環せずに参照できる。
+"""
+import math
+from typing import Optional
+
+# 地球の半径 (km)
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1: Optional[float], lon1: Optional[float],
+                 lat2: Optional[float], lon2: Optional[float]) -> Optional[float]:
+    """2点間の大円距離 (km)。いずれかが NULL (None) の場合は None"""
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    # 丸め誤差で 1 をわずかに超えると asin が ValueError になるため抑える
+    return EARTH_RADIUS_KM * 2 * math.asin(min(1.0, math.sqrt(a)))
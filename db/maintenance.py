@@ -0,0 +1,127 @@
+"""
+DB の定期メンテナンス用のジョブとリース (複数ワーカー間の排他)
+
+ジョブは app/core/maintenance.py のスケジューラから一定間隔で呼ばれる。
+複数のワーカープロセス (uvicorn --workers) が同じ DB を使うため、各ジョブは
+`maintenance_leases` テーブルの行をリースとして取得できたプロセスだけが実行する。
+前回の実行時刻もこの行に記録するので、ワーカー数に関わらず間隔は DB 全体で1回になる。
+"""
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, MetaData, Table, TEXT, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db import crud
+from db.timestamps import now_millis
+
+_metadata = MetaData()
+# 定義はここだけ (マイグレーション 0008 もこの Table から作成する)
+maintenance_leases = Table(
+    "maintenance_leases",
+    _metadata,
+    Column("job", TEXT, primary_key=True),
+    Column("owner", TEXT),
+    Column("lease_until", BigInteger, nullable=False, default=0),  # エポックミリ秒
+    Column("last_run_at", BigInteger, nullable=False, default=0),
+)
+
+
+def _ensure_row(engine: Engine, job: str) -> None:
+    with engine.connect() as conn:
+        if conn.scalar(select(maintenance_leases.c.job).where(maintenance_leases.c.job == job)) is not None:
+            return
+    try:
+        with engine.begin() as conn:
+            conn.execute(maintenance_leases.insert().values(job=job, owner=None, lease_until=0, last_run_at=0))
+    except IntegrityError:
+        pass  # 別のプロセスが先に作成した
+
+
+def acquire_lease(engine: Engine, job: str, owner: str, interval_seconds: float, lease_seconds: float) -> bool:
+    """
+    前回の実行から interval_seconds 以上経過し、かつ他のプロセスがリースを持っていなければ取得する。
+    取得と判定は1つの UPDATE で行うため、同時に呼ばれても取得できるのは1プロセスだけ。
+    """
+    _ensure_row(engine, job)
+    now = now_millis()
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(maintenance_leases)
+            .where(maintenance_leases.c.job == job)
+            .where(or_(maintenance_leases.c.lease_until < now, maintenance_leases.c.owner == owner))
+            .where(maintenance_leases.c.last_run_at <= now - int(interval_seconds * 1000))
+            .values(owner=owner, lease_until=now + int(lease_seconds * 1000))
+        )
+        return result.rowcount == 1
+
+
+def release_lease(engine: Engine, job: str, owner: str) -> None:
+    """リースを解放して実行時刻を記録し、次の実行を interval 後にする"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(maintenance_leases)
+            .where(maintenance_leases.c.job == job, maintenance_leases.c.owner == owner)
+            .values(owner=None, lease_until=0, last_run_at=now_millis())
+        )
+
+
+# --- ジョブ ---
+# いずれも同期 Engine を受け取り、結果 (メトリクスに表示する値) を dict で返す。
+
+def cleanup_expired_tokens(engine: Engine) -> dict:
+    """有効期限の過ぎたブラックリストの行を削除する (期限切れのトークンは署名の検証で拒否される)"""
+    with Session(bind=engine) as db:
+        return {"deleted": crud.cleanup_expired_tokens(db)}
+
+
+def optimize(engine: Engine) -> dict:
+    """クエリプランナーの統計情報を更新する (SQLite は必要な表だけを ANALYZE する PRAGMA optimize)"""
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA optimize")
+        else:
+            conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    return {}
+
+
+def incremental_vacuum(engine: Engine, max_pages: int = 1000) -> dict:
+    """
+    空きページを最大 max_pages ページだけファイルから切り詰める (auto_vacuum=INCREMENTAL の DB のみ)。
+    一度に全部を返さないのは、書き込みロックを長く持たないため。
+    """
+    if engine.dialect.name != "sqlite":
+        return {"skipped": "not sqlite"}
+    raw = engine.raw_connection()
+    try:
+        sqlite_conn = raw.driver_connection
+        if sqlite_conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return {"skipped": "auto_vacuum is not INCREMENTAL"}
+        before = sqlite_conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # sqlite3 の execute は1ステップ (1ページ) しか進めないため、最後まで実行する executescript を使う
+        sqlite_conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)})")
+        after = sqlite_conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        raw.close()
+    return {"freed_pages": before - after, "free_pages": after}
+
+
+def wal_checkpoint(engine: Engine, mode: str = "PASSIVE") -> dict:
+    """WAL の内容を DB ファイルへ書き戻す (PASSIVE は読み書き中の接続を待たない)"""
+    with engine.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            return {"skipped": "not sqlite"}
+        if conn.exec_driver_sql("PRAGMA journal_mode").scalar() != "wal":
+            return {"skipped": "journal_mode is not WAL"}
+        busy, log_frames, checkpointed = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one()
+    return {"busy": bool(busy), "log_frames": log_frames, "checkpointed_frames": checkpointed}
+
+
+def lease_status(engine: Engine) -> Optional[list[dict]]:
+    """全ワーカー共通の実行状況 (テーブルが無ければ None)"""
+    with engine.connect() as conn:
+        if not engine.dialect.has_table(conn, maintenance_leases.name):
+            return None
+        return [dict(row._mapping) for row in conn.execute(maintenance_leases.select())]
@@ -0,0 +1,248 @@
+"""
+スキーマのバージョン管理 (マイグレーション)
+
+db/migrations/ 以下の `NNNN_<name>.py` を番号順に適用し、適用済みのバージョンを
+`schema_migrations` テーブルに記録します。各スクリプトは次の2つを定義します。
+
+    DESCRIPTION = "変更内容の説明"
+
+    def upgrade(conn):  # sqlalchemy.engine.Connection (トランザクション内で呼ばれる)
+        ...
+
+既存の本番DBを作り直さずにインデックス追加などを反映するための仕組みです。
+アプリ起動時 (app/main.py) に自動で実行されるほか、単体でも実行できます。
+
+    python db/migrate.py           # 未適用のマイグレーションを適用
+    python db/migrate.py --status  # 適用状況を表示
+"""
+import importlib.util
+import logging
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable
+
+from sqlalchemy import Column, Integer, MetaData, Table, TEXT, inspect, literal, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.types import TypeEngine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+_FILENAME_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", TEXT),
+    Column("applied_at", TEXT, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _load_module(path: Path) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(f"db.migrations.{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """マイグレーションスクリプトをバージョン順に読み込む"""
+    migrations = []
+    for path in sorted(directory.glob("*.py")):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            continue
+        module = _load_module(path)
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            description=getattr(module, "DESCRIPTION", match.group(2)),
+            upgrade=module.upgrade,
+        ))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {directory}: {versions}")
+    return migrations
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    schema_migrations.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+def current_version(engine: Engine) -> int:
+    """適用済みの最新バージョン (未適用なら 0)"""
+    return max(applied_versions(engine), default=0)
+
+
+def upgrade(engine: Engine, migrations: list[Migration] | None = None) -> list[int]:
+    """未適用のマイグレーションを順に適用し、適用したバージョンの一覧を返す"""
+    migrations = load_migrations() if migrations is None else migrations
+    done = applied_versions(engine)
+    applied = []
+    for migration in migrations:
+        if migration.version in done:
+            continue
+        try:
+            # 1マイグレーション = 1トランザクション (途中で失敗した場合はそのバージョンを記録しない)
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.now(timezone.utc).isoformat(),
+                ))
+        except IntegrityError:
+            # 複数ワーカーが同時に起動し、別プロセスが先に同じバージョンを適用した
+            logger.info("Migration %04d already applied by another process", migration.version)
+            continue
+        logger.info("Applied migration %04d_%s", migration.version, migration.name)
+        applied.append(migration.version)
+    return applied
+
+
+# --- マイグレーションスクリプト用のヘルパー ---
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return False
+    return any(c["name"] == column for c in inspector.get_columns(table))
+
+
+def create_index(conn: Connection, name: str, table: str, *columns: str, unique: bool = False) -> None:
+    """CREATE INDEX IF NOT EXISTS (SQLite / PostgreSQL 共通)"""
+    quote = conn.dialect.identifier_preparer.quote
+    cols = ", ".join(quote(c) for c in columns)
+    unique_sql = "UNIQUE " if unique else ""
+    conn.exec_driver_sql(f"CREATE {unique_sql}INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({cols})")
+
+
+def drop_index(conn: Connection, name: str) -> None:
+    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {conn.dialect.identifier_preparer.quote(name)}")
+
+
+def _convert_default(conn: Connection, default: str | None, type_: TypeEngine, convert: Callable[[Any], Any]) -> str | None:
+    """反映した既定値 (SQL の式) を `convert` で変換し、新しい型の SQL リテラルにする。定数でなければ None"""
+    if default is None:
+        return None
+    # 文字列 ('...'、PostgreSQL は '...'::text) か数値の定数だけを扱う (CURRENT_TIMESTAMP などの式は変換できない)
+    quoted = re.fullmatch(r"'((?:[^']|'')*)'(?:::[\w ]+)?", default.strip())
+    if quoted:
+        value: Any = quoted.group(1).replace("''", "'")
+    elif re.fullmatch(r"-?\d+", default.strip()):
+        value = int(default)
+    else:
+        return None
+    try:
+        value = convert(value)
+    except ValueError:
+        return None
+    if value is None:
+        return None
+    return str(literal(value, type_).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def convert_column(
+    conn: Connection,
+    table: str,
+    column: str,
+    type_: TypeEngine,
+    convert: Callable[[Any], Any],
+) -> bool:
+    """
+    列の型を変更し、既存の値を Python の `convert` で変換する (SQLite 3.35+ / PostgreSQL 共通)。
+
+    新しい列を追加して値を移し、元の列を削除してから改名する。元の列に張られていたインデックスと、
+    定数の既定値 (`convert` で変換する) は引き継ぐ。NOT NULL も引き継ぐが、SQLite は既定値の無い
+    NOT NULL の列を ADD COLUMN できないため、既定値が無い (変換できない) 場合は NULL 可になる (警告を出す)。
+    列が無い、または既に `type_` と同じ種類の型であれば何もせず False を返す。
+    `convert` が ValueError を送出した値は NULL (既定値があれば既定値) になる。
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return False
+    # SQLite の列名は大文字小文字を区別しない (旧DDLの Timestamp など)
+    existing = next((c for c in inspector.get_columns(table) if c["name"].lower() == column.lower()), None)
+    if existing is None or isinstance(existing["type"], type_._type_affinity):
+        return False
+
+    quote = conn.dialect.identifier_preparer.quote
+    old, new = existing["name"], f"{column}__new"
+    indexes = [ix for ix in inspector.get_indexes(table)
+               if old.lower() in (c.lower() for c in ix["column_names"] if c)]
+    for ix in indexes:
+        drop_index(conn, ix["name"])
+
+    column_sql = type_.compile(dialect=conn.dialect)
+    default = _convert_default(conn, existing["default"], type_, convert)
+    if default is not None:
+        column_sql += f" DEFAULT {default}"
+    elif existing["default"] is not None:
+        logger.warning("%s.%s: could not convert default %s, dropping it", table, old, existing["default"])
+    sqlite = conn.dialect.name == "sqlite"
+    if not existing["nullable"] and sqlite:
+        if default is not None:
+            column_sql += " NOT NULL"
+        else:
+            logger.warning("%s.%s: SQLite cannot add a NOT NULL column without a default, dropping NOT NULL",
+                           table, old)
+    conn.exec_driver_sql(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(new)} {column_sql}")
+    # 値ごとの UPDATE ... WHERE old = :old が全件走査にならないよう、移し終えるまで一時的なインデックスを張る
+    # (無いと件数の2乗に比例して遅くなり、起動時のマイグレーションでワーカーが止まる)
+    backfill_index = f"ix_{table}_{column}__convert"
+    create_index(conn, backfill_index, table, old)
+    values = conn.exec_driver_sql(
+        f"SELECT DISTINCT {quote(old)} FROM {quote(table)} WHERE {quote(old)} IS NOT NULL"
+    ).scalars().all()
+    params = []
+    for value in values:
+        try:
+            params.append({"old": value, "new": convert(value)})
+        except ValueError:
+            logger.warning("%s.%s: could not convert %r, storing NULL", table, old, value)
+    if params:
+        conn.execute(
+            text(f"UPDATE {quote(table)} SET {quote(new)} = :new WHERE {quote(old)} = :old"), params
+        )
+    drop_index(conn, backfill_index)
+    conn.exec_driver_sql(f"ALTER TABLE {quote(table)} DROP COLUMN {quote(old)}")
+    conn.exec_driver_sql(f"ALTER TABLE {quote(table)} RENAME COLUMN {quote(new)} TO {quote(column)}")
+    if not existing["nullable"] and not sqlite:
+        # SQLite は ADD COLUMN の時点で付けている (ALTER COLUMN が無いため)
+        conn.exec_driver_sql(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} SET NOT NULL")
+
+    for ix in indexes:
+        columns = [column if c and c.lower() == old.lower() else c for c in ix["column_names"]]
+        create_index(conn, ix["name"], table, *columns, unique=bool(ix.get("unique")))
+    return True
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from db.session import engine
+
+    if "--status" in sys.argv[1:]:
+        done = applied_versions(engine)
+        for m in load_migrations():
+            mark = "x" if m.version in done else " "
+            print(f"[{mark}] {m.version:04d}_{m.name}: {m.description}")
+    else:
+        versions = upgrade(engine)
+        print(f"適用したマイグレーション: {versions or 'なし'} (現在のバージョン: {current_version(engine)})")
@@ -0,0 +1,13 @@
+"""
+旧 db/create_database.py で作成した DB では ItemAdditionRequests の主キーが
+`AddReq_id` という名前になっており、ORM (`add_req_id`) とずれている。
+(他の列は大文字小文字の違いのみで、SQLite では同一視されるため変更不要)
+"""
+from db.migrate import has_column
+
+DESCRIPTION = "Rename ItemAdditionRequests.AddReq_id to add_req_id"
+
+
+def upgrade(conn):
+    if has_column(conn, "ItemAdditionRequests", "AddReq_id"):
+        conn.exec_driver_sql('ALTER TABLE "ItemAdditionRequests" RENAME COLUMN "AddReq_id" TO "add_req_id"')
@@ -0,0 +1,21 @@
+"""
+外部キー列のインデックス。JOIN や親行の削除時に子テーブルの全件走査を避ける。
+インデックス名は db/models.py の `index=True` が生成する名前 (ix_<table>_<column>) と揃えている。
+"""
+from db.migrate import create_index
+
+DESCRIPTION = "Add indexes on foreign key columns"
+
+FOREIGN_KEYS = [
+    ("Support_Request", "community_id"),
+    ("Support_Request", "request_content_id"),
+    ("Request_content", "items_id"),
+    ("Shelter", "community_id"),
+    ("Communities", "member_id"),
+    ("ItemAdditionRequests", "community_id"),
+]
+
+
+def upgrade(conn):
+    for table, column in FOREIGN_KEYS:
+        create_index(conn, f"ix_{table}_{column}", table, column)
@@ -0,0 +1,11 @@
+"""
+支援要請の絞り込み (status) と、行政ダッシュボードの並び替え (created_at) 用のインデックス。
+"""
+from db.migrate import create_index
+
+DESCRIPTION = "Add Support_Request status and created_at indexes"
+
+
+def upgrade(conn):
+    create_index(conn, "ix_Support_Request_status", "Support_Request", "status")
+    create_index(conn, "ix_Support_Request_created_at", "Support_Request", "created_at")
@@ -0,0 +1,11 @@
+"""
+品目名・カテゴリでの一覧の絞り込み (行政ダッシュボードの品目別表示を含む) 用のインデックス。
+"""
+from db.migrate import create_index
+
+DESCRIPTION = "Add Items item_name and category indexes"
+
+
+def upgrade(conn):
+    create_index(conn, "ix_Items_item_name", "Items", "item_name")
+    create_index(conn, "ix_Items_category", "Items", "category")
@@ -0,0 +1,32 @@
+"""
+日時の列を TEXT (書式の混在した ISO 文字列) から BIGINT (UTC エポックミリ秒) に変換する。
+タイムゾーンの無い値は JST とみなす (db/timestamps.py と同じ規則)。
+期限切れトークンの削除用に TokenBlacklist.expires_at にもインデックスを張る。
+"""
+from sqlalchemy import BigInteger
+
+from db.migrate import convert_column, create_index
+from db.timestamps import to_millis
+
+DESCRIPTION = "Store timestamps as epoch milliseconds (BIGINT)"
+
+TIMESTAMP_COLUMNS = [
+    ("Special_notes", "created_at"),
+    ("Shelter_info", "created_at"),
+    ("Credential", "created_at"),
+    ("Members", "created_at"),
+    ("Request_content", "created_at"),
+    ("Communities", "created_at"),
+    ("Shelter", "created_at"),
+    ("Support_Request", "created_at"),
+    ("ItemAdditionRequests", "timestamp"),
+    ("GovUser", "created_at"),
+    ("TokenBlacklist", "blacklisted_at"),
+    ("TokenBlacklist", "expires_at"),
+]
+
+
+def upgrade(conn):
+    for table, column in TIMESTAMP_COLUMNS:
+        convert_column(conn, table, column, BigInteger(), to_millis)
+    create_index(conn, "ix_TokenBlacklist_expires_at", "TokenBlacklist", "expires_at")
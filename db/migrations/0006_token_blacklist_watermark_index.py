@@ -0,0 +1,10 @@
+"""
+失効トークンのキャッシュ (app/core/revocation.py) が blacklisted_at 以降の差分だけを読み込むためのインデックス。
+"""
+from db.migrate import create_index
+
+DESCRIPTION = "Add TokenBlacklist blacklisted_at index"
+
+
+def upgrade(conn):
+    create_index(conn, "ix_TokenBlacklist_blacklisted_at", "TokenBlacklist", "blacklisted_at")
@@ -0,0 +1,51 @@
+"""
+TokenBlacklist をトークン全体 (TEXT, UNIQUE + 重複インデックス) ではなく、
+16バイトの jti を主キーとする表 (SQLite では WITHOUT ROWID) に作り直す。
+
+既存の行は jti を持たないため、トークン全体の SHA-256 の先頭16バイトをキーにする
+(app/core/revocation.revocation_key が jti の無いトークンに使うキーと同じ)。
+"""
+import hashlib
+import logging
+
+from sqlalchemy import BigInteger, Column, Index, LargeBinary, MetaData, Table, inspect
+
+from db.migrate import has_column
+
+DESCRIPTION = "Key TokenBlacklist by 16-byte jti"
+
+logger = logging.getLogger(__name__)
+
+
+def _table(metadata: MetaData) -> Table:
+    return Table(
+        "TokenBlacklist",
+        metadata,
+        Column("jti", LargeBinary(16), primary_key=True),
+        Column("blacklisted_at", BigInteger, nullable=False),
+        Column("expires_at", BigInteger, nullable=False),
+        Index("ix_TokenBlacklist_blacklisted_at", "blacklisted_at"),
+        Index("ix_TokenBlacklist_expires_at", "expires_at"),
+        sqlite_with_rowid=False,
+    )
+
+
+def upgrade(conn):
+    if not inspect(conn).has_table("TokenBlacklist") or has_column(conn, "TokenBlacklist", "jti"):
+        return  # 新規DB (models.py から作成済み)
+
+    rows = {}
+    for token, blacklisted_at, expires_at in conn.exec_driver_sql(
+        'SELECT token, blacklisted_at, expires_at FROM "TokenBlacklist"'
+    ):
+        if expires_at is None:
+            logger.warning("TokenBlacklist: dropping a row without expires_at")
+            continue
+        key = hashlib.sha256(token.encode("utf-8")).digest()[:16]
+        rows[key] = {"jti": key, "blacklisted_at": blacklisted_at or expires_at, "expires_at": expires_at}
+
+    conn.exec_driver_sql('DROP TABLE "TokenBlacklist"')
+    table = _table(MetaData())
+    table.create(conn)
+    if rows:
+        conn.execute(table.insert(), list(rows.values()))
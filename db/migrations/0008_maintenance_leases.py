@@ -0,0 +1,10 @@
+"""
+定期メンテナンス (db/maintenance.py) のジョブごとのリースと前回の実行時刻を記録するテーブル。
+"""
+from db.maintenance import maintenance_leases
+
+DESCRIPTION = "Add maintenance_leases table"
+
+
+def upgrade(conn):
+    maintenance_leases.create(conn, checkfirst=True)
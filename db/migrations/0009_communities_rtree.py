@@ -0,0 +1,51 @@
+"""
+/gnss/nearby の絞り込み用に、Communities の緯度・経度を持つ R-tree 仮想テーブルを作成する (SQLite のみ)。
+Communities への INSERT / UPDATE / DELETE はトリガーで R-tree に反映されるため、CRUD 側の変更は不要。
+緯度・経度のどちらかが NULL の行は R-tree に入れない (位置による検索の対象外)。
+"""
+DESCRIPTION = "Add Communities R-tree spatial index (SQLite)"
+
+STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS "Communities_rtree" USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "Communities_rtree_insert" AFTER INSERT ON "Communities"
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+    BEGIN
+        INSERT OR REPLACE INTO "Communities_rtree"
+        VALUES (NEW.community_id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "Communities_rtree_update"
+    AFTER UPDATE OF community_id, latitude, longitude ON "Communities"
+    BEGIN
+        DELETE FROM "Communities_rtree" WHERE id = OLD.community_id;
+        INSERT INTO "Communities_rtree"
+        SELECT NEW.community_id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "Communities_rtree_delete" AFTER DELETE ON "Communities"
+    BEGIN
+        DELETE FROM "Communities_rtree" WHERE id = OLD.community_id;
+    END
+    """,
+    # 既存の行を登録する
+    """
+    INSERT OR REPLACE INTO "Communities_rtree"
+    SELECT community_id, latitude, latitude, longitude, longitude FROM "Communities"
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """,
+]
+
+
+def upgrade(conn):
+    if conn.dialect.name != "sqlite":
+        return  # R-tree の無い DB では緯度・経度の列に対する範囲条件で絞り込む (db/geo.py)
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
@@ -0,0 +1,158 @@
+"""
+地図のクラスタ表示 (GET /api/v1/gnss/clusters) 用に、ズームレベルごとの格子のセル単位で
+コミュニティ数・緯度経度の合計・未対応の支援要請数を持つ `community_clusters` を作成する (SQLite のみ)。
+
+Communities と Support_Request への INSERT / UPDATE / DELETE はトリガーで該当するセルだけに反映される
+(1コミュニティあたりズームレベルの数だけの行を更新する)。セルの計算は db/clusters.py と同じ。
+"""
+DESCRIPTION = "Add incrementally maintained community_clusters (SQLite)"
+
+# db/clusters.py の CELLS_PER_TILE / MAX_CLUSTER_ZOOM / OPEN_REQUEST_STATUSES と同じ値
+CELLS_PER_TILE = 4
+MAX_CLUSTER_ZOOM = 16
+OPEN = "('pending', 'processing')"
+
+
+def _cells(ref: str) -> str:
+    """コミュニティ (NEW / OLD / c) の位置を含む、全ズームレベルのセル (zoom, cell_x, cell_y)"""
+    return f"""
+        SELECT l.zoom,
+               CAST(({ref}.longitude + 180) / l.cell_deg AS INTEGER),
+               CAST(({ref}.latitude + 90) / l.cell_deg AS INTEGER)
+        FROM community_cluster_levels l
+    """
+
+
+def _open_requests(community_id: str) -> str:
+    return f"""(SELECT count(*) FROM "Support_Request" WHERE community_id = {community_id} AND status IN {OPEN})"""
+
+
+def _add_community(ref: str) -> str:
+    return f"""
+        INSERT INTO community_clusters (zoom, cell_x, cell_y, count, sum_lat, sum_lon, open_requests)
+        SELECT cells.*, 1, {ref}.latitude, {ref}.longitude, {_open_requests(f"{ref}.community_id")}
+        FROM ({_cells(ref)}) AS cells
+        WHERE {ref}.latitude IS NOT NULL AND {ref}.longitude IS NOT NULL
+        ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+            count = count + excluded.count,
+            sum_lat = sum_lat + excluded.sum_lat,
+            sum_lon = sum_lon + excluded.sum_lon,
+            open_requests = open_requests + excluded.open_requests;
+    """
+
+
+def _remove_community(ref: str) -> str:
+    return f"""
+        UPDATE community_clusters SET
+            count = count - 1,
+            sum_lat = sum_lat - {ref}.latitude,
+            sum_lon = sum_lon - {ref}.longitude,
+            open_requests = open_requests - {_open_requests(f"{ref}.community_id")}
+        WHERE {ref}.latitude IS NOT NULL AND {ref}.longitude IS NOT NULL
+          AND (zoom, cell_x, cell_y) IN ({_cells(ref)});
+        DELETE FROM community_clusters
+        WHERE count <= 0 AND (zoom, cell_x, cell_y) IN ({_cells(ref)});
+    """
+
+
+def _add_open_request(community_id: str, delta: int) -> str:
+    """コミュニティの位置のセルの未対応の支援要請数を delta だけ変える"""
+    cells = _cells("c") + f"""
+        JOIN "Communities" c ON c.community_id = {community_id}
+        WHERE c.latitude IS NOT NULL AND c.longitude IS NOT NULL
+    """
+    return f"""
+        UPDATE community_clusters SET open_requests = open_requests + ({delta})
+        WHERE (zoom, cell_x, cell_y) IN ({cells});
+    """
+
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS community_cluster_levels (
+        zoom INTEGER PRIMARY KEY,
+        cell_deg REAL NOT NULL
+    )
+    """,
+    *(
+        f"INSERT OR REPLACE INTO community_cluster_levels VALUES ({zoom}, {360.0 / (2 ** zoom * CELLS_PER_TILE)!r})"
+        for zoom in range(MAX_CLUSTER_ZOOM + 1)
+    ),
+    """
+    CREATE TABLE IF NOT EXISTS community_clusters (
+        zoom INTEGER NOT NULL,
+        cell_x INTEGER NOT NULL,
+        cell_y INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        sum_lat REAL NOT NULL,
+        sum_lon REAL NOT NULL,
+        open_requests INTEGER NOT NULL,
+        PRIMARY KEY (zoom, cell_x, cell_y)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_clusters_community_insert AFTER INSERT ON "Communities"
+    BEGIN
+        {_add_community("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_clusters_community_update
+    AFTER UPDATE OF community_id, latitude, longitude ON "Communities"
+    BEGIN
+        {_remove_community("OLD")}
+        {_add_community("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_clusters_community_delete AFTER DELETE ON "Communities"
+    BEGIN
+        {_remove_community("OLD")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_clusters_request_insert AFTER INSERT ON "Support_Request"
+    WHEN NEW.status IN {OPEN}
+    BEGIN
+        {_add_open_request("NEW.community_id", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_clusters_request_update
+    AFTER UPDATE OF community_id, status ON "Support_Request"
+    BEGIN
+        {_add_open_request("OLD.community_id", f"-coalesce(OLD.status IN {OPEN}, 0)")}
+        {_add_open_request("NEW.community_id", f"coalesce(NEW.status IN {OPEN}, 0)")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS community_clusters_request_delete AFTER DELETE ON "Support_Request"
+    WHEN OLD.status IN {OPEN}
+    BEGIN
+        {_add_open_request("OLD.community_id", -1)}
+    END
+    """,
+    # 既存の行を集計する
+    f"""
+    INSERT OR REPLACE INTO community_clusters (zoom, cell_x, cell_y, count, sum_lat, sum_lon, open_requests)
+    SELECT l.zoom,
+           CAST((c.longitude + 180) / l.cell_deg AS INTEGER) AS cx,
+           CAST((c.latitude + 90) / l.cell_deg AS INTEGER) AS cy,
+           count(*), sum(c.latitude), sum(c.longitude), coalesce(sum(r.open_requests), 0)
+    FROM community_cluster_levels l
+    CROSS JOIN "Communities" c
+    LEFT JOIN (
+        SELECT community_id, count(*) AS open_requests FROM "Support_Request"
+        WHERE status IN {OPEN} GROUP BY community_id
+    ) r ON r.community_id = c.community_id
+    WHERE c.latitude IS NOT NULL AND c.longitude IS NOT NULL
+    GROUP BY l.zoom, cx, cy
+    """,
+]
+
+
+def upgrade(conn):
+    if conn.dialect.name != "sqlite":
+        return  # トリガーの無い DB では Communities をその場で集計する (db/clusters.py)
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
@@ -0,0 +1,49 @@
+"""
+TokenBlacklist を、追加した順の通し番号 (seq) を主キーとする表に作り直す (jti は一意インデックス)。
+
+失効トークンのキャッシュ (app/core/revocation.py) の差分読み込みは blacklisted_at (アプリ側の時刻) を基準にしていたため、
+コミットが遅れた行や時計の遅れたワーカーが書いた行を読み落とすことがあった。
+seq は DB が採番し (SQLite は AUTOINCREMENT、PostgreSQL はシーケンス)、削除した番号を再利用しない。
+既存の行には blacklisted_at の順に番号を振る。blacklisted_at のインデックス (0006) は不要になるため削除する。
+"""
+from sqlalchemy import BigInteger, Column, Index, Integer, LargeBinary, MetaData, Table, inspect
+
+from db.migrate import drop_index
+
+DESCRIPTION = "Key TokenBlacklist by an autoincrement sequence"
+
+
+def _table(metadata: MetaData) -> Table:
+    return Table(
+        "TokenBlacklist",
+        metadata,
+        Column("seq", Integer, primary_key=True, autoincrement=True),
+        Column("jti", LargeBinary(16), nullable=False),
+        Column("blacklisted_at", BigInteger, nullable=False),
+        Column("expires_at", BigInteger, nullable=False),
+        Index("ix_TokenBlacklist_jti", "jti", unique=True),
+        Index("ix_TokenBlacklist_expires_at", "expires_at"),
+        sqlite_autoincrement=True,
+    )
+
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    if not inspector.has_table("TokenBlacklist"):
+        return
+    # 新規DB (models.py から作成済み) でも、0006 で作られた blacklisted_at のインデックスは消す
+    drop_index(conn, "ix_TokenBlacklist_blacklisted_at")
+    if inspector.get_pk_constraint("TokenBlacklist")["constrained_columns"] == ["seq"]:
+        return
+
+    rows = conn.exec_driver_sql(
+        'SELECT jti, blacklisted_at, expires_at FROM "TokenBlacklist" ORDER BY blacklisted_at, jti'
+    ).all()
+    conn.exec_driver_sql('DROP TABLE "TokenBlacklist"')
+    table = _table(MetaData())
+    table.create(conn)
+    if rows:
+        conn.execute(table.insert(), [
+            {"seq": seq, "jti": jti, "blacklisted_at": blacklisted_at, "expires_at": expires_at}
+            for seq, (jti, blacklisted_at, expires_at) in enumerate(rows, start=1)
+        ])
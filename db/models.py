@@ -1,13 +1,14 @@
-from sqlalchemy import Column, Integer, REAL, TEXT, ForeignKey
+from sqlalchemy import Column, Integer, LargeBinary, REAL, TEXT, ForeignKey
 from sqlalchemy.orm import relationship
 from db.session import Base
+from db.timestamps import EpochMillis
 
 # 1. Special_notes (依存先なし)
 class SpecialNotes(Base):
     __tablename__ = "Special_notes"
     special_notes_id = Column(Integer, primary_key=True, index=True)
     notes_content_json = Column(TEXT)
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Membersテーブルから参照される
     member = relationship("Members", back_populates="special_notes")
@@ -16,9 +17,9 @@ class SpecialNotes(Base):
 class Items(Base):
     __tablename__ = "Items"
     items_id = Column(Integer, primary_key=True, index=True)
-    item_name = Column(TEXT)
+    item_name = Column(TEXT, index=True)
     unit = Column(TEXT)
-    category = Column(TEXT)
+    category = Column(TEXT, index=True)
     description = Column(TEXT)
     
     # 関連: Request_contentテーブルから参照される
@@ -31,7 +32,7 @@ class ShelterInfo(Base):
     latitude = Column(REAL)
     longitude = Column(REAL)
     notes = Column(TEXT)
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Shelterテーブルから参照される
     shelter = relationship("Shelter", back_populates="info")
@@ -41,7 +42,7 @@ class Credential(Base):
     __tablename__ = "Credential"
     credential_id = Column(Integer, primary_key=True, index=True)
     hashed_password = Column(TEXT, nullable=False)
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Communitiesテーブルから参照される
     community = relationship("Communities", back_populates="credential")
@@ -53,7 +54,7 @@ class Members(Base):
     __tablename__ = "Members"
     member_id = Column(Integer, primary_key=True, index=True)
     special_notes_id = Column(Integer, ForeignKey("Special_notes.special_notes_id"))
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Special_notes へ
     special_notes = relationship("SpecialNotes", back_populates="member")
@@ -64,10 +65,10 @@ class Members(Base):
 class RequestContent(Base):
     __tablename__ = "Request_content"
     request_content_id = Column(Integer, primary_key=True, index=True)
-    items_id = Column(Integer, ForeignKey("Items.items_id"))
+    items_id = Column(Integer, ForeignKey("Items.items_id"), index=True)
     other_note = Column(TEXT)
     number = Column(Integer)
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Items へ
     item = relationship("Items", back_populates="request_contents")
@@ -78,13 +79,13 @@ class RequestContent(Base):
 class Communities(Base):
     __tablename__ = "Communities"
     community_id = Column(Integer, primary_key=True, index=True)
-    member_id = Column(Integer, ForeignKey("Members.member_id"))
+    member_id = Column(Integer, ForeignKey("Members.member_id"), index=True)
     credential_id = Column(Integer, ForeignKey("Credential.credential_id"), nullable=False, unique=True)
     name = Column(TEXT)
     latitude = Column(REAL)
     longitude = Column(REAL)
     member_count = Column(Integer)
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Members へ
     member = relationship("Members", back_populates="community")
@@ -101,8 +102,8 @@ class Shelter(Base):
     __tablename__ = "Shelter"
     shelter_id = Column(Integer, primary_key=True, index=True)
     shelter_info = Column(Integer, ForeignKey("Shelter_info.shelter_info"))
-    community_id = Column(Integer, ForeignKey("Communities.community_id"))
-    created_at = Column(TEXT)
+    community_id = Column(Integer, ForeignKey("Communities.community_id"), index=True)
+    created_at = Column(EpochMillis)
     
     # 関連: ShelterInfo と Communities へ
     info = relationship("ShelterInfo", back_populates="shelter")
@@ -112,10 +113,10 @@ class Shelter(Base):
 class SupportRequest(Base):
     __tablename__ = "Support_Request"
     request_id = Column(Integer, primary_key=True, index=True)
-    community_id = Column(Integer, ForeignKey("Communities.community_id"))
-    request_content_id = Column(Integer, ForeignKey("Request_content.request_content_id"))
-    status = Column(TEXT)
-    created_at = Column(TEXT)
+    community_id = Column(Integer, ForeignKey("Communities.community_id"), index=True)
+    request_content_id = Column(Integer, ForeignKey("Request_content.request_content_id"), index=True)
+    status = Column(TEXT, index=True)
+    created_at = Column(EpochMillis, index=True)  # 行政ダッシュボードの並び替えに使用
     
     # 関連: Communities と Request_content へ
     community = relationship("Communities", back_populates="support_requests")
@@ -126,11 +127,11 @@ class SupportRequest(Base):
 class ItemAdditionRequests(Base):
     __tablename__ = "ItemAdditionRequests"
     add_req_id = Column(Integer, primary_key=True, index=True)
-    community_id = Column(Integer, ForeignKey("Communities.community_id"), nullable=False)
+    community_id = Column(Integer, ForeignKey("Communities.community_id"), nullable=False, index=True)
     item_name = Column(TEXT, nullable=False)
     item_unit = Column(TEXT)
     reason = Column(TEXT)
-    timestamp = Column(TEXT, nullable=False)
+    timestamp = Column(EpochMillis, nullable=False)
 
     # 関連: Communities へ
     community = relationship("Communities", back_populates="item_addition_requests")
@@ -144,7 +145,7 @@ class GovUser(Base):
     email = Column(TEXT)
     full_name = Column(TEXT)
     is_active = Column(Integer, default=1)  # SQLiteではBooleanの代わりにInteger
-    created_at = Column(TEXT)
+    created_at = Column(EpochMillis)
     
     # 関連: Credential へ
     credential = relationship("Credential", back_populates="gov_user")
@@ -152,7 +153,11 @@ class GovUser(Base):
 # 10. TokenBlacklist (依存先なし)
 class TokenBlacklist(Base):
     __tablename__ = "TokenBlacklist"
-    id = Column(Integer, primary_key=True, index=True)
-    token = Column(TEXT, unique=True, nullable=False, index=True)
-    blacklisted_at = Column(TEXT, nullable=False)
-    expires_at = Column(TEXT, nullable=False)  # トークンの有効期限
\ No newline at end of file
+    # seq は削除した番号を再利用しない (SQLite は AUTOINCREMENT、PostgreSQL はシーケンス)
+    __table_args__ = {"sqlite_autoincrement": True}
+    # 追加した順の通し番号。失効キャッシュ (app/core/revocation.py) の差分読み込みに使用
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    # トークンの jti (app/core/revocation.revocation_key)
+    jti = Column(LargeBinary(16), nullable=False, unique=True, index=True)
+    blacklisted_at = Column(EpochMillis, nullable=False)
+    expires_at = Column(EpochMillis, nullable=False, index=True)  # トークンの有効期限 (期限切れの削除に使用)
\ No newline at end of file
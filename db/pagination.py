@@ -0,0 +1,121 @@
+import base64
+import json
+from typing import Any, Optional, Sequence, Union
+
+from sqlalchemy import and_, literal, tuple_
+from sqlalchemy.orm import Query
+
+
+class InvalidCursor(ValueError):
+    """クライアントから渡されたカーソルが不正 (app/main.py で 400 に変換される)"""
+
+
+class Page(list):
+    """
+    1ページ分の結果。通常の list として扱えるほか、次ページのカーソルを `next_cursor` に持つ
+    (最後のページでは None)。
+    """
+
+    def __init__(self, rows: Sequence[Any] = (), next_cursor: Optional[str] = None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """キー列の値を不透明なカーソル文字列にする"""
+    raw = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid pagination cursor")
+    return values
+
+
+def _nullable(key) -> bool:
+    """NULL を取りうる列か (主キー・NOT NULL の列は False)"""
+    return getattr(getattr(key, "expression", key), "nullable", True)
+
+
+def _order_by(key, desc: bool, nullable: bool):
+    """NULL を取りうる列は向きによらず NULL を最後に並べる (SQLite と PostgreSQL で既定の位置が異なるため明示する)"""
+    term = key.desc() if desc else key.asc()
+    return term.nulls_last() if nullable else term
+
+
+def _after(keys: Sequence, values: Sequence, directions: Sequence[bool]) -> list:
+    """
+    並び順でカーソル位置より後ろにある行の条件。互いに重ならない条件を並び順のとおりに並べたリストを返す
+    (前の条件に当たる行が全て、後の条件に当たる行より前に並ぶ)。
+    """
+    nullable = [_nullable(key) for key in keys]
+    # 列の型でバインドする (行値比較では各要素の型が推論されないため。日時列の変換などに必要)
+    bound = [None if value is None else literal(value, key.type) for key, value in zip(keys, values)]
+    if not any(nullable) and len(set(directions)) == 1:
+        # (a, b) > (x, y) の行値比較 (SQLite 3.15+ / PostgreSQL でインデックス範囲検索になる)
+        columns = tuple_(*keys) if len(keys) > 1 else keys[0]
+        bound = tuple_(*bound) if len(keys) > 1 else bound[0]
+        return [columns < bound if directions[0] else columns > bound]
+    # 昇順・降順の混在や NULL を取りうる列がある場合は、最後の列から順に
+    #   (a = x AND b < y), (a = x AND b IS NULL), (a > x), (a IS NULL)
+    # のように分ける。OR でまとめるとインデックスの順に読めず全件を並べ替えることになり、
+    # 行値比較は NULL を含む行を落とすため、条件ごとに別のクエリとして順に読む (NULL は最後に並ぶ)
+    branches = []
+    for i in reversed(range(len(keys))):
+        if values[i] is None:
+            continue  # カーソルの値が NULL なら、この列で後ろにある行は無い (NULL 同士は同順位)
+        prefix = [key.is_(None) if value is None else key == value for key, value in zip(keys[:i], bound[:i])]
+        key, value = keys[i], bound[i]
+        branches.append(and_(*prefix, key < value if directions[i] else key > value))
+        if nullable[i]:
+            branches.append(and_(*prefix, key.is_(None)))
+    return branches
+
+
+def paginate(
+    query: Query,
+    keys: Sequence,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    cursor: Optional[str] = None,
+    descending: Union[bool, Sequence[bool]] = False,
+) -> Page:
+    """
+    キーセット (カーソル) 方式でページングする。
+
+    `keys` は一意になる列の組 (主キー、または (created_at, 主キー) など) で、この順に並べ替える。
+    cursor が指定された場合は「前ページ最後の行より後」をインデックスで直接探すため、
+    OFFSET のように読み飛ばす行数に比例して遅くならない。
+    cursor が無い場合は従来どおり skip (OFFSET) を使う。limit が None の場合は全件返す。
+    `descending` はキーごとに指定することもできる。
+    NULL を取りうる列は向きによらず NULL を最後に並べ、カーソルには NULL をそのまま (JSON の null) 記録する。
+    """
+    directions = [descending] * len(keys) if isinstance(descending, bool) else list(descending)
+    query = query.order_by(*[_order_by(key, desc, _nullable(key)) for key, desc in zip(keys, directions)])
+
+    if cursor:
+        queries = [query.filter(branch) for branch in _after(keys, decode_cursor(cursor, len(keys)), directions)]
+    else:
+        queries = [query.offset(skip) if skip else query]
+
+    rows = []
+    for part in queries:
+        if limit is None:
+            rows += part.all()
+            continue
+        # 1件多く取得して、次のページがあるかを判定する
+        rows += part.limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+
+    if limit is None or len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor([getattr(last, key.key) for key in keys]))
@@ -0,0 +1,140 @@
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Generic, Iterator, Optional, Sequence, Type, TypeVar, Union
+
+from pydantic import BaseModel
+from sqlalchemy import Row, delete, event, insert, update
+from sqlalchemy.orm import Session
+
+from db.filters import FilterSpec
+from db.pagination import paginate
+from db.session import Base
+from db.timestamps import now_iso
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=Base)
+CreateSchemaT = TypeVar("CreateSchemaT", bound=BaseModel)
+
+_UOW_DEPTH = "unit_of_work_depth"
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """
+    複数行の書き込みを1トランザクション・1回のコミットにまとめる。
+
+        with unit_of_work(db):
+            credential = credentials.create(db, ...)   # コミットせず flush のみ
+            communities.create(db, {..., "credential_id": credential.credential_id})
+
+    ブロック内のリポジトリの書き込みはコミットせず、ブロックを抜けた時点で1回だけコミットする。
+    例外が発生した場合はロールバックする。入れ子にした場合は最も外側でコミットする。
+    """
+    depth = db.info.get(_UOW_DEPTH, 0)
+    db.info[_UOW_DEPTH] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except BaseException:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[_UOW_DEPTH] = depth
+
+
+def commit(db: Session) -> None:
+    """unit_of_work の外であればコミットし、内側であれば flush だけ行う"""
+    if db.info.get(_UOW_DEPTH, 0):
+        db.flush()
+    else:
+        db.commit()
+
+
+def after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """
+    書き込みがコミットされた後に callback を呼ぶ (ロールバックされた場合は呼ばない)。
+    unit_of_work の内側で登録した場合も、最も外側のコミットの後に呼ばれる。
+    """
+    db.info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(db: Session) -> None:
+    for callback in db.info.pop(_AFTER_COMMIT, ()):
+        try:
+            callback()
+        except Exception:  # コミット済みの書き込みを失敗として扱わない
+            logger.exception("after_commit callback failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(db: Session) -> None:
+    db.info.pop(_AFTER_COMMIT, None)
+
+
+class CRUDRepository(Generic[ModelT, CreateSchemaT]):
+    """
+    単一主キーのテーブルに対する汎用 CRUD。
+    書き込みは INSERT / UPDATE / DELETE ... RETURNING の1文で行い、
+    commit 後の refresh (追加の SELECT) や更新前の読み込みを行わない。
+    書き込み系は ORM オブジェクトではなく、全カラムを持つ Row を返す。
+    """
+
+    def __init__(self, model: Type[ModelT], filters: Optional[FilterSpec] = None):
+        self.model = model
+        self.table = model.__table__
+        (self.pk,) = self.table.primary_key.columns
+        self.columns = tuple(self.table.c)
+        # 一覧で許可するフィルタ・並び替え (既定は主キーのみ)
+        self.filters = filters or FilterSpec(getattr(model, self.pk.key))
+
+    def _values(self, obj_in: Union[CreateSchemaT, dict], exclude_unset: bool = False) -> dict[str, Any]:
+        data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=exclude_unset)
+        # テーブルに存在しないキー (password など) は書き込まない
+        return {key: value for key, value in data.items() if key in self.table.c}
+
+    def get(self, db: Session, id: Any) -> Optional[ModelT]:
+        return db.get(self.model, id)
+
+    def list(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        cursor: Optional[str] = None,
+        filters: Sequence[tuple[str, str]] = (),
+    ):
+        """`filters` はクエリパラメータの (名前, 値) の列。許可リストは self.filters"""
+        compiled = self.filters.compile(filters)
+        return paginate(db.query(self.model).filter(*compiled.where), compiled.keys,
+                        skip=skip, limit=limit, cursor=cursor, descending=compiled.descending)
+
+    def create(self, db: Session, obj_in: Union[CreateSchemaT, dict]) -> Row:
+        values = self._values(obj_in)
+        if "created_at" in self.table.c and not values.get("created_at"):
+            values["created_at"] = now_iso()
+        row = db.execute(insert(self.model).values(**values).returning(*self.columns)).one()
+        commit(db)
+        return row
+
+    def update(self, db: Session, id: Any, obj_in: Union[CreateSchemaT, dict]) -> Optional[Row]:
+        values = self._values(obj_in, exclude_unset=True)
+        if "updated_at" in self.table.c:
+            values["updated_at"] = now_iso()
+        if not values:
+            # 更新する値が無い場合は存在確認のみ
+            return db.execute(self.table.select().where(self.pk == id)).first()
+        row = db.execute(
+            update(self.model).where(self.pk == id).values(**values).returning(*self.columns)
+        ).first()
+        commit(db)
+        return row
+
+    def delete(self, db: Session, id: Any) -> Optional[Row]:
+        row = db.execute(delete(self.model).where(self.pk == id).returning(*self.columns)).first()
+        commit(db)
+        return row
@@ -1,13 +1,18 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+from typing import Annotated, List, Optional
+
+from db.timestamps import normalize_iso
 
 # SQLAlchemyモデル(ORM)からデータを読み取るための設定
 orm_config = ConfigDict(from_attributes=True)
 
+# 日時: ISO 8601 文字列 (タイムゾーン無しは JST) を受け取り、JST の ISO 文字列に揃える。不正な値は 422
+Timestamp = Annotated[Optional[str], BeforeValidator(normalize_iso)]
+
 # --- 1. SpecialNotes ---
 class SpecialNotesBase(BaseModel):
     notes_content_json: Optional[str] = None
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class SpecialNotesCreate(SpecialNotesBase):
     pass # 作成時も特に必須項目なし
@@ -35,7 +40,7 @@ class ShelterInfoBase(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     notes: Optional[str] = None
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class ShelterInfoCreate(ShelterInfoBase):
     pass # 特殊な要件なし
@@ -47,7 +52,7 @@ class ShelterInfo(ShelterInfoBase):
 # --- 4. Members ---
 class MembersBase(BaseModel):
     special_notes_id: Optional[int] = None
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class MembersCreate(MembersBase):
     pass # 特殊な要件なし
@@ -61,7 +66,7 @@ class RequestContentBase(BaseModel):
     items_id: Optional[int] = None
     other_note: Optional[str] = None
     number: Optional[int] = None
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class RequestContentCreate(RequestContentBase):
     items_id: int # 作成時は必須
@@ -78,7 +83,7 @@ class CommunitiesBase(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     member_count: Optional[int] = None
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class CommunitiesCreate(CommunitiesBase):
     name: str # 作成時は名前を必須とする
@@ -88,12 +93,26 @@ class Communities(CommunitiesBase):
     community_id: int
     credential_id: int
     model_config = orm_config
+
+class CommunityDistance(Communities):
+    """位置情報による検索の結果 (中心からの距離付き)"""
+    distance_km: float
+
+class CommunityCluster(BaseModel):
+    """地図のクラスタ (ズームレベルの格子の1セル)"""
+    zoom: int  # 集計に使ったズームレベル
+    cell_x: int
+    cell_y: int
+    count: int  # セル内のコミュニティ数
+    latitude: float  # セル内のコミュニティの重心
+    longitude: float
+    open_requests: int  # 未対応 (pending / processing) の支援要請数
     
 # --- 7. Shelter ---
 class ShelterBase(BaseModel):
     shelter_info: Optional[int] = None
     community_id: Optional[int] = None
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class ShelterCreate(ShelterBase):
     shelter_info: int # 作成時は必須
@@ -108,7 +127,7 @@ class SupportRequestBase(BaseModel):
     community_id: Optional[int] = None
     request_content_id: Optional[int] = None
     status: Optional[str] = "pending"
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class SupportRequestCreate(SupportRequestBase):
     community_id: int # 作成時は必須
@@ -118,10 +137,30 @@ class SupportRequest(SupportRequestBase):
     request_id: int
     model_config = orm_config
 
+# 一括申請 (カート内の品目をまとめて1トランザクションで登録)
+class SupportRequestBulkLine(BaseModel):
+    items_id: int
+    number: int
+    other_note: Optional[str] = None
+
+class SupportRequestBulkCreate(BaseModel):
+    community_id: int
+    status: Optional[str] = "pending"
+    items: List[SupportRequestBulkLine] = Field(min_length=1)
+
+class SupportRequestBulkCreated(BaseModel):
+    request_id: int
+    request_content_id: int
+    items_id: int
+
+class SupportRequestBulkResult(BaseModel):
+    community_id: int
+    created: List[SupportRequestBulkCreated]
+
 
 # --- 9. Credential ---
 class CredentialBase(BaseModel):
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class CredentialCreate(CredentialBase):
     password: str  # 平文パスワード (ハッシュ化前)
@@ -137,7 +176,7 @@ class GovUserBase(BaseModel):
     email: Optional[str] = None
     full_name: Optional[str] = None
     is_active: Optional[bool] = True
-    created_at: Optional[str] = None
+    created_at: Timestamp = None
 
 class GovUserCreate(GovUserBase):
     password: str  # 平文パスワード (ハッシュ化前)
@@ -154,12 +193,12 @@ class ItemAdditionRequestsBase(BaseModel):
     item_name: Optional[str] = None
     item_unit: Optional[str] = None
     reason: Optional[str] = None
-    timestamp: Optional[str] = None
+    timestamp: Timestamp = None
 
 class ItemAdditionRequestsCreate(ItemAdditionRequestsBase):
     community_id: int
     item_name: str
-    timestamp: str
+    timestamp: Annotated[str, BeforeValidator(normalize_iso)]
 
 class ItemAdditionRequests(ItemAdditionRequestsBase):
     add_req_id: int
@@ -185,4 +224,11 @@ class ValidationRequest(BaseModel):
     password: str
 
 class ValidationResponse(BaseModel):
-    valid: bool
\ No newline at end of file
+    valid: bool
+
+class ReauthResponse(ValidationResponse):
+    # valid=True の場合のみ新しいトークンが入る
+    access_token: Optional[str] = None
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
+    role: Optional[str] = None
\ No newline at end of file
@@ -1,27 +1,186 @@
-from sqlalchemy import create_engine, event
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# プロジェクトルートにある 'database.db' を参照
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.db"
+from app.core.config import Settings, get_settings
+from db.geo_math import haversine_km
+
+logger = logging.getLogger(__name__)
+
+
+def async_database_url(url: str) -> str:
+    """同期ドライバの接続 URL を、同じ DB を指す非同期ドライバの URL に変換する"""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql":
+        u = u.set(drivername="postgresql+asyncpg")
+    return u.render_as_string(hide_password=False)
+
+
+def engine_options(url: str, settings: Settings, is_async: bool = False, read_only: bool = False) -> dict:
+    """バックエンドに応じた create_engine のキーワード引数を返す"""
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite は単一ファイルのため接続プールの調整は不要 (読み取り専用化は connect 時の PRAGMA で行う)
+        return {} if is_async else {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    server_settings = {}
+    if settings.db_statement_timeout_ms > 0:
+        server_settings["statement_timeout"] = str(settings.db_statement_timeout_ms)
+    if read_only:
+        server_settings["default_transaction_read_only"] = "on"
+    if server_settings:
+        if is_async:
+            # asyncpg はサーバー設定を server_settings で受け取る
+            options["connect_args"] = {"server_settings": server_settings}
+        else:
+            options["connect_args"] = {
+                "options": " ".join(f"-c {key}={value}" for key, value in server_settings.items())
+            }
+    return options
+
+
+# 既定ではプロジェクトルートにある 'database.db' を参照 (DATABASE_URL で変更可能)
+SQLALCHEMY_DATABASE_URL = get_settings().database_url
+# 非同期エンドポイント用 (同じ DB を非同期ドライバ経由で参照)
+ASYNC_SQLALCHEMY_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+# GET エンドポイント用の読み取り専用接続 (READ_DATABASE_URL でレプリカを指定可能)
+READ_SQLALCHEMY_DATABASE_URL = get_settings().read_database_url or SQLALCHEMY_DATABASE_URL
+
+# 選択可能な SQLite 接続プロファイル
+#   legacy: 外部キー制約のみ有効化 (ロールバックジャーナル)
+#   wal   : WAL ジャーナル + 同時読み書き向けのチューニング
+SQLITE_PROFILES = ("legacy", "wal")
+
+
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    """設定されたプロファイルに対応する PRAGMA 文の一覧を返す"""
+    profile = settings.sqlite_profile
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{profile}'. Expected one of {SQLITE_PROFILES}")
+
+    pragmas = ["PRAGMA foreign_keys=ON"]
+    if profile == "wal":
+        pragmas += [
+            # 削除で空いたページを定期メンテナンス (db/maintenance.incremental_vacuum) で返せるようにする。
+            # 新規DBにだけ有効 (journal_mode=WAL がファイルを作る前に指定する)。既存DBは VACUUM で切り替える
+            "PRAGMA auto_vacuum=INCREMENTAL",
+            # 読み取りが書き込みをブロックしない (書き込みも読み取りを待たない)
+            "PRAGMA journal_mode=WAL",
+            # WAL では NORMAL でもクラッシュ耐性が保たれ、コミット毎の fsync を省ける
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+            # 負の値は KiB 単位
+            f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size_bytes}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, settings: Settings | None = None, read_only: bool = False) -> None:
+    """sqlite3 DB-API 接続にプロファイルの PRAGMA を適用する"""
+    pragmas = sqlite_pragmas(settings or get_settings())
+    if read_only:
+        # この接続からの書き込みを禁止する (誤って書き込むと OperationalError)
+        pragmas.append("PRAGMA query_only=ON")
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# SQLite の各接続に登録する関数 (名前, 引数の数, 関数)。同じ引数に同じ結果を返すため deterministic で登録し、
+# 式インデックスや同じ行での再計算の省略に使えるようにする
+SQLITE_FUNCTIONS = (
+    ("haversine_km", 4, haversine_km),
+)
+
+
+def register_sqlite_functions(dbapi_connection) -> None:
+    """sqlite3 (aiosqlite) の DB-API 接続に SQLITE_FUNCTIONS を登録する"""
+    for name, num_params, fn in SQLITE_FUNCTIONS:
+        dbapi_connection.create_function(name, num_params, fn, deterministic=True)
+
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL, get_settings())
 )
 
 # SQLite does not enforce foreign key constraints by default. Enable them on connect
+# (and apply the rest of the selected connection profile).
 @event.listens_for(engine, "connect")
 def _set_sqlite_pragma(dbapi_connection, connection_record):
-    # sqlite3 DB-API connection
-    try:
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
-    except Exception:
-        # If not sqlite or cannot set PRAGMA, ignore silently
-        pass
+    if engine.dialect.name != "sqlite":
+        return
+    apply_sqlite_pragmas(dbapi_connection)
+    register_sqlite_functions(dbapi_connection)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- 非同期セッション (async def のエンドポイントでイベントループを止めないため) ---
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **engine_options(SQLALCHEMY_DATABASE_URL, get_settings(), is_async=True),
+)
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _set_async_sqlite_pragma(dbapi_connection, connection_record):
+    if async_engine.dialect.name != "sqlite":
+        return
+    apply_sqlite_pragmas(dbapi_connection)
+    register_sqlite_functions(dbapi_connection)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# --- 読み取り専用セッション (書き込み用とは別の接続プール) ---
+# 重い GET が書き込み用の接続を占有しないよう、エンジンごと分離する
+read_engine = create_engine(
+    READ_SQLALCHEMY_DATABASE_URL,
+    **engine_options(READ_SQLALCHEMY_DATABASE_URL, get_settings(), read_only=True),
+)
+
+@event.listens_for(read_engine, "connect")
+def _set_read_sqlite_pragma(dbapi_connection, connection_record):
+    if read_engine.dialect.name != "sqlite":
+        return
+    apply_sqlite_pragmas(dbapi_connection, read_only=True)
+    register_sqlite_functions(dbapi_connection)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_read_engine = create_async_engine(
+    async_database_url(READ_SQLALCHEMY_DATABASE_URL),
+    **engine_options(READ_SQLALCHEMY_DATABASE_URL, get_settings(), is_async=True, read_only=True),
+)
+
+@event.listens_for(async_read_engine.sync_engine, "connect")
+def _set_async_read_sqlite_pragma(dbapi_connection, connection_record):
+    if async_read_engine.dialect.name != "sqlite":
+        return
+    apply_sqlite_pragmas(dbapi_connection, read_only=True)
+    register_sqlite_functions(dbapi_connection)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -29,4 +188,85 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    """GET エンドポイント用: 読み取り専用セッションを返す (書き込みは get_db を使うこと)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+# --- 遅延セッション (認証だけで済むリクエストで接続を取らないため) ---
+
+@dataclass
+class SessionUsage:
+    requests: int = 0  # 遅延セッションを受け取ったリクエスト数
+    sessions_opened: int = 0  # 実際にセッション (接続) を使ったリクエスト数
+
+
+class SessionUsageCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage: dict[str, SessionUsage] = {}
+
+    def record(self, name: str, used: bool) -> None:
+        with self._lock:
+            usage = self._usage.setdefault(name, SessionUsage())
+            usage.requests += 1
+            usage.sessions_opened += int(used)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: asdict(usage) for name, usage in self._usage.items()}
+
+
+session_usage = SessionUsageCounter()
+
+
+class LazyAsyncSession:
+    """
+    最初に使われた (属性にアクセスされた) 時点で factory から AsyncSession を作る代理オブジェクト。
+    トークンがキャッシュで検証できた場合など、DB を使わずに終わったリクエストではセッションも接続も作らない。
+    """
+
+    def __init__(self, factory: Callable[[], AsyncSession]):
+        self._factory = factory
+        self._session = None
+
+    @property
+    def used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+async def get_lazy_async_read_db():
+    """
+    require_token 用: 読み取り専用の AsyncSession を必要になった時だけ作る。
+    使ったかどうかを session_usage に記録する (GET /health/db)。
+    """
+    db = LazyAsyncSession(AsyncReadSessionLocal)
+    try:
+        yield db
+    finally:
+        await db.close()
+        session_usage.record("async_read", db.used)
+        logger.debug("Lazy read session used: %s", db.used)
@@ -0,0 +1,82 @@
+"""
+日時の保存形式
+
+DB には UTC エポックからのミリ秒 (BIGINT) で保存し、ORM / API では JST の ISO 8601 文字列として扱う。
+整数で保存することで並び替え・範囲検索が文字列の書式に左右されず、インデックスも小さくなる。
+タイムゾーンの無い日時 (datetime.now().isoformat() など) は JST とみなす。
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+# Japan Standard Time (UTC+9)
+JST = timezone(timedelta(hours=9))
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def to_millis(value: Any) -> Optional[int]:
+    """ISO 8601 文字列 / datetime / date / エポックミリ秒 をエポックミリ秒に変換する (不正な値は ValueError)"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"
+        value = datetime.fromisoformat(text)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=JST)
+    return (value - _EPOCH) // _MILLISECOND
+
+
+def from_millis(millis: Optional[int]) -> Optional[str]:
+    """エポックミリ秒を JST の ISO 8601 文字列 (ミリ秒まで) に変換する"""
+    if millis is None:
+        return None
+    return (_EPOCH + millis * _MILLISECOND).astimezone(JST).isoformat(timespec="milliseconds")
+
+
+def normalize_iso(value: Any) -> Optional[str]:
+    """受け取った日時を保存時と同じ書式の ISO 8601 文字列に揃える"""
+    return from_millis(to_millis(value))
+
+
+def now_millis() -> int:
+    return to_millis(datetime.now(timezone.utc))
+
+
+def now_iso() -> str:
+    """現在時刻 (JST) を ISO 8601 文字列で返す"""
+    return from_millis(now_millis())
+
+
+class EpochMillis(TypeDecorator):
+    """
+    BIGINT (エポックミリ秒) で保存し、ISO 8601 文字列 (JST) として読み出す列の型。
+    書き込み・比較には ISO 文字列、datetime、エポックミリ秒のいずれも使える。
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_millis(value)
+
+    def process_result_value(self, value, dialect):
+        return from_millis(value)
+
+    @property
+    def python_type(self):
+        return str
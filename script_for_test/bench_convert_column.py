@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+列の型の変換 (db/migrate.convert_column) のベンチマーク
+
+日時の列 (TEXT、値は全て異なる) を持つ表を件数ごとに作り、マイグレーション 0005 と同じく
+エポックミリ秒 (BIGINT) に変換する時間を測ります。件数に比例して増えていれば正常です
+(値ごとの UPDATE が全件走査になると、件数の2乗に比例して遅くなります)。
+
+使用方法 (リポジトリのルートで実行):
+    python3 script_for_test/bench_convert_column.py --sizes 5000 20000 80000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import BigInteger, create_engine  # noqa: E402
+
+from db.migrate import convert_column  # noqa: E402
+from db.timestamps import to_millis  # noqa: E402
+
+
+def measure(path: str, size: int) -> float:
+    """size 件の表を変換する秒数"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY, created_at TEXT)")
+        conn.exec_driver_sql("CREATE INDEX ix_t_created_at ON t (created_at)")
+        conn.exec_driver_sql("INSERT INTO t (created_at) VALUES " + ", ".join(
+            f"('2025-01-01T{i // 3_600_000:02d}:{i // 60_000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d}')"
+            for i in range(size)
+        ))
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        convert_column(conn, "t", "created_at", BigInteger(), to_millis)
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000, 80_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'seconds':>10} {'us/row':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            elapsed = measure(os.path.join(tmp, "bench.db"), size)
+        print(f"{size:>9} {elapsed:>10.3f} {elapsed / size * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+位置情報による検索 (GET /api/v1/gnss/nearby) のベンチマーク
+
+指定した件数のコミュニティを日本付近にランダムに配置し、ランダムな中心から半径 --range km の検索を
+繰り返して1回あたりの処理時間を比較します。
+
+    rtree ms : R-tree で絞り込み、距離は haversine_km 関数 (アプリの既定)
+    trig ms  : R-tree で絞り込み、距離は SQLite 組み込みの三角関数の式 (数学関数付きのビルドが必要)
+    scan ms  : R-tree なし (緯度・経度の列の範囲条件で全件を走査)
+    mem ms   : メモリ上の索引 (app/core/geo_engine.py。numpy があればベクトル化、無ければ Python で計算)
+
+使用方法 (リポジトリのルートで実行):
+    python3 script_for_test/bench_nearby.py --sizes 1000 100000 1000000 --queries 200 --range 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.geo_engine import load_index  # noqa: E402
+from db import geo, migrate, models  # noqa: E402
+from db.session import Base, apply_sqlite_pragmas, register_sqlite_functions  # noqa: E402
+
+# 日本付近の緯度・経度の範囲
+LAT_RANGE = (24.0, 46.0)
+LON_RANGE = (123.0, 146.0)
+
+
+def make_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+        register_sqlite_functions(dbapi_connection)
+
+    Base.metadata.create_all(bind=engine)
+    migrate.upgrade(engine)
+    return engine
+
+
+def seed(engine, size: int, rng: random.Random) -> None:
+    # Communities.credential_id は一意のため、コミュニティと同じ数だけ資格情報を作る (ID は 1 から連番)
+    with engine.begin() as conn:
+        batch = 10_000
+        for start in range(0, size, batch):
+            ids = range(start, min(start + batch, size))
+            conn.execute(insert(models.Credential), [{"credential_id": i + 1, "hashed_password": "x"} for i in ids])
+            conn.execute(insert(models.Communities), [
+                {"name": f"c{i}", "credential_id": i + 1,
+                 "latitude": rng.uniform(*LAT_RANGE), "longitude": rng.uniform(*LON_RANGE)}
+                for i in ids
+            ])
+
+
+def measure(Session, centres, range_km: float, rtree: bool, native: bool = True) -> tuple[float, float]:
+    """(1回あたりの中央値 ms, 1回あたりの平均件数)"""
+    timings, found = [], 0
+    with Session() as db:
+        for lat, lon in centres:
+            started = time.perf_counter()
+            found += len(db.scalars(geo.nearby_query(lat, lon, range_km, rtree=rtree, native=native)).all())
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), found / len(centres)
+
+
+def measure_memory(index, centres, range_km: float) -> float:
+    """メモリ上の索引で検索した場合の1回あたりの中央値 ms"""
+    timings = []
+    for lat, lon in centres:
+        started = time.perf_counter()
+        index.within(lat, lon, range_km)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--range", type=float, default=5.0, help="検索半径 (km)")
+    parser.add_argument("--full-scan-queries", type=int, default=20,
+                        help="R-tree なしの検索回数 (全件走査のため少なめ)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    backend = None
+    print(f"{'rows':>9} {'rtree ms':>10} {'trig ms':>10} {'scan ms':>10} {'mem ms':>10} {'hits':>8}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(os.path.join(tmp, "bench.db"))
+            seed(engine, size, rng)
+            Session = sessionmaker(bind=engine)
+            centres = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+            rtree_ms, hits = measure(Session, centres, args.range, rtree=True)
+            trig_ms, _ = measure(Session, centres, args.range, rtree=True, native=False)
+            scan_ms, _ = measure(Session, centres[:args.full_scan_queries], args.range, rtree=False)
+            index = load_index(engine)
+            backend = "numpy" if index.use_numpy else "python"
+            memory_ms = measure_memory(index, centres[:args.full_scan_queries], args.range)
+            engine.dispose()
+        print(f"{size:>9} {rtree_ms:>10.3f} {trig_ms:>10.3f} {scan_ms:>10.3f} {memory_ms:>10.3f} {hits:>8.1f}")
+    print(f"(mem: {backend})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+SQLite 接続プロファイルのベンチマーク
+
+legacy (ロールバックジャーナル) と wal (WAL + チューニング済み PRAGMA) の
+それぞれで、支援要請の書き込みとダッシュボード相当の読み取りを並行実行し、
+スループットを比較します。
+
+使用方法 (リポジトリのルートで実行):
+    python3 script_for_test/bench_sqlite_profile.py --seconds 5 --writers 4 --readers 4
+"""
+
+import argparse
+import dataclasses
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event, func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from db import models  # noqa: E402
+from db.session import Base, SQLITE_PROFILES, apply_sqlite_pragmas  # noqa: E402
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def make_engine(path: str, profile: str):
+    settings = dataclasses.replace(get_settings(), sqlite_profile=profile)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, settings)
+
+    return engine
+
+
+def seed(Session) -> tuple[int, int]:
+    with Session() as db:
+        item = models.Items(item_name="水", unit="本")
+        credential = models.Credential(hashed_password="x")
+        db.add_all([item, credential])
+        db.flush()
+        community = models.Communities(name="bench", credential_id=credential.credential_id,
+                                       latitude=35.0, longitude=137.0)
+        db.add(community)
+        db.commit()
+        return item.items_id, community.community_id
+
+
+def writer(Session, item_id, community_id, stop, counts, lock):
+    done = errors = 0
+    while not stop.is_set():
+        try:
+            with Session() as db:
+                content = models.RequestContent(items_id=item_id, number=1, created_at=_now())
+                db.add(content)
+                db.flush()
+                db.add(models.SupportRequest(community_id=community_id,
+                                             request_content_id=content.request_content_id,
+                                             status="pending", created_at=_now()))
+                db.commit()
+            done += 1
+        except OperationalError:
+            errors += 1
+    with lock:
+        counts["writes"] += done
+        counts["write_errors"] += errors
+
+
+def reader(Session, stop, counts, lock):
+    done = errors = 0
+    latest = (
+        select(models.SupportRequest.request_id, models.Communities.name, models.Items.item_name)
+        .join(models.Communities, models.SupportRequest.community_id == models.Communities.community_id)
+        .join(models.RequestContent,
+              models.SupportRequest.request_content_id == models.RequestContent.request_content_id)
+        .join(models.Items, models.RequestContent.items_id == models.Items.items_id)
+        .order_by(models.SupportRequest.created_at.desc())
+        .limit(50)
+    )
+    while not stop.is_set():
+        try:
+            with Session() as db:
+                db.scalar(select(func.count()).select_from(models.SupportRequest))
+                db.execute(latest).all()
+            done += 1
+        except OperationalError:
+            errors += 1
+    with lock:
+        counts["reads"] += done
+        counts["read_errors"] += errors
+
+
+def run(profile: str, seconds: float, writers: int, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), profile)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        item_id, community_id = seed(Session)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        counts = {"writes": 0, "write_errors": 0, "reads": 0, "read_errors": 0}
+        threads = [threading.Thread(target=writer, args=(Session, item_id, community_id, stop, counts, lock))
+                   for _ in range(writers)]
+        threads += [threading.Thread(target=reader, args=(Session, stop, counts, lock))
+                    for _ in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'profile':<8} {'writes/s':>10} {'reads/s':>10} {'w-err':>6} {'r-err':>6}")
+    for profile in SQLITE_PROFILES:
+        c = run(profile, args.seconds, args.writers, args.readers)
+        print(f"{profile:<8} {c['writes'] / args.seconds:>10.1f} {c['reads'] / args.seconds:>10.1f} "
+              f"{c['write_errors']:>6} {c['read_errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
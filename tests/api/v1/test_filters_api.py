@@ -0,0 +1,118 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from db import models
+
+
+def _seed(client: TestClient):
+    """2 コミュニティ × 2 品目の支援要請を作成する"""
+    communities = [
+        client.post("/api/v1/communities/", json={"name": f"F{i}", "password": "TestPass123"}).json()["community_id"]
+        for i in range(2)
+    ]
+    water = client.post("/api/v1/items/", json={"item_name": "Filter Water", "category": "drink"}).json()["items_id"]
+    rice = client.post("/api/v1/items/", json={"item_name": "Filter Rice", "category": "food"}).json()["items_id"]
+    for community_id in communities:
+        r = client.post(
+            "/api/v1/support_requests/bulk",
+            json={"community_id": community_id,
+                  "items": [{"items_id": water, "number": 1}, {"items_id": rice, "number": 2}]},
+        )
+        assert r.status_code == 200
+    return communities, water, rice
+
+
+def test_dashboard_filters(client: TestClient):
+    """
+    [GET] /api/v1/government/requests?item_name=&community_id= - サーバー側で絞り込む
+    """
+    communities, water, _ = _seed(client)
+
+    rows = client.get("/api/v1/government/requests", params={"item_name": "Filter Water"}).json()
+    assert len(rows) == 2
+    assert {row["items_id"] for row in rows} == {water}
+
+    rows = client.get("/api/v1/government/requests", params={"community_id": communities[0]}).json()
+    assert len(rows) == 2
+    assert {row["community_id"] for row in rows} == {communities[0]}
+
+    # 同じ名前の複数指定は IN
+    rows = client.get("/api/v1/government/requests",
+                      params=[("community_id", c) for c in communities] + [("category", "food")]).json()
+    assert len(rows) == 2
+    assert {row["category"] for row in rows} == {"food"}
+
+
+def test_dashboard_multi_column_sort_with_cursor(client: TestClient):
+    _seed(client)
+    params = {"sort": "item_name,-community_id", "limit": 3}
+    r = client.get("/api/v1/government/requests", params=params)
+    assert r.status_code == 200
+    rows = r.json()
+    r = client.get("/api/v1/government/requests", params={**params, "cursor": r.headers["X-Next-Cursor"]})
+    rows += r.json()
+    assert "X-Next-Cursor" not in r.headers
+
+    keys = [(row["item_name"], -row["community_id"], -row["request_id"]) for row in rows]
+    assert keys == sorted(keys)
+    assert len({row["request_id"] for row in rows}) == len(rows)
+
+
+def test_sort_on_nullable_columns_with_cursor(client: TestClient, db_session: Session):
+    """category・status が NULL の行も、NULL の列で並び替えてカーソルでたどった結果から落ちない"""
+    items = [
+        client.post("/api/v1/items/", json={"item_name": f"Nullable {i}", "category": category}).json()["items_id"]
+        for i, category in enumerate(["b", None, "a", None, "b"])
+    ]
+    community_id = client.post("/api/v1/communities/", json={"name": "N", "password": "TestPass123"}).json()["community_id"]
+    created = client.post(
+        "/api/v1/support_requests/bulk",
+        json={"community_id": community_id, "items": [{"items_id": items_id, "number": 1} for items_id in items]},
+    ).json()["created"]
+    db_session.execute(update(models.SupportRequest).values(status=None).where(
+        models.SupportRequest.request_id.in_([created[1]["request_id"], created[3]["request_id"]])
+    ))
+
+    for url, sort, key in [
+        ("/api/v1/items/", "-category", "items_id"),
+        ("/api/v1/items/", "category,-item_name", "items_id"),
+        ("/api/v1/support_requests/", "status", "request_id"),
+        ("/api/v1/government/requests", "category,-status", "request_id"),
+    ]:
+        unpaged = client.get(url, params={"sort": sort, "limit": 1000}).json()
+        rows, params = [], {"sort": sort, "limit": 2}
+        while True:
+            r = client.get(url, params=params)
+            assert r.status_code == 200
+            rows += r.json()
+            if "X-Next-Cursor" not in r.headers:
+                break
+            params = {**params, "cursor": r.headers["X-Next-Cursor"]}
+        assert [row[key] for row in rows] == [row[key] for row in unpaged], sort
+    categories = [row["category"] for row in client.get("/api/v1/items/", params={"sort": "-category"}).json()
+                  if row["items_id"] in items]
+    assert categories == ["b", "b", "a", None, None]
+
+
+def test_list_endpoint_filters_and_ranges(client: TestClient):
+    communities, _, _ = _seed(client)
+
+    rows = client.get("/api/v1/support_requests/", params={"community_id": communities[1]}).json()
+    assert len(rows) == 2
+    assert {row["community_id"] for row in rows} == {communities[1]}
+
+    created_at = rows[0]["created_at"]
+    assert client.get("/api/v1/support_requests/", params={"created_at__gt": created_at,
+                                                           "community_id": communities[1]}).json() == []
+
+    rows = client.get("/api/v1/items/", params={"category": "food"}).json()
+    assert [row["item_name"] for row in rows] == ["Filter Rice"]
+
+
+def test_disallowed_filters_return_400(client: TestClient):
+    # 許可リストにない列・演算子・並び替え、および型の合わない値
+    assert client.get("/api/v1/items/", params={"description": "x"}).status_code == 400
+    assert client.get("/api/v1/items/", params={"item_name__gte": "a"}).status_code == 400
+    assert client.get("/api/v1/government/requests", params={"sort": "latitude"}).status_code == 400
+    assert client.get("/api/v1/support_requests/", params={"community_id": "abc"}).status_code == 400
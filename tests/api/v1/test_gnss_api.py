@@ -0,0 +1,178 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, text, update
+
+from db import clusters, crud, geo, models, schemas
+
+
+def create_community(client: TestClient, name: str, latitude: float, longitude: float):
+    r = client.post(
+        "/api/v1/communities/",
+        json={"name": name, "latitude": latitude, "longitude": longitude, "password": "TestPass123"},
+    )
+    assert r.status_code == 200
+    return r.json()["community_id"]
+
+
+def test_nearby_filters_by_range(client: TestClient):
+    """
+    [GET] /api/v1/gnss/nearby - 指定半径内のコミュニティのみ返す
+    """
+    # 名古屋駅付近 / 栄付近 (約2.5km) / 東京駅付近 (約260km)
+    nagoya = create_community(client, "Nagoya", 35.1709, 136.8815)
+    sakae = create_community(client, "Sakae", 35.1681, 136.9081)
+    tokyo = create_community(client, "Tokyo", 35.6812, 139.7671)
+
+    r = client.get("/api/v1/gnss/nearby", params={"latitude": 35.1709, "longitude": 136.8815, "range": 5})
+    assert r.status_code == 200
+    ids = {c["community_id"] for c in r.json()}
+    assert {nagoya, sakae} <= ids
+    assert tokyo not in ids
+
+    r = client.get("/api/v1/gnss/nearby", params={"latitude": 35.1709, "longitude": 136.8815, "range": 500})
+    ids = {c["community_id"] for c in r.json()}
+    assert {nagoya, sakae, tokyo} <= ids
+
+
+def test_nearby_index_follows_updates_and_deletes(client: TestClient, db_session):
+    """
+    Communities の位置の変更・削除はトリガーで R-tree に反映される
+    """
+    moving = create_community(client, "Moving", 35.6812, 139.7671)
+    params = {"latitude": 35.1709, "longitude": 136.8815, "range": 5}
+    assert moving not in {c["community_id"] for c in client.get("/api/v1/gnss/nearby", params=params).json()}
+
+    db_session.execute(
+        update(models.Communities)
+        .where(models.Communities.community_id == moving)
+        .values(latitude=35.1710, longitude=136.8816)
+    )
+    assert moving in {c["community_id"] for c in client.get("/api/v1/gnss/nearby", params=params).json()}
+    rtree_ids = db_session.execute(text('SELECT id FROM "Communities_rtree"')).scalars().all()
+    assert moving in rtree_ids
+
+    db_session.execute(delete(models.Communities).where(models.Communities.community_id == moving))
+    assert moving not in db_session.execute(text('SELECT id FROM "Communities_rtree"')).scalars().all()
+
+
+def test_nearby_across_the_antimeridian(client: TestClient):
+    east = create_community(client, "East", 0.0, 179.99)
+    west = create_community(client, "West", 0.0, -179.99)
+    r = client.get("/api/v1/gnss/nearby", params={"latitude": 0.0, "longitude": 179.999, "range": 10})
+    assert {east, west} <= {c["community_id"] for c in r.json()}
+
+
+def test_bounding_box_contains_the_search_circle():
+    min_lat, max_lat, lon_ranges = geo.bounding_box(35.0, 137.0, 10)
+    assert min_lat < 35.0 - 0.089 and max_lat > 35.0 + 0.089  # 10 km ≒ 0.0899 度
+    assert len(lon_ranges) == 1 and lon_ranges[0][0] < 137.0 - 0.1
+
+    assert geo.bounding_box(89.99, 0.0, 10)[2] == [(-180.0, 180.0)]
+    assert len(geo.bounding_box(0.0, -179.99, 10)[2]) == 2
+
+
+def test_nearby_sorted_by_distance(client: TestClient):
+    tokyo = create_community(client, "Tokyo", 35.6812, 139.7671)
+    sakae = create_community(client, "Sakae", 35.1681, 136.9081)
+    nagoya = create_community(client, "Nagoya", 35.1709, 136.8815)
+
+    params = {"latitude": 35.1709, "longitude": 136.8815, "range": 500, "sort": "distance"}
+    body = client.get("/api/v1/gnss/nearby", params=params).json()
+    assert [c["community_id"] for c in body] == [nagoya, sakae, tokyo]
+    assert body[0]["distance_km"] == 0
+    assert body[1]["distance_km"] == geo.haversine_km(35.1709, 136.8815, 35.1681, 136.9081)
+
+    params["sort"] = "name"
+    assert client.get("/api/v1/gnss/nearby", params=params).status_code == 422
+
+
+def test_nearest_returns_k_closest(client: TestClient):
+    """
+    [GET] /api/v1/gnss/nearest - 半径を広げながら近い順に k 件を返す (遠く離れた点も見つかる)
+    """
+    nagoya = create_community(client, "Nagoya", 35.1709, 136.8815)
+    sakae = create_community(client, "Sakae", 35.1681, 136.9081)
+    tokyo = create_community(client, "Tokyo", 35.6812, 139.7671)
+    sapporo = create_community(client, "Sapporo", 43.0687, 141.3508)
+    buenos_aires = create_community(client, "Buenos Aires", -34.6037, -58.3816)
+
+    params = {"latitude": 35.1709, "longitude": 136.8815, "k": 3}
+    body = client.get("/api/v1/gnss/nearest", params=params).json()
+    assert [c["community_id"] for c in body] == [nagoya, sakae, tokyo]
+    assert [c["distance_km"] for c in body] == sorted(c["distance_km"] for c in body)
+
+    params["k"] = 10
+    ids = [c["community_id"] for c in client.get("/api/v1/gnss/nearest", params=params).json()]
+    assert ids == [nagoya, sakae, tokyo, sapporo, buenos_aires]
+
+    params["k"] = 0
+    assert client.get("/api/v1/gnss/nearest", params=params).status_code == 422
+
+
+def _clusters(client: TestClient, bbox: str, zoom: int):
+    r = client.get("/api/v1/gnss/clusters", params={"bbox": bbox, "zoom": zoom})
+    assert r.status_code == 200
+    return {(c["cell_x"], c["cell_y"]): c for c in r.json()}
+
+
+def test_clusters_follow_community_and_request_changes(client: TestClient, db_session):
+    """
+    [GET] /api/v1/gnss/clusters - セルごとの件数・重心・未対応の支援要請数がトリガーで更新される
+    """
+    nagoya = create_community(client, "Nagoya", 35.1709, 136.8815)
+    sakae = create_community(client, "Sakae", 35.1681, 136.9081)
+    tokyo = create_community(client, "Tokyo", 35.6812, 139.7671)
+    pending = crud.support_requests.create(db_session, {"community_id": sakae, "status": "pending"})
+    crud.support_requests.create(db_session, {"community_id": sakae, "status": "completed"})
+    crud.support_requests.create(db_session, {"community_id": tokyo, "status": "processing"})
+
+    # ズーム 5 のセルは約 2.8 度四方: 名古屋・栄は同じセル、東京は隣のセル
+    nagoya_cell, tokyo_cell = clusters.cell_of(35.1709, 136.8815, 5), clusters.cell_of(35.6812, 139.7671, 5)
+    cells = _clusters(client, "130,30,145,40", 5)
+    assert set(cells) == {nagoya_cell, tokyo_cell}
+    assert (cells[nagoya_cell]["count"], cells[nagoya_cell]["open_requests"]) == (2, 1)
+    assert cells[nagoya_cell]["latitude"] == pytest.approx((35.1709 + 35.1681) / 2)
+    assert (cells[tokyo_cell]["count"], cells[tokyo_cell]["open_requests"]) == (1, 1)
+
+    crud.update_support_request(db_session, pending.request_id, schemas.SupportRequestCreate.model_construct(
+        status="completed",
+    ))
+    db_session.execute(update(models.Communities).where(models.Communities.community_id == tokyo)
+                       .values(latitude=35.17, longitude=136.89))
+    cells = _clusters(client, "130,30,145,40", 5)
+    assert set(cells) == {nagoya_cell}
+    assert (cells[nagoya_cell]["count"], cells[nagoya_cell]["open_requests"]) == (3, 1)
+
+    db_session.execute(delete(models.SupportRequest))
+    for community_id in (nagoya, sakae, tokyo):
+        crud.delete_community(db_session, community_id)
+    assert _clusters(client, "130,30,145,40", 5) == {}
+
+
+def test_clusters_match_on_the_fly_aggregation(client: TestClient, db_session):
+    """集計済みのテーブルとトリガーの無い DB 用の GROUP BY が同じ結果になる"""
+    for i, (lat, lon) in enumerate([(35.17, 136.88), (35.18, 136.90), (34.69, 135.50), (43.06, 141.35)]):
+        community_id = create_community(client, f"c{i}", lat, lon)
+        crud.support_requests.create(db_session, {"community_id": community_id, "status": "pending"})
+
+    bbox = (120.0, 20.0, 150.0, 50.0)
+    for zoom in (0, 4, 8, 12, clusters.MAX_CLUSTER_ZOOM):
+        precomputed = db_session.execute(clusters.clusters_query(bbox, zoom)).all()
+        aggregated = db_session.execute(clusters.aggregate_query(bbox, zoom)).all()
+        assert [(r[1], r[2], r[3], r[6]) for r in precomputed] == [(int(r[1]), int(r[2]), r[3], r[6]) for r in aggregated]
+        assert [r[4] for r in precomputed] == pytest.approx([r[4] for r in aggregated])
+
+
+def test_clusters_bbox_validation_and_antimeridian(client: TestClient):
+    create_community(client, "East", 0.0, 179.9)
+    create_community(client, "West", 0.0, -179.9)
+
+    cells = _clusters(client, "179,-1,-179,1", 8)  # west > east: 日付変更線をまたぐ
+    assert sum(c["count"] for c in cells.values()) == 2
+    assert _clusters(client, "-179,-1,179,1", 8) == {}  # 逆向き (日付変更線をまたがない) の範囲にはどちらも入らない
+
+    assert client.get("/api/v1/gnss/clusters", params={"bbox": "1,2,3", "zoom": 5}).status_code == 400
+    assert client.get("/api/v1/gnss/clusters", params={"bbox": "0,10,1,-10", "zoom": 5}).status_code == 400
+    assert client.get("/api/v1/gnss/clusters", params={"bbox": "0,0,1,1", "zoom": 30}).status_code == 422
+    # 国全体の範囲を最大のズームで (画面に収まらないセル数)
+    assert client.get("/api/v1/gnss/clusters", params={"bbox": "123,24,146,46", "zoom": 16}).status_code == 400
@@ -0,0 +1,94 @@
+from fastapi.testclient import TestClient
+
+from app.core.passwords import PasswordService, hash_password, hash_rounds
+from app.core.security import decode_access_token, require_token
+from app.main import app
+from db import models
+
+
+def _create_community(client: TestClient, password: str = "TestPass123") -> int:
+    r = client.post("/api/v1/communities/", json={"name": "Reauth", "password": password})
+    assert r.status_code == 200
+    return r.json()["community_id"]
+
+
+def test_reauth_returns_token_and_cookie_with_one_verify(client: TestClient, monkeypatch):
+    """
+    [POST] /api/v1/login/reauth - 1回の bcrypt 検証で valid とトークン (Cookie) をまとめて返す
+    """
+    community_id = _create_community(client)
+    calls = []
+    original = PasswordService.verify
+
+    async def counting_verify(self, *args):
+        calls.append(args)
+        return await original(self, *args)
+
+    monkeypatch.setattr(PasswordService, "verify", counting_verify)
+    r = client.post("/api/v1/login/reauth",
+                    json={"user_type": "community", "community_id": community_id, "password": "TestPass123"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["valid"] is True
+    assert body["role"] == "community"
+    assert body["access_token"]
+    assert r.cookies.get("access_token") == body["access_token"]
+    assert len(calls) == 1
+
+
+def test_reauth_wrong_password_is_not_an_error(client: TestClient):
+    community_id = _create_community(client)
+    r = client.post("/api/v1/login/reauth",
+                    json={"user_type": "community", "community_id": community_id, "password": "wrong"})
+    assert r.status_code == 200
+    assert r.json()["valid"] is False
+    assert r.json()["access_token"] is None
+    assert "access_token" not in r.cookies
+
+
+def test_login_unknown_community_returns_401(client: TestClient):
+    r = client.post("/api/v1/login/login", json={"user_type": "community", "community_id": 99999, "password": "x"})
+    assert r.status_code == 401
+
+
+def test_login_rehashes_password_with_configured_cost(client: TestClient, db_session):
+    """
+    ハッシュのコストが BCRYPT_ROUNDS (テストでは 4) と異なる場合、ログイン成功時に作り直す
+    """
+    community_id = _create_community(client)
+    community = db_session.get(models.Communities, community_id)
+    credential = db_session.get(models.Credential, community.credential_id)
+    credential.hashed_password = hash_password("TestPass123", rounds=5)
+    db_session.commit()
+
+    r = client.post("/api/v1/login/login",
+                    json={"user_type": "community", "community_id": community_id, "password": "TestPass123"})
+    assert r.status_code == 200
+    db_session.refresh(credential)
+    assert hash_rounds(credential.hashed_password) == 4
+
+    # 作り直したハッシュでもログインできる
+    r = client.post("/api/v1/login/login",
+                    json={"user_type": "community", "community_id": community_id, "password": "TestPass123"})
+    assert r.status_code == 200
+
+
+def test_logout_revokes_token_by_jti(client: TestClient, db_session):
+    """
+    ログアウトしたトークンは jti (16バイト) でブラックリストに登録され、以後は 401
+    """
+    app.dependency_overrides.pop(require_token)
+    community_id = _create_community(client)
+    r = client.post("/api/v1/login/login",
+                    json={"user_type": "community", "community_id": community_id, "password": "TestPass123"})
+    token = r.json()["access_token"]
+    assert decode_access_token(token)["jti"]
+
+    assert client.get("/api/v1/login/me").status_code == 200
+    assert client.post("/api/v1/login/logout").status_code == 200
+    assert db_session.query(models.TokenBlacklist).count() == 1
+    assert len(db_session.query(models.TokenBlacklist).one().jti) == 16
+
+    r = client.get("/api/v1/login/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 401
+    assert r.json()["detail"] == "Token has been revoked"
@@ -0,0 +1,99 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from db import models
+from db.pagination import encode_cursor
+
+
+def _walk(client: TestClient, url: str, limit: int, **query):
+    """X-Next-Cursor をたどって全ページを取得する"""
+    pages = []
+    params = {**query, "limit": limit}
+    while True:
+        r = client.get(url, params=params)
+        assert r.status_code == 200
+        pages.append(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+        params = {**query, "limit": limit, "cursor": cursor}
+
+
+def test_items_cursor_pagination(client: TestClient):
+    """
+    [GET] /api/v1/items/?cursor= - 主キー順のキーセットページング
+    """
+    created = [client.post("/api/v1/items/", json={"item_name": f"Item {i}"}).json()["items_id"] for i in range(5)]
+
+    pages = _walk(client, "/api/v1/items/", limit=2)
+    ids = [item["items_id"] for page in pages for item in page]
+    assert all(len(page) <= 2 for page in pages)
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids))
+    assert set(created) <= set(ids)
+
+
+def test_skip_limit_still_supported(client: TestClient):
+    for i in range(3):
+        client.post("/api/v1/items/", json={"item_name": f"Skip {i}"})
+    all_ids = [i["items_id"] for i in client.get("/api/v1/items/").json()]
+
+    r = client.get("/api/v1/items/", params={"skip": 1, "limit": 1})
+    assert r.status_code == 200
+    assert [i["items_id"] for i in r.json()] == all_ids[1:2]
+
+
+def test_invalid_cursor_returns_400(client: TestClient):
+    r = client.get("/api/v1/items/", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+    # キーの数が合わないカーソルも拒否する
+    r = client.get("/api/v1/items/", params={"cursor": encode_cursor([1, 2])})
+    assert r.status_code == 400
+
+
+def test_dashboard_cursor_pagination_newest_first(client: TestClient):
+    """
+    [GET] /api/v1/government/requests?limit= - (created_at, request_id) の降順でページング
+    """
+    community_id = client.post("/api/v1/communities/", json={"name": "P", "password": "TestPass123"}).json()["community_id"]
+    items_id = client.post("/api/v1/items/", json={"item_name": "Water"}).json()["items_id"]
+    r = client.post(
+        "/api/v1/support_requests/bulk",
+        json={"community_id": community_id, "items": [{"items_id": items_id, "number": n} for n in range(1, 6)]},
+    )
+    assert r.status_code == 200
+
+    pages = _walk(client, "/api/v1/government/requests", limit=2)
+    rows = [row for page in pages for row in page]
+    keys = [(row["created_at"], row["request_id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert len({row["request_id"] for row in rows}) == len(rows)
+
+    # limit を指定しない場合は従来どおり全件
+    assert len(client.get("/api/v1/government/requests").json()) == len(rows)
+
+
+def test_dashboard_cursor_pagination_keeps_null_keys(client: TestClient, db_session: Session):
+    """
+    created_at が NULL の行 (マイグレーション 0005 で変換できなかった日時) も、向きによらず最後にまとめて返す
+    """
+    community_id = client.post("/api/v1/communities/", json={"name": "N", "password": "TestPass123"}).json()["community_id"]
+    items_id = client.post("/api/v1/items/", json={"item_name": "Water"}).json()["items_id"]
+    created = client.post(
+        "/api/v1/support_requests/bulk",
+        json={"community_id": community_id, "items": [{"items_id": items_id, "number": n} for n in range(1, 7)]},
+    ).json()["created"]
+    null_ids = [created[1]["request_id"], created[2]["request_id"]]
+    db_session.execute(
+        update(models.SupportRequest).where(models.SupportRequest.request_id.in_(null_ids)).values(created_at=None)
+    )
+
+    for sort in ("-created_at", "created_at"):
+        unpaged = [row["request_id"] for row in client.get("/api/v1/government/requests", params={"sort": sort}).json()]
+        assert len(unpaged) == 6
+        assert sorted(unpaged[-2:]) == sorted(null_ids)
+        for limit in (1, 2, 4):
+            pages = _walk(client, "/api/v1/government/requests", limit=limit, sort=sort)
+            assert [row["request_id"] for page in pages for row in page] == unpaged
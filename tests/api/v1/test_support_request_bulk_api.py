@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.main import app
+from db import models
+from db.session import get_db
+
+
+def _community(client: TestClient) -> int:
+    r = client.post("/api/v1/communities/", json={"name": "Bulk", "password": "TestPass123"})
+    assert r.status_code == 200
+    return r.json()["community_id"]
+
+
+def _item(client: TestClient, name: str) -> int:
+    r = client.post("/api/v1/items/", json={"item_name": name, "unit": "pc"})
+    assert r.status_code == 200
+    return r.json()["items_id"]
+
+
+def test_bulk_create_support_requests(client: TestClient, db_session: Session):
+    """
+    [POST] /api/v1/support_requests/bulk - 複数品目をまとめて申請
+    """
+    community_id = _community(client)
+    water, food = _item(client, "Water"), _item(client, "Food")
+
+    r = client.post(
+        "/api/v1/support_requests/bulk",
+        json={
+            "community_id": community_id,
+            "items": [
+                {"items_id": water, "number": 10, "other_note": "急ぎ"},
+                {"items_id": food, "number": 3},
+            ],
+        },
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["community_id"] == community_id
+    assert [c["items_id"] for c in data["created"]] == [water, food]
+
+    for created, number in zip(data["created"], [10, 3]):
+        sr = db_session.get(models.SupportRequest, created["request_id"])
+        assert sr.community_id == community_id
+        assert sr.status == "pending"
+        assert sr.request_content_id == created["request_content_id"]
+        assert sr.request_content.number == number
+
+
+def test_bulk_create_rejects_unknown_item(client: TestClient, db_session: Session):
+    """存在しない品目が含まれている場合は 409 (登録は1トランザクションなので全件ロールバック)"""
+    community_id = _community(client)
+    water = _item(client, "Water")
+    # API 側のロールバックがテスト全体のトランザクションではなく SAVEPOINT までに留まるよう、
+    # この要求だけ同じ接続の別セッション (SAVEPOINT から始める) を使う
+    api_session = Session(bind=db_session.connection(), join_transaction_mode="create_savepoint")
+    app.dependency_overrides[get_db] = lambda: api_session
+
+    r = client.post(
+        "/api/v1/support_requests/bulk",
+        json={"community_id": community_id, "items": [{"items_id": water, "number": 1}, {"items_id": 99999, "number": 1}]},
+    )
+    api_session.close()
+    assert r.status_code == 409
+
+    # 先に登録できた1件目 (water) も残らない
+    assert db_session.get(models.Communities, community_id) is not None
+    assert db_session.get(models.Items, water) is not None
+    assert db_session.query(models.SupportRequest).filter_by(community_id=community_id).count() == 0
+    assert db_session.query(models.RequestContent).filter_by(items_id=water).count() == 0
+
+
+def test_bulk_create_requires_items(client: TestClient):
+    r = client.post("/api/v1/support_requests/bulk", json={"community_id": 1, "items": []})
+    assert r.status_code == 422
@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import geo_engine as geo_engine_module
+from app.core.geo_engine import GeoIndex, get_geo_engine
+from db import crud, schemas
+from db.geo_math import haversine_km
+from db.repository import unit_of_work
+
+# numpy が無い環境では Python の計算だけを確認する
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(geo_engine_module.np is None, reason="numpy"))]
+
+NAGOYA = (35.1709, 136.8815)
+SAKAE = (35.1681, 136.9081)
+TOKYO = (35.6812, 139.7671)
+
+
+def _record(community_id, latitude, longitude):
+    return schemas.Communities(community_id=community_id, credential_id=community_id, name=f"c{community_id}",
+                               latitude=latitude, longitude=longitude)
+
+
+@pytest.fixture
+def geo_engine(db_session):
+    """このテストのトランザクションの内容を読み込んだ索引 (終了時に破棄し、以降のテストは SQL で検索する)"""
+    engine = get_geo_engine()
+    engine.load(db_session.connection())
+    yield engine
+    engine.reset()
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_index_queries_match_haversine(use_numpy):
+    index = GeoIndex(use_numpy=use_numpy)
+    for community_id, (lat, lon) in enumerate([TOKYO, SAKAE, NAGOYA], start=1):
+        index.upsert(_record(community_id, lat, lon))
+
+    nearby = index.within(*NAGOYA, 5, order_by_distance=True)
+    assert [(r.community_id, round(d, 6)) for r, d in nearby] == [
+        (3, 0.0), (2, round(haversine_km(*NAGOYA, *SAKAE), 6)),
+    ]
+    assert [r.community_id for r, _ in index.nearest(*NAGOYA, 2)] == [3, 2]
+    assert [r.community_id for r, _ in index.nearest(*NAGOYA, 10)] == [3, 2, 1]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_index_update_and_remove_keep_arrays_packed(use_numpy):
+    index = GeoIndex(use_numpy=use_numpy)
+    for community_id, (lat, lon) in enumerate([TOKYO, SAKAE, NAGOYA], start=1):
+        index.upsert(_record(community_id, lat, lon))
+
+    assert index.remove(1)  # 末尾 (Nagoya) が先頭に移る
+    assert not index.remove(1)
+    index.upsert(_record(3, *TOKYO))  # Nagoya -> Tokyo に移動
+    index.upsert(_record(2, None, None))  # 位置の無いコミュニティは外す
+
+    assert len(index) == 1
+    assert index.within(*NAGOYA, 5) == []
+    assert [r.community_id for r, _ in index.within(*TOKYO, 1)] == [3]
+
+
+def test_changes_during_load_are_replayed(monkeypatch):
+    engine = geo_engine_module.GeoEngine(bind=None)
+
+    def load_index(bind, use_numpy=None):
+        # 読み込みの途中で別のリクエストが削除・追加した
+        engine.remove(1)
+        engine.upsert(_record(2, *SAKAE))
+        index = GeoIndex(use_numpy)
+        index.upsert(_record(1, *NAGOYA))
+        return index
+
+    monkeypatch.setattr(geo_engine_module, "load_index", load_index)
+    assert engine.load() == 1
+    assert [r.community_id for r, _ in engine.within(*NAGOYA, 5)] == [2]
+    assert engine.metrics()["size"] == 1
+
+
+def test_reset_during_load_cancels_it(monkeypatch):
+    engine = geo_engine_module.GeoEngine(bind=None)
+
+    def load_index(bind, use_numpy=None):
+        # 読み込みの途中で索引が破棄された (アプリの終了やテストの後始末)
+        engine.reset()
+        engine.upsert(_record(2, *SAKAE))
+        index = GeoIndex(use_numpy)
+        index.upsert(_record(1, *NAGOYA))
+        return index
+
+    monkeypatch.setattr(geo_engine_module, "load_index", load_index)
+    assert engine.load() == 0
+    assert engine.within(*NAGOYA, 5) == []
+    assert engine.metrics()["ready"] is False
+
+
+def test_crud_changes_reach_the_loaded_engine(client: TestClient, db_session, geo_engine):
+    r = client.post("/api/v1/communities/",
+                    json={"name": "Nagoya", "latitude": NAGOYA[0], "longitude": NAGOYA[1], "password": "TestPass123"})
+    community_id = r.json()["community_id"]
+    assert [c.community_id for c, _ in geo_engine.within(*NAGOYA, 1)] == [community_id]
+
+    crud.update_community(db_session, community_id, schemas.CommunitiesCreate.model_construct(
+        latitude=TOKYO[0], longitude=TOKYO[1],
+    ))
+    assert geo_engine.within(*NAGOYA, 1) == []
+
+    # API も DB ではなく索引から返す
+    queries = geo_engine.metrics()["queries"]
+    body = client.get("/api/v1/gnss/nearest", params={"latitude": TOKYO[0], "longitude": TOKYO[1], "k": 1}).json()
+    assert [(c["community_id"], c["distance_km"]) for c in body] == [(community_id, 0.0)]
+    assert geo_engine.metrics()["queries"] == queries + 1
+
+    crud.delete_community(db_session, community_id)
+    assert geo_engine.within(*TOKYO, 1) == []
+
+
+def test_rolled_back_changes_are_not_applied(db_session, geo_engine):
+    community = schemas.CommunitiesCreate(name="x", latitude=NAGOYA[0], longitude=NAGOYA[1], password="TestPass123")
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db_session):
+            crud.create_community(db_session, community, hashed_password="x")
+            raise RuntimeError("rollback")
+    assert geo_engine.within(*NAGOYA, 1) == []
@@ -0,0 +1,73 @@
+import io
+import json
+import logging
+from dataclasses import replace
+
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.config import get_settings
+from app.core.logging_config import (
+    REQUEST_ID_HEADER, configure_logging, new_request_id, parse_levels, request_id_var, shutdown_logging,
+)
+
+
+def _configure(stream, **overrides):
+    settings = replace(get_settings(), log_format="json", **overrides)
+    configure_logging(settings, stream=stream)
+
+
+def test_json_lines_carry_request_id_and_extra_fields():
+    stream = io.StringIO()
+    _configure(stream, log_levels="tests.logging=DEBUG")
+    try:
+        context = request_id_var.set("req-123")
+        try:
+            logging.getLogger("tests.logging").debug("hello %s", "world", extra={"job": "cleanup"})
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logging.getLogger("tests.logging").exception("failed")
+        finally:
+            request_id_var.reset(context)
+    finally:
+        shutdown_logging()  # キューに残っている分を書き出す
+        configure_logging()
+
+    first, second = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert first["message"] == "hello world"
+    assert first["level"] == "DEBUG"
+    assert first["request_id"] == "req-123"
+    assert first["job"] == "cleanup"
+    assert second["message"] == "failed"
+    assert "ValueError: boom" in second["exc_info"]
+
+
+def test_parse_levels():
+    assert parse_levels("app.core.security=debug, db=WARNING,") == {"app.core.security": "DEBUG", "db": "WARNING"}
+    assert parse_levels("") == {}
+
+
+def test_request_id_header(client: TestClient):
+    r = client.get("/health", headers={REQUEST_ID_HEADER: "abc-123"})
+    assert r.headers[REQUEST_ID_HEADER] == "abc-123"
+    # 改行などを含む ID は使わずに新しく発行する
+    r = client.get("/health", headers={REQUEST_ID_HEADER: "bad id\nforged"})
+    assert r.headers[REQUEST_ID_HEADER] != "bad id\nforged"
+    assert len(new_request_id()) == 32
+
+
+def test_auth_tracing_is_skipped_when_debug_is_disabled(client: TestClient, monkeypatch):
+    calls = []
+    monkeypatch.setattr(security.logger, "debug", lambda *args, **kwargs: calls.append(args))
+    security.logger.setLevel(logging.INFO)
+    try:
+        client.app.dependency_overrides.pop(security.require_token)
+        client.get("/api/v1/login/me")
+        assert calls == []
+
+        security.logger.setLevel(logging.DEBUG)
+        client.get("/api/v1/login/me")
+        assert calls
+    finally:
+        security.logger.setLevel(logging.NOTSET)
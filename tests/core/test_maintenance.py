@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from app.core.maintenance import MaintenanceJob, MaintenanceScheduler
+from app.core.revocation import new_jti, revocation_key
+from db import crud, maintenance, migrate, models
+from db.session import Base, apply_sqlite_pragmas
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """WAL プロファイルのファイル DB (新規作成のため auto_vacuum=INCREMENTAL になる)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'maintenance.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+    Base.metadata.create_all(bind=engine)
+    migrate.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def _blacklist(engine, expires_at):
+    with Session(bind=engine) as db:
+        crud.add_token_to_blacklist(db, revocation_key("t", {"jti": new_jti()}), expires_at)
+
+
+def test_default_jobs_run_once_per_interval(file_engine):
+    now = datetime.now(timezone.utc)
+    _blacklist(file_engine, now - timedelta(hours=1))
+    _blacklist(file_engine, now + timedelta(hours=1))
+
+    scheduler = MaintenanceScheduler(file_engine)
+    assert scheduler.run_pending() == ["token_blacklist_cleanup", "optimize", "incremental_vacuum", "wal_checkpoint"]
+    # 間隔に達していないので2回目は何もしない
+    assert scheduler.run_pending() == []
+
+    jobs = scheduler.metrics()["jobs"]
+    assert jobs["token_blacklist_cleanup"]["last_result"] == {"deleted": 1}
+    assert jobs["wal_checkpoint"]["last_result"]["busy"] is False
+    assert "free_pages" in jobs["incremental_vacuum"]["last_result"]
+    assert all(job["runs"] == 1 and job["skipped"] == 1 and job["failures"] == 0 for job in jobs.values())
+    with Session(bind=file_engine) as db:
+        assert db.query(models.TokenBlacklist).count() == 1
+
+
+def test_only_one_worker_runs_a_job(file_engine):
+    """同じ DB を使う別のワーカー (スケジューラ) は、リースを持つ間・間隔内は実行しない"""
+    calls = []
+    worker_a = MaintenanceScheduler(file_engine, jobs=[MaintenanceJob("job", 3600, calls.append)])
+    worker_b = MaintenanceScheduler(file_engine, jobs=[MaintenanceJob("job", 3600, calls.append)])
+
+    assert maintenance.acquire_lease(file_engine, "job", worker_a.owner, 3600, 600)
+    assert not worker_b.run_job(worker_b.jobs[0])  # 実行中のリースがある
+    maintenance.release_lease(file_engine, "job", worker_a.owner)
+    assert not worker_b.run_job(worker_b.jobs[0])  # 実行したばかり
+    assert calls == []
+
+    with file_engine.begin() as conn:
+        conn.execute(text("UPDATE maintenance_leases SET last_run_at = 0"))
+    assert worker_b.run_job(worker_b.jobs[0])
+    assert len(calls) == 1
+
+
+def test_failing_job_is_recorded_and_does_not_stop_others(file_engine):
+    def broken(engine):
+        raise RuntimeError("boom")
+
+    scheduler = MaintenanceScheduler(file_engine, jobs=[
+        MaintenanceJob("broken", 60, broken),
+        MaintenanceJob("ok", 60, lambda engine: {"ok": True}),
+    ])
+    assert scheduler.run_pending() == ["broken", "ok"]
+    jobs = scheduler.metrics()["jobs"]
+    assert jobs["broken"]["failures"] == 1
+    assert jobs["broken"]["last_error"] == "RuntimeError: boom"
+    assert jobs["ok"]["last_result"] == {"ok": True}
+
+
+def test_incremental_vacuum_returns_free_pages(file_engine):
+    with file_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE filler (data TEXT)"))
+        conn.execute(text("INSERT INTO filler VALUES (:data)"), [{"data": "x" * 1000}] * 500)
+    with file_engine.begin() as conn:
+        conn.execute(text("DELETE FROM filler"))
+
+    result = maintenance.incremental_vacuum(file_engine, max_pages=50)
+    assert result["freed_pages"] == 50
+    result = maintenance.incremental_vacuum(file_engine, max_pages=100_000)
+    assert result["free_pages"] == 0
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.core.passwords import (
+    PasswordService, PasswordServiceBusy, calibrate, hash_password, hash_rounds, needs_rehash,
+)
+
+
+def test_hash_and_verify_in_worker_process():
+    service = PasswordService(workers=1, max_pending=4)
+    try:
+        hashed = asyncio.run(service.hash("secret"))
+        assert asyncio.run(service.verify("secret", hashed))
+        assert not asyncio.run(service.verify("wrong", hashed))
+    finally:
+        service.shutdown()
+
+    metrics = service.metrics()
+    assert metrics["hashes"] == 1
+    assert metrics["verifies"] == 2
+    assert metrics["pending"] == 0
+
+
+def test_rejects_when_queue_is_full():
+    """待ち行列が上限に達したら計算せずに PasswordServiceBusy"""
+    service = PasswordService(workers=0, max_pending=2)
+    hashed = asyncio.run(service.hash("secret"))
+
+    async def burst():
+        return await asyncio.gather(*(service.verify("secret", hashed) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert results.count(True) == 2
+    assert sum(isinstance(r, PasswordServiceBusy) for r in results) == 3
+    assert service.metrics()["rejected"] == 3
+    assert service.metrics()["max_pending_seen"] == 2
+
+
+def test_busy_service_returns_503(client, monkeypatch):
+    async def busy(*args, **kwargs):
+        raise PasswordServiceBusy("Too many concurrent password operations")
+
+    monkeypatch.setattr(PasswordService, "hash", busy)
+    r = client.post("/api/v1/communities/", json={"name": "Busy", "password": "TestPass123"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_rounds_come_from_settings_and_are_detected():
+    hashed = hash_password("secret", rounds=5)
+    assert hash_rounds(hashed) == 5
+    assert needs_rehash(hashed, rounds=4)
+    assert not needs_rehash(hashed, rounds=5)
+    assert hash_rounds("not-a-bcrypt-hash") is None
+
+    service = PasswordService(workers=0, rounds=6)
+    assert hash_rounds(asyncio.run(service.hash("secret"))) == 6
+    assert service.metrics()["rounds"] == 6
+
+
+def test_calibrate_recommends_largest_cost_within_target():
+    recommended, results = calibrate(target_ms=10_000, samples=2, min_rounds=4, max_rounds=5)
+    assert recommended == 5
+    assert [r["rounds"] for r in results] == [4, 5]
+
+    recommended, results = calibrate(target_ms=0, samples=2, min_rounds=4, max_rounds=6)
+    assert recommended == 4
+    assert len(results) == 1  # 目標を超えた時点で打ち切る
@@ -0,0 +1,173 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, insert, select, update
+
+from app.core.revocation import BloomFilter, RevocationCache, get_revocation_cache, new_jti, revocation_key
+from app.main import app
+from db import crud, models
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _key(name: str) -> bytes:
+    return revocation_key(name, {"jti": name})
+
+
+def _revoke(db_session, name: str):
+    crud.add_token_to_blacklist(db_session, _key(name), datetime.now(timezone.utc) + timedelta(hours=1))
+
+
+def test_revocation_key_is_fixed_size():
+    jti = new_jti()
+    assert len(jti) == 22
+    assert revocation_key("a.b.c", {"jti": jti}) != revocation_key("a.b.c", {"jti": new_jti()})
+    assert len(revocation_key("a.b.c", {"jti": jti})) == 16
+    assert len(revocation_key("a.b.c", {"jti": "not-base64-jti"})) == 16
+    assert len(revocation_key("legacy.token.without.jti", {})) == 16
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [os.urandom(32) for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(os.urandom(32) in bloom for _ in range(2000))
+    assert false_positives < 100  # 1% 程度 (余裕を見て 5%)
+
+
+def test_unrevoked_token_needs_no_query(db_engine, db_session, async_db):
+    _revoke(db_session, "revoked-token")
+    cache = RevocationCache(refresh_seconds=3600)
+    asyncio.run(cache.refresh(async_db, full=True))
+
+    with count_queries(db_engine) as statements:
+        for i in range(50):
+            assert not asyncio.run(cache.is_revoked(async_db, _key(f"valid-token-{i}")))
+        assert asyncio.run(cache.is_revoked(async_db, _key("revoked-token")))
+    assert statements == []
+    assert cache.metrics()["entries"] == 1
+
+
+def test_possible_hit_falls_through_to_db(db_session, async_db):
+    cache = RevocationCache(refresh_seconds=3600)
+    asyncio.run(cache.refresh(async_db, full=True))
+    # 他のワーカーが失効させた (このプロセスの完全一致の集合には無い) 状況を作る
+    _revoke(db_session, "other-worker-token")
+    cache._bloom.add(_key("other-worker-token"))
+
+    assert asyncio.run(cache.is_revoked(async_db, _key("other-worker-token")))
+    assert cache.metrics()["db_checks"] == 1
+    # 一度確認したものは以後 DB を見ない
+    assert asyncio.run(cache.is_revoked(async_db, _key("other-worker-token")))
+    assert cache.metrics()["db_checks"] == 1
+
+
+def test_refresh_picks_up_revocations_from_other_workers(db_session, async_db):
+    cache = RevocationCache(refresh_seconds=0)
+    asyncio.run(cache.refresh(async_db, full=True))
+    assert not asyncio.run(cache.is_revoked(async_db, _key("late-token")))
+
+    _revoke(db_session, "late-token")  # 別プロセスでのログアウト
+    assert asyncio.run(cache.is_revoked(async_db, _key("late-token")))
+    assert cache.metrics()["watermark"] is not None
+    assert cache.metrics()["full_reloads"] == 1
+
+
+def test_refresh_does_not_miss_rows_stamped_before_the_watermark(db_session, async_db):
+    """コミットが遅れた・時計の遅れたワーカーが書いた行 (blacklisted_at が古い) も差分読み込みで拾う"""
+    cache = RevocationCache(refresh_seconds=3600)
+    _revoke(db_session, "first-token")
+    asyncio.run(cache.refresh(async_db, full=True))
+    watermark = cache.metrics()["watermark"]
+
+    _revoke(db_session, "late-commit-token")
+    db_session.execute(
+        update(models.TokenBlacklist)
+        .where(models.TokenBlacklist.jti == _key("late-commit-token"))
+        .values(blacklisted_at=datetime.now(timezone.utc) - timedelta(minutes=10))
+    )
+    asyncio.run(cache.refresh(async_db))
+
+    assert cache.metrics()["watermark"] == watermark + 1
+    assert asyncio.run(cache.is_revoked(async_db, _key("late-commit-token")))
+    assert cache.metrics()["db_checks"] == 0
+
+
+def test_refresh_rereads_the_commit_window_below_the_watermark(db_session, async_db):
+    """
+    PostgreSQL のように採番 (seq) の後でコミットが前後する場合: ウォーターマークより小さい seq の行が
+    後からコミットされても、commit_window_seconds の間は読み直して拾う
+    """
+    cache = RevocationCache(refresh_seconds=3600, commit_window_seconds=60)
+    for name in ("in-flight-token", "committed-token"):
+        _revoke(db_session, name)
+    in_flight = db_session.scalars(
+        select(models.TokenBlacklist).where(models.TokenBlacklist.jti == _key("in-flight-token"))
+    ).one()
+    row = {"seq": in_flight.seq, "jti": in_flight.jti,
+           "blacklisted_at": in_flight.blacklisted_at, "expires_at": in_flight.expires_at}
+    db_session.delete(in_flight)  # 採番済みだが未コミット
+    db_session.flush()
+
+    asyncio.run(cache.refresh(async_db, full=True))
+    assert cache.metrics()["watermark"] == row["seq"] + 1
+
+    db_session.execute(insert(models.TokenBlacklist).values(**row))  # 遅れてコミットされた
+    asyncio.run(cache.refresh(async_db))
+    assert asyncio.run(cache.is_revoked(async_db, _key("in-flight-token")))
+    assert cache.metrics()["db_checks"] == 0
+
+
+def test_cleanup_does_not_reuse_sequence_numbers(db_session):
+    """期限切れの行を全て削除しても、次に追加する行は削除した番号を再利用しない"""
+    for name in ("expired-1", "expired-2"):
+        crud.add_token_to_blacklist(db_session, _key(name), datetime.now(timezone.utc) - timedelta(hours=1))
+    latest = db_session.scalar(select(func.max(models.TokenBlacklist.seq)))
+
+    assert crud.cleanup_expired_tokens(db_session) == 2
+    assert not crud.is_token_blacklisted(db_session, _key("expired-2"))
+    _revoke(db_session, "next-token")
+    assert db_session.scalar(
+        select(models.TokenBlacklist.seq).where(models.TokenBlacklist.jti == _key("next-token"))
+    ) == latest + 1
+
+
+def test_commit_window_rereads_from_the_watermark_before_the_window():
+    cache = RevocationCache(commit_window_seconds=60)
+    for recorded_at, watermark in [(0.0, 5), (30.0, 8), (70.0, 12)]:
+        cache._metrics.watermark = watermark
+        cache._refreshed_at = recorded_at
+        cache._record(recorded_at)
+    assert cache._scan_from() == 5  # 前回 (70秒) の60秒前までに記録したもの
+    cache._refreshed_at = 100.0
+    assert cache._scan_from() == 8
+    assert [watermark for _, watermark in cache._history] == [5, 8, 12]
+
+    # 記録が窓より新しいものしか無い間 (起動直後) は全件を読み直す
+    assert RevocationCache(commit_window_seconds=60)._scan_from() is None
+    assert RevocationCache()._scan_from() is None
+
+
+def test_startup_preload_uses_the_overridden_session(client: TestClient, db_session):
+    """起動時の全件読み込みも dependency_overrides のセッション (テスト用 DB) から行う"""
+    _revoke(db_session, "preloaded-token")
+    with TestClient(app):  # client フィクスチャの差し替えを保ったまま、もう一度起動する
+        pass
+    assert _key("preloaded-token") in get_revocation_cache()._exact
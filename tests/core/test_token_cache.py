@@ -0,0 +1,60 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.security import require_token
+from app.core.token_cache import TokenPayloadCache, get_token_cache
+from app.main import app
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TokenPayloadCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    assert cache.get("a") == {"sub": "a"}  # a を最近使ったものにする
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["evictions"]) == (3, 1, 1)
+
+
+def test_entries_do_not_outlive_token_exp():
+    cache = TokenPayloadCache(maxsize=10, ttl_seconds=3600)
+    cache.put("expired", {"sub": "x", "exp": int(time.time()) - 1})
+    assert cache.get("expired") is None
+    assert cache.metrics()["expired"] == 1
+
+    cache.put("valid", {"sub": "x", "exp": int(time.time()) + 60})
+    cache.invalidate("valid")
+    assert cache.get("valid") is None
+
+    disabled = TokenPayloadCache(maxsize=0)
+    disabled.put("t", {"sub": "x"})
+    assert disabled.get("t") is None
+
+
+def test_repeat_requests_skip_signature_verification(client: TestClient, monkeypatch):
+    app.dependency_overrides.pop(require_token)
+    get_token_cache().clear()
+    token = security.create_access_token({"sub": "gov:cache"}, role="gov")
+
+    calls = []
+    original = security.decode_access_token
+
+    def counting_decode(value):
+        calls.append(value)
+        return original(value)
+
+    monkeypatch.setattr(security, "decode_access_token", counting_decode)
+    for _ in range(5):
+        r = client.get("/api/v1/login/me", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 200
+        assert r.json()["sub"] == "gov:cache"
+    assert len(calls) == 1
+
+    # 改ざんしたトークンはキャッシュに無いため署名の検証で拒否される
+    r = client.get("/api/v1/login/me", headers={"Authorization": f"Bearer {token}x"})
+    assert r.status_code == 401
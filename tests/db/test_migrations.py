@@ -0,0 +1,175 @@
+import pytest
+from sqlalchemy import BigInteger, create_engine, event, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.revocation import revocation_key
+from db import migrate
+from db.timestamps import to_millis
+
+# 旧 db/create_database.py (sqlite3 直書きの DDL) で作成された本番DBと同じスキーマ
+LEGACY_SCHEMA = """
+CREATE TABLE Special_notes (special_notes_id INTEGER PRIMARY KEY, notes_content_json TEXT, created_at TEXT);
+CREATE TABLE Items (items_id INTEGER PRIMARY KEY, item_name TEXT, unit TEXT, category TEXT, description TEXT);
+CREATE TABLE Shelter_info (shelter_info INTEGER PRIMARY KEY, latitude REAL, longitude REAL, notes TEXT, created_at TEXT);
+CREATE TABLE Credential (credential_id INTEGER PRIMARY KEY, hashed_password TEXT NOT NULL, created_at TEXT);
+CREATE TABLE Members (
+    member_id INTEGER PRIMARY KEY, special_notes_id INTEGER, created_at TEXT,
+    FOREIGN KEY (special_notes_id) REFERENCES Special_notes (special_notes_id)
+);
+CREATE TABLE Request_content (
+    request_content_id INTEGER PRIMARY KEY, items_id INTEGER, other_note TEXT, number INTEGER, created_at TEXT,
+    FOREIGN KEY (items_id) REFERENCES Items (items_id)
+);
+CREATE TABLE Communities (
+    community_id INTEGER PRIMARY KEY, member_id INTEGER, credential_id INTEGER NOT NULL UNIQUE, name TEXT,
+    latitude REAL, longitude REAL, member_count INTEGER, created_at TEXT,
+    FOREIGN KEY (member_id) REFERENCES Members (member_id),
+    FOREIGN KEY (credential_id) REFERENCES Credential (credential_id)
+);
+CREATE TABLE ItemAdditionRequests (
+    AddReq_id INTEGER PRIMARY KEY, Community_id INTEGER NOT NULL, Item_name TEXT NOT NULL, Item_unit TEXT,
+    Reason TEXT, Timestamp TEXT NOT NULL,
+    FOREIGN KEY (Community_id) REFERENCES Communities (community_id)
+);
+CREATE TABLE Shelter (
+    shelter_id INTEGER PRIMARY KEY, shelter_info INTEGER, community_id INTEGER, created_at TEXT,
+    FOREIGN KEY (shelter_info) REFERENCES Shelter_info (shelter_info),
+    FOREIGN KEY (community_id) REFERENCES Communities (community_id)
+);
+CREATE TABLE Support_Request (
+    request_id INTEGER PRIMARY KEY, community_id INTEGER, request_content_id INTEGER, status TEXT, created_at TEXT,
+    FOREIGN KEY (community_id) REFERENCES Communities (community_id),
+    FOREIGN KEY (request_content_id) REFERENCES Request_content (request_content_id)
+);
+CREATE TABLE GovUser (
+    gov_user_id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE, credential_id INTEGER NOT NULL UNIQUE,
+    email TEXT, full_name TEXT, is_active INTEGER DEFAULT 1, created_at TEXT,
+    FOREIGN KEY (credential_id) REFERENCES Credential (credential_id)
+);
+CREATE TABLE TokenBlacklist (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, token TEXT NOT NULL UNIQUE, blacklisted_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX idx_token ON TokenBlacklist(token);
+"""
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA.split(";"):
+            if statement.strip():
+                conn.exec_driver_sql(statement)
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_legacy_database(legacy_engine):
+    """既存の本番DBを作り直さずに最新スキーマへ更新できる"""
+    with legacy_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO ItemAdditionRequests (Community_id, Item_name, Timestamp) VALUES (1, 'Tent', '2025-01-01')"
+        )
+        # 書式の混在した日時 (JST オフセット付き、タイムゾーン無し、不正な文字列)
+        conn.exec_driver_sql(
+            "INSERT INTO TokenBlacklist (token, blacklisted_at, expires_at) "
+            "VALUES ('legacy.jwt.token', '2025-01-01T12:00:00+09:00', '2025-01-01T15:00:00+09:00')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO Support_Request (status, created_at) VALUES "
+            "('pending', '2025-01-01T12:00:00.123456+09:00'), ('pending', '2025-01-01T12:00:01'), "
+            "('pending', 'unknown')"
+        )
+
+    applied = migrate.upgrade(legacy_engine)
+    assert applied == [m.version for m in migrate.load_migrations()]
+    assert migrate.current_version(legacy_engine) == applied[-1]
+
+    inspector = inspect(legacy_engine)
+    columns = {c["name"] for c in inspector.get_columns("ItemAdditionRequests")}
+    assert "add_req_id" in columns and "AddReq_id" not in columns
+    for table, column in [
+        ("Support_Request", "community_id"),
+        ("Support_Request", "request_content_id"),
+        ("Support_Request", "status"),
+        ("Support_Request", "created_at"),
+        ("Request_content", "items_id"),
+        ("Shelter", "community_id"),
+        ("Communities", "member_id"),
+        ("ItemAdditionRequests", "community_id"),
+    ]:
+        # SQLite の列名は大文字小文字を区別しない (旧DDLの Community_id など)
+        indexed = {tuple(c.lower() for c in ix["column_names"]) for ix in inspector.get_indexes(table)}
+        assert (column,) in indexed, f"{table}.{column} is not indexed"
+
+    # 既存データは保持される
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT add_req_id, item_name FROM ItemAdditionRequests")).one() == (1, "Tent")
+        assert conn.execute(text("SELECT timestamp FROM ItemAdditionRequests")).scalar() == to_millis("2025-01-01")
+
+        # 日時はエポックミリ秒 (整数) に変換され、created_at のインデックスも作り直される
+        created = conn.execute(text("SELECT created_at FROM Support_Request ORDER BY request_id")).scalars().all()
+        assert created == [to_millis("2025-01-01T03:00:00.123Z"), to_millis("2025-01-01T03:00:01Z"), None]
+    assert {c["name"]: c["type"].python_type for c in inspector.get_columns("Support_Request")}["created_at"] is int
+
+    # ブラックリストはトークン全体ではなく16バイトのキー (旧トークンは SHA-256 の先頭16バイト) で保持する
+    assert {c["name"] for c in inspector.get_columns("TokenBlacklist")} == {"jti", "seq", "blacklisted_at", "expires_at"}
+    with legacy_engine.connect() as conn:
+        row = conn.execute(text("SELECT jti, seq, expires_at FROM TokenBlacklist")).one()
+        assert row == (revocation_key("legacy.jwt.token", {}), 1, to_millis("2025-01-01T06:00:00Z"))
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'TokenBlacklist'")).scalar()
+        assert "AUTOINCREMENT" in ddl
+
+
+def test_upgrade_is_idempotent(legacy_engine):
+    migrate.upgrade(legacy_engine)
+    assert migrate.upgrade(legacy_engine) == []
+
+
+def test_convert_column_backfill_uses_an_index():
+    """値ごとの UPDATE ... WHERE old = :old は一時的なインデックスで探す (全件走査だと件数の2乗に比例して遅くなる)"""
+    engine = create_engine("sqlite://")
+    plans = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            params = parameters[0] if executemany else parameters
+            plans.extend(row[3] for row in cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, params))
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY, created_at TEXT)")
+        conn.exec_driver_sql("CREATE INDEX ix_t_created_at ON t (created_at)")
+        conn.exec_driver_sql("INSERT INTO t (created_at) VALUES ('2025-01-01T00:00:00'), ('2025-01-01T00:00:01')")
+        assert migrate.convert_column(conn, "t", "created_at", BigInteger(), to_millis)
+
+        assert plans and all("USING INDEX" in plan for plan in plans), plans
+        assert conn.execute(text("SELECT count(*) FROM t WHERE created_at IS NULL")).scalar() == 0
+        # 移行用の一時的なインデックスは残らず、元のインデックスは作り直される
+        assert [ix["name"] for ix in inspect(conn).get_indexes("t")] == ["ix_t_created_at"]
+    engine.dispose()
+
+
+def test_convert_column_keeps_not_null_and_default():
+    """NOT NULL と定数の既定値は引き継ぐ。SQLite で既定値の無い NOT NULL の列だけは NULL 可になる"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE t (id INTEGER PRIMARY KEY, created_at TEXT NOT NULL DEFAULT '2025-01-01T00:00:00', "
+            "updated_at TEXT NOT NULL, seen_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.exec_driver_sql("INSERT INTO t (id, created_at, updated_at) VALUES (1, 'unknown', '2025-01-02T00:00:00')")
+        for column in ("created_at", "updated_at", "seen_at"):
+            assert migrate.convert_column(conn, "t", column, BigInteger(), to_millis)
+
+        columns = {c["name"]: c for c in inspect(conn).get_columns("t")}
+        assert not columns["created_at"]["nullable"]
+        assert columns["created_at"]["default"] == str(to_millis("2025-01-01T00:00:00"))
+        assert columns["updated_at"]["nullable"]
+        assert columns["seen_at"]["default"] is None
+        # 変換できない値は既定値になり、既定値は以後の INSERT でも使われる
+        assert conn.execute(text("SELECT created_at FROM t")).scalar() == to_millis("2025-01-01T00:00:00")
+        with pytest.raises(IntegrityError, match="NOT NULL"):
+            conn.exec_driver_sql("INSERT INTO t (id, created_at, updated_at) VALUES (2, NULL, 0)")
+    engine.dispose()
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from db import crud, models, schemas
+from db.repository import unit_of_work
+from db.session import Base, apply_sqlite_pragmas
+
+
+def test_create_update_delete_return_rows(db_session):
+    """書き込みは RETURNING の結果 (全カラム) をそのまま返す"""
+    created = crud.create_item(db_session, schemas.ItemsCreate(item_name="水", unit="本"))
+    assert created.items_id is not None
+    assert created.item_name == "水"
+
+    updated = crud.update_item(db_session, created.items_id, schemas.ItemsCreate(item_name="お茶", unit="本"))
+    assert updated.item_name == "お茶"
+    assert db_session.get(models.Items, created.items_id).item_name == "お茶"
+
+    deleted = crud.delete_item(db_session, created.items_id)
+    assert deleted.items_id == created.items_id
+    assert crud.get_item(db_session, created.items_id) is None
+
+
+def test_missing_row_returns_none(db_session):
+    assert crud.update_item(db_session, 9999, schemas.ItemsCreate(item_name="x", unit="y")) is None
+    assert crud.delete_item(db_session, 9999) is None
+
+
+def test_create_sets_created_at_and_ignores_unknown_keys(db_session):
+    """created_at 未指定なら現在時刻を入れ、テーブルに無いキー (password) は書き込まない"""
+    community = crud.create_community(db_session, schemas.CommunitiesCreate(name="c", password="secret"))
+    assert community.created_at
+    assert crud.verify_password("secret", crud.get_credential(db_session, community.credential_id).hashed_password)
+
+    updated = crud.update_community(db_session, community.community_id,
+                                    schemas.CommunitiesCreate(name="c2", password="other"))
+    assert updated.name == "c2"
+
+
+@pytest.fixture
+def file_session(tmp_path):
+    """実際にコミットされる (テスト用の外側トランザクションの無い) セッション"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'uow.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine, autoflush=False)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_create_community_commits_once(file_session):
+    commits = []
+    event.listen(file_session, "after_commit", lambda session: commits.append(session))
+
+    community = crud.create_community(file_session, schemas.CommunitiesCreate(name="c", password="secret"))
+    assert len(commits) == 1
+    assert crud.get_credential(file_session, community.credential_id) is not None
+
+
+def test_create_community_leaves_no_orphan_credential(file_session):
+    """Communities の INSERT が失敗した場合は Credential もロールバックされる"""
+    with pytest.raises(IntegrityError):
+        crud.create_community(file_session, schemas.CommunitiesCreate(name="c", password="secret", member_id=9999))
+    assert file_session.scalar(select(func.count()).select_from(models.Credential)) == 0
+
+
+def test_unit_of_work_nests(file_session):
+    with unit_of_work(file_session):
+        with unit_of_work(file_session):
+            crud.create_item(file_session, schemas.ItemsCreate(item_name="a"))
+        assert file_session.in_transaction()
+        crud.create_item(file_session, schemas.ItemsCreate(item_name="b"))
+    assert not file_session.in_transaction()
+    assert len(crud.get_items(file_session)) == 2
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.revocation import get_revocation_cache
+from app.core.security import create_access_token, require_token
+from app.main import app
+from db.geo_math import haversine_km
+from db.session import (
+    LazyAsyncSession, apply_sqlite_pragmas, async_engine, get_lazy_async_read_db, register_sqlite_functions,
+)
+
+
+def _engine(path, read_only=False):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+        register_sqlite_functions(dbapi_connection)
+
+    return engine
+
+
+def test_read_only_connection_rejects_writes(tmp_path):
+    """読み取り専用プロファイルの接続は SELECT のみ可能"""
+    path = tmp_path / "ro.db"
+    writer = _engine(path)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+
+    reader = _engine(path, read_only=True)
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t (id) VALUES (2)"))
+
+    writer.dispose()
+    reader.dispose()
+
+
+def test_haversine_km_is_registered_as_deterministic(tmp_path):
+    """接続ごとに haversine_km が登録され、deterministic のため式インデックスにも使える"""
+    engine = _engine(tmp_path / "geo.db")
+    with engine.begin() as conn:
+        # 東京駅 - 名古屋駅 (約 267.5 km)
+        km = conn.execute(text("SELECT haversine_km(35.6812, 139.7671, 35.1709, 136.8815)")).scalar()
+        assert km == pytest.approx(267.5, abs=0.5)
+        assert km == haversine_km(35.6812, 139.7671, 35.1709, 136.8815)
+        assert conn.execute(text("SELECT haversine_km(NULL, 0, 0, 0)")).scalar() is None
+
+        conn.execute(text("CREATE TABLE p (lat REAL, lon REAL)"))
+        conn.execute(text("CREATE INDEX ix_p_distance ON p (haversine_km(lat, lon, 35.0, 137.0))"))
+    engine.dispose()
+
+
+def test_haversine_km_on_async_engine():
+    async def query():
+        async with async_engine.connect() as conn:
+            return (await conn.execute(text("SELECT haversine_km(0, 0, 0, 180)"))).scalar()
+
+    assert asyncio.run(query()) == pytest.approx(20015.1, abs=0.1)  # 赤道上の地球の半周
+
+
+def test_lazy_session_is_created_on_first_use():
+    created = []
+
+    class FakeSession:
+        def __init__(self):
+            created.append(self)
+
+        def get_bind(self):
+            return "bind"
+
+    lazy = LazyAsyncSession(FakeSession)
+    assert not lazy.used and created == []
+    assert lazy.get_bind() == "bind"
+    assert lazy.get_bind() == "bind"
+    assert lazy.used and len(created) == 1
+
+
+def test_cached_auth_opens_no_session(client, async_db, monkeypatch):
+    """キャッシュで検証できる認証済みリクエスト (/login/me) ではセッションを作らない"""
+    app.dependency_overrides.pop(require_token)
+    opened = []
+
+    async def counting_lazy_db():
+        db = LazyAsyncSession(lambda: opened.append(1) or async_db)
+        yield db
+
+    app.dependency_overrides[get_lazy_async_read_db] = counting_lazy_db
+    cache = get_revocation_cache()
+    monkeypatch.setattr(cache, "refresh_seconds", 3600)
+    monkeypatch.setattr(cache, "_refreshed_at", time.monotonic())
+    monkeypatch.setattr(cache, "_loaded", True)
+
+    token = create_access_token({"sub": "gov:lazy"}, role="gov")
+    for _ in range(3):
+        r = client.get("/api/v1/login/me", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == 200
+    assert opened == []
+    assert client.get("/health/db").json()["pools"]
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from db import crud, models, schemas
+from db.timestamps import from_millis, normalize_iso, to_millis
+
+
+def test_to_millis_accepts_mixed_formats():
+    """オフセット付き・UTC (Z)・タイムゾーン無し (JST とみなす) は同じ時刻として揃う"""
+    expected = to_millis(datetime(2025, 1, 1, 3, 0, tzinfo=timezone.utc))
+    assert to_millis("2025-01-01T12:00:00+09:00") == expected
+    assert to_millis("2025-01-01T03:00:00Z") == expected
+    assert to_millis("2025-01-01T12:00:00") == expected
+    assert to_millis("2025-01-01T12:00:00.000123+09:00") == expected
+    assert from_millis(expected) == "2025-01-01T12:00:00.000+09:00"
+    assert normalize_iso(None) is None
+    with pytest.raises(ValueError):
+        to_millis("yesterday")
+
+
+def test_column_stores_integer_and_reads_iso(db_session):
+    row = crud.create_item(db_session, schemas.ItemsCreate(item_name="水"))
+    content = crud.create_request_content(
+        db_session, schemas.RequestContentCreate(items_id=row.items_id, number=1, created_at="2025-01-01T03:00:00Z")
+    )
+    assert content.created_at == "2025-01-01T12:00:00.000+09:00"
+
+    stored = db_session.execute(
+        text("SELECT created_at, typeof(created_at) FROM Request_content WHERE request_content_id = :id"),
+        {"id": content.request_content_id},
+    ).one()
+    assert stored == (to_millis("2025-01-01T03:00:00Z"), "integer")
+    assert db_session.get(models.RequestContent, content.request_content_id).created_at == content.created_at
+
+
+def test_invalid_timestamp_is_rejected(client):
+    r = client.post("/api/v1/special_notes/", json={"notes_content_json": "{}", "created_at": "not a date"})
+    assert r.status_code == 422